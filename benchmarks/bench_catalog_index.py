@@ -0,0 +1,100 @@
+"""
+Benchmark KPI filtering for the results page on large synthetic catalogs.
+
+Compares, for catalogs of 100k+ indicator rows:
+
+- filter: the former approach (boolean masks on the whole frame per
+  objective and tipo, then `iterrows` and a split of "Metriche" per row);
+- index: the `KpiCatalog` lookups used now ((objective, tipo) -> rows and
+  the pre-exploded metric table).
+
+Both produce the same list of (objective, tipo, categoria, focus, metric)
+entries for the relevant objectives. Also reports the memory of the raw
+object-dtype frame versus the normalized catalog.
+
+Usage:
+    python benchmarks/bench_catalog_index.py [--rows 100000 500000] [--relevant 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_store import KpiCatalog, build_catalog  # noqa: E402
+
+TIPI = ["KPI", "KQI", "KRI"]
+
+
+def synthetic_catalog(rows, seed=0, objectives=12, categories=200, metrics=2000):
+    rng = np.random.default_rng(seed)
+    metric_names = np.array([f"Metrica {i}" for i in range(metrics)], dtype=object)
+    per_row = rng.integers(1, 6, rows)
+    picks = rng.integers(0, metrics, per_row.sum())
+    offsets = np.concatenate(([0], np.cumsum(per_row)))
+    return pd.DataFrame({
+        "Business Objective": np.array([f"Obiettivo {i}" for i in range(objectives)], dtype=object)[rng.integers(0, objectives, rows)],
+        "Tipo": np.array(TIPI, dtype=object)[rng.integers(0, 3, rows)],
+        "Categoria": np.array([f"Categoria {i}" for i in range(categories)], dtype=object)[rng.integers(0, categories, rows)],
+        "Focus": np.array([f"Focus {i}" for i in range(categories // 4)], dtype=object)[rng.integers(0, categories // 4, rows)],
+        "Metriche": [", ".join(metric_names[picks[offsets[i]:offsets[i + 1]]]) for i in range(rows)],
+    }).astype(object)
+
+
+def render_with_filters(kpi_df, relevant_objectives):
+    entries = []
+    for objective in relevant_objectives:
+        indicators = kpi_df[kpi_df['Business Objective'] == objective]
+        for tipo in indicators['Tipo'].unique():
+            subset = indicators[indicators['Tipo'] == tipo]
+            for _, row in subset.iterrows():
+                for metric in row['Metriche'].split(', '):
+                    entries.append((objective, tipo, row['Categoria'], row['Focus'], metric))
+    return entries
+
+
+def render_with_index(catalog, relevant_objectives):
+    entries = []
+    for objective in relevant_objectives:
+        for tipo in catalog.tipi(objective):
+            for row in catalog.rows(objective, tipo):
+                categoria, focus, metrics = catalog.indicator(row)
+                for metric in metrics:
+                    entries.append((objective, tipo, categoria, focus, metric))
+    return entries
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument("--relevant", type=int, default=3, help="Number of relevant objectives rendered.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        raw = synthetic_catalog(rows, seed=args.seed)
+        catalog, build_s = timed(lambda: KpiCatalog(build_catalog(raw)))
+        relevant = [f"Obiettivo {i}" for i in range(args.relevant)]
+
+        filtered, filter_s = timed(render_with_filters, raw, relevant)
+        indexed, index_s = timed(render_with_index, catalog, relevant)
+        assert filtered == indexed, "index and filter rendering differ"
+
+        raw_mb = raw.memory_usage(deep=True).sum() / 1e6
+        catalog_mb = catalog.memory_usage() / 1e6
+        print(f"{rows:>9} rows | build {build_s:6.2f}s | memory {raw_mb:7.1f} MB -> {catalog_mb:6.1f} MB "
+              f"| render {filter_s:6.2f}s -> {index_s:6.2f}s ({len(indexed)} entries)")
+
+
+if __name__ == "__main__":
+    main()
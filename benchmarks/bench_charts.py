@@ -0,0 +1,92 @@
+"""
+Benchmark the quadrant chart renderings over many renders.
+
+For each rendering, draws the quadrant chart of random scores many times in
+a row and reports the time and the bytes per chart, and the resident memory
+of the process at ten checkpoints, so that a leak shows as a steady growth:
+
+- png: the pooled `QuadrantTemplate` used by the app (blitted marker);
+- plotly: the vector chart, serialized without its template as the app
+  sends it;
+- pyplot: the former rendering, a new pyplot figure per chart that is
+  never closed, for comparison (run it with fewer renders).
+
+Usage:
+    python benchmarks/bench_charts.py [--renders 100000] [--mode png plotly pyplot]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from charts import quadrant_figure, quadrant_png  # noqa: E402
+
+CHECKPOINTS = 10
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def render_png(ease, value):
+    return quadrant_png(ease, value)
+
+
+def render_plotly(ease, value):
+    import plotly.io as pio
+
+    payload = quadrant_figure(ease, value).to_dict()
+    payload["layout"].pop("template", None)
+    return pio.to_json(payload, validate=False).encode("utf-8")
+
+
+def render_pyplot(ease, value):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    from charts import draw_quadrant
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    draw_quadrant(ax)
+    ax.scatter(ease, value, color="red", s=100)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    return buffer.getvalue()
+
+
+RENDERERS = {"png": render_png, "plotly": render_plotly, "pyplot": render_pyplot}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=100000)
+    parser.add_argument("--mode", nargs="+", choices=list(RENDERERS), default=["png", "plotly"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    step = max(args.renders // CHECKPOINTS, 1)
+    for mode in args.mode:
+        render = RENDERERS[mode]
+        render(50.0, 50.0)  # Warm up: imports, fonts and templates
+        samples, size = [rss_mb()], 0
+        start = time.perf_counter()
+        for i in range(1, args.renders + 1):
+            size += len(render(rng.uniform(0, 100), rng.uniform(0, 100)))
+            if i % step == 0:
+                samples.append(rss_mb())
+        elapsed = time.perf_counter() - start
+        print(f"{mode}: {args.renders} renders, {1000 * elapsed / args.renders:.2f} ms and "
+              f"{size / args.renders / 1024:.1f} KiB per chart")
+        print(f"    RSS MiB: {' '.join(f'{sample:.0f}' for sample in samples)} "
+              f"(growth {samples[-1] - samples[0]:+.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark the SQLite evaluation store with tens of thousands of assessments.
+
+Fills a temporary database with synthetic models (each with a few raters),
+writing one batch of evaluations per model, then times the queries behind
+the "Valutazioni Salvate" list and the reload of a past evaluation.
+
+Usage:
+    python benchmarks/bench_evaluation_store.py [--models 20000] [--raters 2]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation_store import SQLiteEvaluationStore  # noqa: E402
+from questionnaire import get_scenario  # noqa: E402
+
+
+def time_ms(func, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", type=int, default=20000)
+    parser.add_argument("--raters", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    objectives = {scenario: get_scenario(scenario).question_objectives for scenario in (None, "Churn")}
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteEvaluationStore(os.path.join(directory, "bench.sqlite3"))
+        start = time.perf_counter()
+        for i in range(args.models):
+            scenario = rng.choice([None, "Churn"])
+            model_id = store.save_model(f"Modello {i}", "Descrizione sintetica", scenario=scenario)
+            store.save_evaluations(model_id, {
+                f"Valutatore {r}": {question: rng.randint(1, 7) for question in objectives[scenario]}
+                for r in range(args.raters)
+            }, objectives[scenario])
+        elapsed = time.perf_counter() - start
+        print(f"write: {args.models} models x {args.raters} raters in {elapsed:.2f}s "
+              f"({args.models / elapsed:.0f} models/s)")
+
+        middle = args.models // 2
+        queries = {
+            "list latest 50": lambda: store.list_models(limit=50),
+            "list page at offset 10k": lambda: store.list_models(limit=50, offset=min(10000, middle)),
+            "search by name": lambda: store.list_models(limit=50, name=f"Modello {middle}"),
+            "filter by scenario": lambda: store.list_models(limit=50, scenario="Churn"),
+            "filter by objective": lambda: store.list_models(limit=50, objective="Efficienza Operativa"),
+            "load model": lambda: store.load_model(middle),
+            "load evaluations": lambda: store.load_evaluations(middle),
+        }
+        for name, query in queries.items():
+            print(f"{name:>24}: {time_ms(query):8.2f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+"""
+Load test of the app served by `streamlit run`, with concurrent simulated users.
+
+Starts the app in a Streamlit server (or targets a running one with
+`--url`) and connects simulated users to it. Each user is a client of the
+server's websocket speaking the browser's protocol: it sends the widget
+states of its interactions and waits for the script (or fragment) run they
+trigger to finish. Users walk through Input Modello AI -> Valutazione ->
+Risultati with a random scenario and random answers, and a share of them
+uploads a catalog through the upload endpoint, as the file uploader does.
+
+For every concurrency level, that many users run at once, `--rounds`
+sessions each one after the other, and the script reports:
+
+- the latency of the script runs (p50/p95/p99), overall and per step, from
+  the message sent to the end of the run;
+- the throughput of the server, in script runs per second;
+- the memory per session: the growth of the resident memory of the server
+  while the sessions of the level are connected, divided by their number;
+- the server CPU time per script run.
+
+The clients share one event loop. Run on the same machine as the server,
+they take some of its CPU; for capacity figures, run the server elsewhere
+and point `--url` at it (memory and CPU are then not reported).
+
+The started server saves models and evaluations to a temporary SQLite
+store, so the real store is untouched, and runs without XSRF protection,
+which would require the cookie handshake of a browser.
+
+The client needs the `websockets` package (requirements-dev.txt) and
+speaks the messages of `streamlit.proto` as of Streamlit 1.65. They are
+not a public API: the script warns when the server runs another release,
+and a session counts as failed when a run times out, shows an error or
+warning, or lacks the confirmation the app shows after saving the model
+and after sending the evaluation. The script exits with status 1 if any
+session failed.
+
+Usage:
+    python benchmarks/bench_load.py [--users 1 2 4 8] [--rounds 2] [--url http://host:8501] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_app.py")
+sys.path.insert(0, ROOT)
+
+# Sizes of the synthetic catalogs users upload.
+CATALOG_ROWS = (1_000, 10_000, 50_000)
+
+STEPS = ("apertura", "upload", "input", "valutazione", "invio valutazione", "risultati")
+
+# Seconds to wait for the started server to answer its health check.
+SERVER_START_TIMEOUT = 60
+
+# Seconds to wait for a message of the server before failing the session.
+RUN_TIMEOUT = 120
+
+# Streamlit release whose websocket protocol the client was written against.
+STREAMLIT_VERSION = "1.65"
+
+_catalogs = {}
+
+
+def catalog_bytes(rows, seed):
+    """
+    Return a synthetic CSV catalog, generated once per process.
+    """
+    if rows not in _catalogs:
+        from bench_suite import scenario_catalog
+
+        _catalogs[rows] = scenario_catalog(rows, seed=seed).to_csv(index=False).encode("utf-8")
+    return _catalogs[rows]
+
+
+def process_stats(pid):
+    """
+    Return the resident memory (MiB) and the CPU time (s) of a process.
+    """
+    with open(f"/proc/{pid}/statm") as f:
+        rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return rss, cpu
+
+
+class Session:
+    """
+    A browser session of the app, over the server's websocket.
+
+    As the browser does, the session keeps the state of every widget it
+    set and sends all of them with each rerun; buttons are triggers, sent
+    with the rerun they cause only. A rerun caused by widgets of a single
+    fragment reruns that fragment only.
+
+    Args:
+        url (str): Base URL of the server, e.g. "http://127.0.0.1:8501".
+    """
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.widgets = {}
+        self.options = {}
+        self.rendered = []
+        self.alerts = []
+        self.states = {}
+        self.changed_fragments = set()
+        self.statuses = []
+        self.timings = []
+        self.errors = []
+        self.session_id = None
+        self.page_script_hash = ""
+        self.streamlit_version = None
+        self.websocket = None
+
+    async def open(self):
+        from websockets.asyncio.client import connect
+
+        self.websocket = await connect(
+            "ws" + self.url[len("http"):] + "/_stcore/stream", subprotocols=["streamlit"], max_size=None
+        )
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+
+    def labels(self, kind):
+        """
+        Return the labels of the widgets of a kind rendered by the last run.
+        """
+        return [label for widget_kind, label in self.rendered if widget_kind == kind]
+
+    def expect(self, text):
+        """
+        Check that the last run showed a success message containing `text`.
+
+        Raises:
+            RuntimeError: If it did not, i.e. the interaction was not applied.
+        """
+        from streamlit.proto.Alert_pb2 import Alert
+
+        if not any(kind == Alert.SUCCESS and text in body for kind, body in self.alerts):
+            raise RuntimeError(
+                f"no {text!r} confirmation: the app, or the protocol of Streamlit "
+                f"{self.streamlit_version} (client written for {STREAMLIT_VERSION}), changed"
+            )
+
+    def set(self, kind, label, **value):
+        """
+        Set the value of a widget rendered by the last run, e.g.
+        `set("radio", "Naviga", string_value="Risultati")`.
+        """
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id, fragment_id = self.widgets[kind, label]
+        state = WidgetState(id=widget_id, **value)
+        self.states[state.id] = state
+        self.changed_fragments.add(fragment_id)
+
+    async def receive(self, kind):
+        from streamlit.proto.Alert_pb2 import Alert
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        while True:
+            message = ForwardMsg()
+            try:
+                message.ParseFromString(await asyncio.wait_for(self.websocket.recv(), RUN_TIMEOUT))
+            except TimeoutError:
+                raise RuntimeError(f"no {kind} message within {RUN_TIMEOUT}s") from None
+            message_kind = message.WhichOneof("type")
+            if message_kind == "new_session":
+                initialize = message.new_session.initialize
+                self.session_id = initialize.session_id
+                self.streamlit_version = initialize.environment_info.streamlit_version
+                self.page_script_hash = message.new_session.page_script_hash
+            elif message_kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+                element = message.delta.new_element
+                element_kind = element.WhichOneof("type")
+                if element_kind == "exception":
+                    self.errors.append(element.exception.message)
+                elif element_kind == "alert":
+                    self.alerts.append((element.alert.format, element.alert.body))
+                    if element.alert.format in (Alert.ERROR, Alert.WARNING):
+                        self.errors.append(element.alert.body)
+                widget = getattr(element, element_kind)
+                # Widgets are found by kind and label; charts have ids too, but no label
+                if getattr(widget, "id", "") and hasattr(widget, "label"):
+                    self.widgets[element_kind, widget.label] = (widget.id, message.delta.fragment_id)
+                    self.rendered.append((element_kind, widget.label))
+                    if element_kind in ("selectbox", "radio"):
+                        self.options[element_kind, widget.label] = list(widget.options)
+            if message_kind == kind:
+                return message
+
+    async def run(self, step, trigger=None):
+        """
+        Rerun the script (or the fragment of the `trigger` button, or of the
+        widgets set since the last run) with the widget states, and time it
+        until the run is finished. The status of every run the server
+        finished meanwhile is appended to `statuses`.
+
+        Args:
+            step (str): Name of the step, for the timings.
+            trigger (str, optional): Label of the button clicked.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        message = BackMsg()
+        client_state = message.rerun_script
+        client_state.page_script_hash = self.page_script_hash
+        client_state.widget_states.widgets.extend(self.states.values())
+        if trigger is not None:
+            widget_id, fragment_id = self.widgets["button", trigger]
+            client_state.widget_states.widgets.append(WidgetState(id=widget_id, trigger_value=True))
+            client_state.fragment_id = fragment_id
+        elif len(self.changed_fragments) == 1:
+            client_state.fragment_id = next(iter(self.changed_fragments))
+        self.changed_fragments = set()
+
+        self.rendered = []
+        self.alerts = []
+        start = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        while True:
+            finished = await self.receive("script_finished")
+            self.statuses.append(finished.script_finished)
+            if finished.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        self.timings.append((step, time.perf_counter() - start))
+
+    async def upload(self, label, data, filename):
+        """
+        Upload a file for a file uploader, as the browser does: ask the
+        server for an upload URL, PUT the file there, and set the uploader
+        state to the uploaded file. Timed as the "upload" step.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.Common_pb2 import FileUploaderState
+
+        start = time.perf_counter()
+        message = BackMsg()
+        message.file_urls_request.request_id = uuid.uuid4().hex
+        message.file_urls_request.session_id = self.session_id
+        message.file_urls_request.file_names.append(filename)
+        await self.websocket.send(message.SerializeToString())
+        urls = (await self.receive("file_urls_response")).file_urls_response.file_urls[0]
+
+        boundary = uuid.uuid4().hex
+        body = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: text/csv\r\n\r\n"
+        ).encode("utf-8") + data + f"\r\n--{boundary}--\r\n".encode("utf-8")
+        request = urllib.request.Request(
+            self.url + urls.upload_url, data=body, method="PUT",
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+        )
+        await asyncio.to_thread(lambda: urllib.request.urlopen(request).read())
+        self.timings.append(("upload", time.perf_counter() - start))
+
+        state = FileUploaderState()
+        info = state.uploaded_file_info.add()
+        info.file_id, info.name, info.size = urls.file_id, filename, len(data)
+        info.file_urls.CopyFrom(urls)
+        self.set("file_uploader", label, file_uploader_state_value=state)
+
+
+async def user_journey(url, user, seed, upload_ratio):
+    """
+    Walk one simulated user through the app.
+
+    Returns:
+        Session: The session, still connected, with its timings and errors.
+    """
+    rng = random.Random(seed * 100_003 + user)
+    session = Session(url)
+    try:
+        await session.open()
+        await session.run("apertura")
+
+        session.set("text_input", "Nome del Modello/App AI", string_value=f"Modello di carico {user:06d}")
+        session.set("text_area", "Descrizione del Modello/App AI", string_value=f"Sessione simulata {user}")
+        scenarios = session.options["selectbox", "Scenario di Valutazione"]
+        session.set("selectbox", "Scenario di Valutazione", string_value=rng.choice(scenarios))
+        upload = rng.random() < upload_ratio
+        if upload:
+            data = catalog_bytes(rng.choice(CATALOG_ROWS), seed)
+            await session.upload("Carica Dati KPI/KQI/KRI (Opzionale)", data, "catalogo.csv")
+        await session.run("input", trigger="Salva Descrizione")
+        session.expect("salvati con successo")
+        if upload:
+            session.expect("caricati con successo")
+
+        session.set("radio", "Naviga", string_value="Valutazione")
+        await session.run("valutazione")
+        session.set("text_input", "Nome del Valutatore", string_value=f"Valutatore {user}")
+        for label in session.labels("slider"):
+            session.set("slider", label, double_array_value={"data": [rng.randint(1, 7)]})
+        await session.run("invio valutazione", trigger="Invia Valutazione")
+        session.expect("Valutazione inviata")
+
+        session.set("radio", "Naviga", string_value="Risultati")
+        await session.run("risultati")
+    except Exception as e:
+        session.errors.append(f"{type(e).__name__}: {e}")
+    return session
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(store_url, port):
+    """
+    Start the app with `streamlit run` and wait until it answers.
+
+    Returns:
+        tuple: The server process and its base URL.
+    """
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", APP,
+            "--server.headless", "true",
+            "--server.address", "127.0.0.1",
+            "--server.port", str(port),
+            "--server.fileWatcherType", "none",
+            "--server.enableXsrfProtection", "false",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=ROOT, env=dict(os.environ, VALORE_AI_STORE_URL=store_url),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The Streamlit server exited with status {process.returncode}.")
+        try:
+            with urllib.request.urlopen(url + "/_stcore/health", timeout=1) as response:
+                if response.read() == b"ok":
+                    return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"The Streamlit server did not answer within {SERVER_START_TIMEOUT}s.")
+
+
+async def run_level(url, users, rounds, first_user, seed, upload_ratio, pid=None):
+    """
+    Run `users` concurrent simulated users, `rounds` sessions each, against
+    the server. The sessions stay connected until the memory of the server
+    has been read.
+
+    Args:
+        pid (int, optional): Process id of the server, to read its memory
+            and CPU time; None for a remote server.
+    """
+    before = process_stats(pid) if pid else None
+
+    async def user(worker):
+        sessions = []
+        for round_ in range(rounds):
+            sessions.append(await user_journey(url, first_user + worker * rounds + round_, seed, upload_ratio))
+        return sessions
+
+    start = time.perf_counter()
+    sessions = [session for result in await asyncio.gather(*map(user, range(users))) for session in result]
+    elapsed = time.perf_counter() - start
+    after = process_stats(pid) if pid else None
+    await asyncio.gather(*(session.close() for session in sessions))
+
+    timings = [timing for session in sessions for timing in session.timings]
+    runs = [seconds for step, seconds in timings if step != "upload"]
+    return {
+        "users": users,
+        "sessions": len(sessions),
+        "runs": len(runs),
+        "errors": [error for session in sessions for error in session.errors],
+        "elapsed_s": elapsed,
+        "runs_per_s": len(runs) / elapsed,
+        "p50_ms": 1000 * percentile(runs, 50),
+        "p95_ms": 1000 * percentile(runs, 95),
+        "p99_ms": 1000 * percentile(runs, 99),
+        "mb_per_session": (after[0] - before[0]) / len(sessions) if pid else None,
+        "cpu_ms_per_run": 1000 * (after[1] - before[1]) / max(len(runs), 1) if pid else None,
+        "steps": {
+            step: {
+                "count": len(values),
+                "p50_ms": 1000 * percentile(values, 50),
+                "p95_ms": 1000 * percentile(values, 95),
+            }
+            for step in STEPS
+            for values in [[seconds for name, seconds in timings if name == step]]
+            if values
+        },
+    }
+
+
+async def run_levels(url, args, pid=None):
+    # One session first, so that the first level does not pay the imports
+    # and the first parse of the catalogs
+    warm_up = await user_journey(url, 0, args.seed, 0)
+    await warm_up.close()
+    if warm_up.streamlit_version and not warm_up.streamlit_version.startswith(STREAMLIT_VERSION + "."):
+        print(f"The server runs Streamlit {warm_up.streamlit_version}; the client was written against "
+              f"{STREAMLIT_VERSION}, whose websocket protocol may differ.", file=sys.stderr)
+    if warm_up.errors:
+        raise RuntimeError(f"The warm-up session failed: {warm_up.errors[0]}")
+
+    levels, first_user = [], 1
+    print(f"{'utenti':>6} {'sessioni':>8} {'run':>5} {'run/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'MiB/sess':>9} {'CPU ms/run':>10} {'errori':>6}")
+    for users in args.users:
+        level = await run_level(url, users, args.rounds, first_user, args.seed, args.upload_ratio, pid)
+        first_user += users * args.rounds
+        levels.append(level)
+        memory = f"{level['mb_per_session']:>9.1f}" if pid else f"{'-':>9}"
+        cpu = f"{level['cpu_ms_per_run']:>10.0f}" if pid else f"{'-':>10}"
+        print(f"{users:>6} {level['sessions']:>8} {level['runs']:>5} {level['runs_per_s']:>7.2f} "
+              f"{level['p50_ms']:>8.0f} {level['p95_ms']:>8.0f} {level['p99_ms']:>8.0f} {memory} {cpu} "
+              f"{len(level['errors']):>6}")
+        if args.steps:
+            for step, values in level["steps"].items():
+                print(f"{'':>6} {step:>20}: {values['count']:>4} x, p50 {values['p50_ms']:>7.0f} ms, "
+                      f"p95 {values['p95_ms']:>7.0f} ms")
+        for error in level["errors"][:3]:
+            print(f"{'':>6} errore: {error.splitlines()[0] if error else '?'}")
+    return levels
+
+
+def check_client():
+    """
+    Exit with a readable message if the client dependencies are missing.
+    """
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        sys.exit("bench_load.py needs the 'websockets' package: pip install -r requirements-dev.txt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8], help="Concurrency levels.")
+    parser.add_argument("--rounds", type=int, default=2, help="Sessions per concurrent user at each level.")
+    parser.add_argument("--upload-ratio", type=float, default=0.5, help="Share of users uploading a catalog.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="Base URL of a running server, instead of starting one.")
+    parser.add_argument("--port", type=int, help="Port of the started server (default: a free one).")
+    parser.add_argument("--steps", action="store_true", help="Also print the latency of each step.")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+    check_client()
+
+    if args.url:
+        levels = asyncio.run(run_levels(args.url, args))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            store_url = "sqlite:///" + os.path.join(directory, "load.sqlite3")
+            process, url = start_server(store_url, args.port or free_port())
+            try:
+                levels = asyncio.run(run_levels(url, args, process.pid))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"url": args.url, "rounds": args.rounds, "upload_ratio": args.upload_ratio, "levels": levels},
+                      f, indent=2)
+    return 1 if any(level["errors"] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
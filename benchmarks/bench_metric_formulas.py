@@ -0,0 +1,76 @@
+"""
+Benchmark per-metric formula resolution as the number of rules grows.
+
+Builds registries with the built-in rules plus N synthetic "contains" rules
+and times uncached resolution of a fixed sample of metric names, comparing
+the trie-based registry with a linear scan over the same rules (the cost
+model of the former if/elif chain). The last column times the n-gram
+similarity suggestion used for unmatched metrics.
+
+Usage:
+    python benchmarks/bench_metric_formulas.py [--rules 10 100 1000 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metric_formulas import BUILTIN_RULES_PATH, FormulaRegistry, normalize_metric, read_rules  # noqa: E402
+
+WORDS = ["tasso", "indice", "costo", "tempo", "numero", "clienti", "ordini", "ricavi", "margine",
+         "rischio", "qualità", "volume", "ritorno", "utenti", "errori", "incidenti", "medio", "%"]
+
+
+def synthetic_rules(count, rng):
+    rules = []
+    for i in range(count):
+        pattern = " ".join(rng.sample(WORDS, 2)) + f" {i:05d}"
+        rules.append({"match": "contains", "pattern": pattern, "formula": r"\text{X}", "example": "-"})
+    return rules
+
+
+def linear_match(rules, metric):
+    name = normalize_metric(metric)
+    for rule in rules:
+        pattern = normalize_metric(rule["pattern"])
+        if (rule["match"] == "exact" and name == pattern) or (rule["match"] == "contains" and pattern in name):
+            return rule
+    return None
+
+
+def time_per_call(func, names, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name in names:
+            func(name)
+        best = min(best, time.perf_counter() - start)
+    return best / len(names) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--metrics", type=int, default=2000, help="Metric names resolved per measurement.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    builtin = read_rules(BUILTIN_RULES_PATH)
+    print(f"{'rules':>8} {'registry µs/metric':>20} {'linear µs/metric':>18} {'suggest µs/metric':>19}")
+    for count in args.rules:
+        rules = builtin + synthetic_rules(count, rng)
+        registry = FormulaRegistry(rules)
+        names = [" ".join(rng.choices(WORDS, k=3)) + f" {rng.randrange(count * 2):05d}" for _ in range(args.metrics)]
+        registry_us = time_per_call(registry.match, names)
+        linear_us = time_per_call(lambda name: linear_match(rules, name), names, repeat=1)
+        registry.similarity_index()
+        suggest_us = time_per_call(registry._suggest, names)
+        print(f"{len(rules):>8} {registry_us:>20.2f} {linear_us:>18.2f} {suggest_us:>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark the portfolio quadrant with tens of thousands of stored models.
+
+Fills a temporary database with synthetic models, then times the scoring of
+the whole portfolio (cold, served from the per-version cache, and refreshed
+after one more evaluation is saved) and, for each rendering mode, the
+construction of the figure and the size of the JSON payload sent to the
+browser. SVG and WebGL send the same data: they differ in the browser, where
+SVG creates one DOM node per point and WebGL draws on a single canvas.
+
+Usage:
+    python benchmarks/bench_portfolio.py [--models 50000] [--raters 2]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation_store import SQLiteEvaluationStore  # noqa: E402
+from portfolio import get_portfolio, portfolio_figure, rendering_mode  # noqa: E402
+from questionnaire import get_scenario  # noqa: E402
+
+
+def time_ms(func, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", type=int, default=50000)
+    parser.add_argument("--raters", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    objectives = {scenario: get_scenario(scenario).question_objectives for scenario in (None, "Churn")}
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SQLiteEvaluationStore(os.path.join(directory, "bench.sqlite3"))
+        start = time.perf_counter()
+        for i in range(args.models):
+            scenario = rng.choice([None, "Churn"])
+            model_id = store.save_model(f"Modello {i}", "Descrizione sintetica", scenario=scenario)
+            store.save_evaluations(model_id, {
+                f"Valutatore {r}": {question: rng.randint(1, 7) for question in objectives[scenario]}
+                for r in range(args.raters)
+            }, objectives[scenario])
+        print(f"write: {args.models} models x {args.raters} raters in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        frame = get_portfolio(store)
+        print(f"{'portfolio (cold)':>20}: {(time.perf_counter() - start) * 1000:9.2f} ms")
+        print(f"{'portfolio (cached)':>20}: {time_ms(lambda: get_portfolio(store), repeat=20):9.2f} ms")
+        store.save_evaluations(1, {"Valutatore extra": {question: 7 for question in objectives[None]}}, objectives[None])
+        start = time.perf_counter()
+        get_portfolio(store)
+        print(f"{'portfolio (1 saved)':>20}: {(time.perf_counter() - start) * 1000:9.2f} ms")
+        store.close()
+
+    print(f"automatic mode for {len(frame)} models: {rendering_mode(len(frame))}")
+    for mode in ("svg", "webgl", "density"):
+        figure = time_ms(lambda: portfolio_figure(frame, highlight=(50.0, 50.0), mode=mode))
+        payload = portfolio_figure(frame, highlight=(50.0, 50.0), mode=mode).to_json()
+        print(f"{mode:>20}: figure {figure:9.2f} ms, payload {len(payload) / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
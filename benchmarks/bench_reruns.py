@@ -0,0 +1,155 @@
+"""
+Benchmark the server cost of the interactions on the results page.
+
+Starts the app with `streamlit run` and drives one session through a fixed
+sequence of interactions with the websocket client of `bench_load.py`, as
+a browser would: a widget inside a fragment reruns that fragment only. For
+each interaction it reports:
+
+- the script runs and the fragment runs it triggered, from the status of
+  every run the server finished;
+- the wall time until the last of them finished;
+- the CPU time the server process spent meanwhile.
+
+Interactions:
+
+- results (cold): first render of "Risultati", which builds the charts;
+- objective / page size: widgets of the KPI listing;
+- results (warm): "Risultati" again, served from the chart cache;
+- second rater: a new evaluation, whose charts are not cached yet.
+
+Each repetition starts a new server, with an empty temporary store, so
+that every "cold" interaction is cold. Nothing is read from the app
+itself: run the script on the revisions before and after a change and
+compare the JSON outputs. The CPU time is read from /proc in clock ticks
+(10 ms on most systems), so it is averaged over the repetitions; the wall
+time is their median.
+
+Usage:
+    python benchmarks/bench_reruns.py [--repeat 5] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from bench_load import Session, check_client, free_port, process_stats, start_server
+
+
+async def navigate(session, page):
+    session.set("radio", "Naviga", string_value=page)
+    await session.run(page)
+
+
+async def objective(session):
+    session.set("radio", "Obiettivo di Business",
+                string_value=session.options["radio", "Obiettivo di Business"][-1])
+    await session.run("objective")
+
+
+async def page_size(session):
+    session.set("selectbox", "Indicatori per pagina", string_value="50")
+    await session.run("page size")
+
+
+async def second_rater(session):
+    await navigate(session, "Valutazione")
+    session.set("text_input", "Nome del Valutatore", string_value="Valutatore 2")
+    session.set("slider", session.labels("slider")[0], double_array_value={"data": [7]})
+    await session.run("second rater", trigger="Invia Valutazione")
+    session.expect("Valutazione inviata")
+
+
+INTERACTIONS = (
+    ("results (cold)", lambda session: navigate(session, "Risultati")),
+    ("objective", objective),
+    ("page size", page_size),
+    ("evaluation page", lambda session: navigate(session, "Valutazione")),
+    ("results (warm)", lambda session: navigate(session, "Risultati")),
+    ("second rater", second_rater),
+    ("results (new evaluation)", lambda session: navigate(session, "Risultati")),
+)
+
+
+async def run_session(url, pid):
+    """
+    Save a model and a first evaluation, then measure every interaction.
+
+    Returns:
+        dict: Interaction -> wall time, CPU time and runs per scope.
+    """
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    session = Session(url)
+    await session.open()
+    try:
+        await session.run("apertura")
+        await session.run("input", trigger="Salva Descrizione")
+        session.expect("salvati con successo")
+        await navigate(session, "Valutazione")
+        session.set("text_input", "Nome del Valutatore", string_value="Valutatore 1")
+        await session.run("valutazione", trigger="Invia Valutazione")
+        session.expect("Valutazione inviata")
+
+        measures = {}
+        for name, interact in INTERACTIONS:
+            statuses = len(session.statuses)
+            cpu = process_stats(pid)[1]
+            start = time.perf_counter()
+            await interact(session)
+            wall = time.perf_counter() - start
+            runs = session.statuses[statuses:]
+            if session.errors:
+                raise RuntimeError(f"{name}: {session.errors[0]}")
+            fragment_runs = runs.count(ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+            measures[name] = {
+                "wall_s": wall, "cpu_s": process_stats(pid)[1] - cpu,
+                "script_runs": len(runs) - fragment_runs, "fragment_runs": fragment_runs,
+            }
+        return measures
+    finally:
+        await session.close()
+
+
+def run_once():
+    with tempfile.TemporaryDirectory() as directory:
+        process, url = start_server("sqlite:///" + os.path.join(directory, "reruns.sqlite3"), free_port())
+        try:
+            return asyncio.run(run_session(url, process.pid))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of the interaction sequence.")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+    check_client()
+
+    runs = [run_once() for _ in range(args.repeat)]
+    results = {
+        name: {
+            "wall_s": statistics.median(run[name]["wall_s"] for run in runs),
+            "cpu_s": statistics.mean(run[name]["cpu_s"] for run in runs),
+            "script_runs": statistics.median(run[name]["script_runs"] for run in runs),
+            "fragment_runs": statistics.median(run[name]["fragment_runs"] for run in runs),
+        }
+        for name in runs[0]
+    }
+    print(f"{'interaction':>26} {'wall ms':>9} {'cpu ms':>9} {'script':>7} {'fragment':>9}")
+    for name, values in results.items():
+        print(f"{name:>26} {1000 * values['wall_s']:>9.1f} {1000 * values['cpu_s']:>9.1f} "
+              f"{values['script_runs']:>7g} {values['fragment_runs']:>9g}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Benchmark the cold start of the app.
+
+Each measurement runs in a fresh interpreter, as a new worker would, and
+reports:
+
+- import: time to import Streamlit and then the app module (bare mode);
+- first page: time until the default page ("Input Modello AI") has been
+  rendered, measured with Streamlit's headless AppTest;
+- results page: time to render "Risultati" right after, on the same worker,
+  which pays the deferred imports of the charting stack;
+- which heavy modules the first page left loaded (ideally none), besides
+  those Streamlit imports itself (it loads plotly.graph_objects whenever
+  Plotly is installed).
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--budget-first-page 3.0] [--json out.json]
+
+With a budget, the script exits with status 1 if the median first-page time
+exceeds it, so it can guard container cold start in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_app.py")
+
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib.pyplot", "plotly.graph_objects")
+
+IMPORT_PROBE = """
+import sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import streamlit
+streamlit_done = time.perf_counter()
+import streamlit_app
+app_done = time.perf_counter()
+print(streamlit_done - start, app_done - streamlit_done)
+"""
+
+RENDER_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+preloaded = set(sys.modules)
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.run()
+first_page = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules and name not in preloaded]
+at.sidebar.radio[0].set_value("Input Modello AI").run()
+at.button[0].click().run()
+at.sidebar.radio[0].set_value("Valutazione").run()
+at.button[0].click().run()
+start = time.perf_counter()
+at.sidebar.radio[0].set_value("Risultati").run()
+results_page = time.perf_counter() - start
+assert not at.exception, at.exception
+print(json.dumps({{"first_page": first_page, "results_page": results_page, "loaded": loaded}}))
+"""
+
+
+def run_probe(code, env=None):
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT, check=True, capture_output=True, text=True, env=env
+    ).stdout
+    return output.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement.")
+    parser.add_argument("--budget-first-page", type=float, help="Maximum median first-page time, in seconds.")
+    parser.add_argument("--json", help="Write the medians to this JSON file.")
+    args = parser.parse_args()
+
+    streamlit_times, app_times, first_pages, results_pages, loaded = [], [], [], [], set()
+    with tempfile.TemporaryDirectory() as directory:
+        for repetition in range(args.repeat):
+            streamlit_time, app_time = map(float, run_probe(IMPORT_PROBE.format(root=ROOT)).split())
+            streamlit_times.append(streamlit_time)
+            app_times.append(app_time)
+            # The probe saves a model and an evaluation: an empty store per
+            # run, so that the real one is untouched and every run starts alike
+            store = "sqlite:///" + os.path.join(directory, f"startup-{repetition}.sqlite3")
+            env = dict(os.environ, VALORE_AI_STORE_URL=store)
+            render = json.loads(run_probe(RENDER_PROBE.format(app=APP, heavy=HEAVY_MODULES), env=env))
+            first_pages.append(render["first_page"])
+            results_pages.append(render["results_page"])
+            loaded.update(render["loaded"])
+
+    results = {
+        "import_streamlit_s": statistics.median(streamlit_times),
+        "import_app_s": statistics.median(app_times),
+        "first_page_s": statistics.median(first_pages),
+        "results_page_s": statistics.median(results_pages),
+        "heavy_modules_after_first_page": sorted(loaded),
+    }
+    for name, value in results.items():
+        print(f"{name:>32}: {value:.3f}" if isinstance(value, float) else f"{name:>32}: {', '.join(value) or '-'}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.budget_first_page is not None and results["first_page_s"] > args.budget_first_page:
+        print(f"First page took {results['first_page_s']:.3f}s, over the {args.budget_first_page:.3f}s budget.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
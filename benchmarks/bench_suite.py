@@ -0,0 +1,284 @@
+"""
+Micro-benchmark suite of the pure functions behind the app.
+
+Generates synthetic KPI catalogs and response sets from a fixed seed, times
+each function on them and reports the median time, the throughput and the
+peak memory allocated during one run (measured with tracemalloc, in a
+separate run so that tracing does not slow the timed ones; buffers allocated
+outside Python and NumPy, such as Arrow's, are not counted). Everything is
+generated locally: the suite runs offline.
+
+Cases, each run for every size of its input:
+
+- catalog_parse: `parse_kpi_upload` of a CSV catalog (what `load_kpi_data`
+  does with an upload);
+- catalog_build: `build_catalog` and the `KpiCatalog` index;
+- catalog_listing: the lookups of the "Risultati" listing for three
+  relevant objectives (`tipi`, `rows`, `indicator`);
+- overall_scores: `calculate_overall_scores`, one call per assessment;
+- score_matrix: batched scoring of a response set;
+- results_aggregation: `reports.build_report`, the scoring, relevant
+  objectives, indicators and formulas shown by `show_results`, on a
+  1,000-row catalog of the scenario objectives;
+- formula_resolution: uncached `FormulaRegistry.resolve` of distinct metric
+  names, with the similarity suggestion for unmatched ones.
+
+Results are written as JSON with `--json`; `--compare` reads a previous
+JSON file and exits with status 1 if a case got slower (both its fastest
+and its median run), or allocated more, by more than `--threshold`. Only the times of cases taking
+at least 1 ms in the baseline, and timed at least 5 times in both runs, are
+compared; the others are marked "~" and do not fail the comparison.
+
+Usage:
+    python benchmarks/bench_suite.py [--full] [--json out.json] [--compare base.json] [--threshold 0.1]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_catalog_index import synthetic_catalog  # noqa: E402
+from catalog_store import KpiCatalog, build_catalog, parse_kpi_upload  # noqa: E402
+from metric_formulas import load_registry  # noqa: E402
+from questionnaire import get_scenario  # noqa: E402
+from reports import build_report  # noqa: E402
+from scoring import calculate_overall_scores, score_matrix  # noqa: E402
+
+CATALOG_ROWS = (10, 1_000, 100_000)
+CATALOG_ROWS_FULL = (10, 1_000, 100_000, 1_000_000)
+RESPONSES = (1, 100, 10_000)
+RESPONSES_FULL = (1, 100, 10_000, 100_000)
+
+# Largest response set scored one call at a time; beyond it the Python loop
+# only adds run time.
+OVERALL_SCORES_MAX = 1_000
+
+RELEVANT_OBJECTIVES = ["Obiettivo 0", "Obiettivo 1", "Obiettivo 2"]
+
+# Peak allocations below this size are too small to compare reliably.
+MEMORY_FLOOR_MB = 0.1
+
+# Cases faster than this, in the baseline, vary by tens of percent from one
+# run to the next (timer resolution, caches, frequency scaling): their time
+# is reported but never counted as a regression.
+TIME_FLOOR_S = 1e-3
+
+# Timed runs a case needs, in the baseline and in the new results, before
+# its time can count as a regression.
+MIN_SAMPLES = 5
+
+
+def synthetic_responses(count, scenario=None, seed=0):
+    """
+    Build a response set of `count` assessments answering every question of
+    a scenario with uniform scores from 1 to 7.
+    """
+    questions = get_scenario(scenario).question_list
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.integers(1, 8, (count, len(questions))).astype(np.float64), columns=list(questions))
+
+
+def scenario_catalog(rows, scenario=None, seed=0):
+    """
+    Build a synthetic catalog whose business objectives are those of a
+    scenario, so that its indicators are listed for an evaluation.
+    """
+    frame = synthetic_catalog(rows, seed=seed)
+    objectives = get_scenario(scenario).objectives
+    mapping = {f"Obiettivo {i}": objectives[i % len(objectives)] for i in range(12)}
+    frame["Business Objective"] = frame["Business Objective"].map(mapping)
+    return frame
+
+
+def synthetic_metric_names(count, seed=0):
+    """
+    Build distinct metric names from words common in the built-in rules.
+    """
+    rng = np.random.default_rng(seed)
+    words = ["tasso", "indice", "costo", "tempo", "numero", "clienti", "ordini", "ricavi", "margine",
+             "rischio", "qualità", "volume", "ritorno", "utenti", "errori", "incidenti", "medio", "%"]
+    return [" ".join(rng.choice(words, 3)) + f" {i}" for i in range(count)]
+
+
+def cases(catalog_sizes, response_sizes, seed):
+    """
+    Yield (name, size, items, setup, run) for every case and size; `setup`
+    builds the input (not timed) and `run(input)` is the timed call.
+    """
+    for rows in catalog_sizes:
+        yield ("catalog_parse", rows, rows,
+               lambda rows=rows: synthetic_catalog(rows, seed=seed).to_csv(index=False).encode("utf-8"),
+               lambda data: parse_kpi_upload(data, "catalog.csv"))
+        yield ("catalog_build", rows, rows,
+               lambda rows=rows: synthetic_catalog(rows, seed=seed),
+               lambda frame: KpiCatalog(build_catalog(frame)))
+        yield ("catalog_listing", rows, rows,
+               lambda rows=rows: KpiCatalog(build_catalog(synthetic_catalog(rows, seed=seed))),
+               list_indicators)
+
+    for count in response_sizes:
+        if count <= OVERALL_SCORES_MAX:
+            yield ("overall_scores", count, count,
+                   lambda count=count: synthetic_responses(count, seed=seed).to_dict("records"),
+                   lambda records: [calculate_overall_scores(responses) for responses in records])
+        yield ("score_matrix", count, count,
+               lambda count=count: synthetic_responses(count, seed=seed),
+               lambda frame: score_matrix(frame, get_scenario()))
+
+    yield ("results_aggregation", 1_000, 1,
+           lambda: (KpiCatalog(build_catalog(scenario_catalog(1_000, seed=seed))), load_registry(),
+                    dict.fromkeys(get_scenario().question_list, 6.0)),
+           aggregate_results)
+    for count in (100, 10_000):
+        yield ("formula_resolution", count, count,
+               lambda count=count: (load_registry(), synthetic_metric_names(count, seed=seed)),
+               resolve_formulas)
+
+
+def list_indicators(catalog):
+    entries = 0
+    for objective in RELEVANT_OBJECTIVES:
+        for tipo in catalog.tipi(objective):
+            for row in catalog.rows(objective, tipo).tolist():
+                entries += len(catalog.indicator(row)[2])
+    return entries
+
+
+def aggregate_results(inputs):
+    catalog, formulas, responses = inputs
+    formulas.resolve.cache_clear()
+    formulas.suggest.cache_clear()
+    model = {"id": 1, "name": "Modello", "description": "", "scenario": None}
+    return build_report(model, {"Valutatore": responses}, catalog, formulas)
+
+
+def resolve_formulas(inputs):
+    formulas, names = inputs
+    formulas.resolve.cache_clear()
+    formulas.suggest.cache_clear()
+    for name in names:
+        if formulas.resolve(name).pattern is None:
+            formulas.suggest(name)
+
+
+def measure(setup, run, repeat, budget_s):
+    data = setup()
+    run(data)  # Warm up: imports and lazily built indexes
+    samples = []
+    # As timeit does, keep the collector from adding its pauses to the runs
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        while len(samples) < repeat or (time.perf_counter() - start < budget_s and len(samples) < 5 * repeat):
+            begin = time.perf_counter()
+            run(data)
+            samples.append(time.perf_counter() - begin)
+    finally:
+        gc.enable()
+    tracemalloc.start()
+    try:
+        run(data)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return samples, peak
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the changes against a baseline and return the regressed cases.
+
+    Args:
+        results (dict): Results by case, as written under "results".
+        baseline (dict): Results of the baseline run, alike.
+        threshold (float): Relative slowdown, of the fastest and the median
+            run, or growth of the peak memory, counted as a regression.
+
+    Returns:
+        list: Keys of the regressed cases.
+    """
+    regressions = []
+    print(f"\n{'case':>34} {'time':>9} {'memory':>8}")
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        # The fastest run is the least disturbed by other processes; a real
+        # slowdown also moves the median, which a single lucky run does not
+        time_ratio = result["min_s"] / base["min_s"] if base["min_s"] else 1.0
+        median_ratio = result["median_s"] / base["median_s"] if base["median_s"] else 1.0
+        timed = (base["min_s"] >= TIME_FLOOR_S
+                 and min(base.get("runs", 0), result.get("runs", 0)) >= MIN_SAMPLES)
+        memory_ratio = result["peak_mb"] / base["peak_mb"] if base["peak_mb"] > MEMORY_FLOOR_MB else 1.0
+        flag = ""
+        if (timed and min(time_ratio, median_ratio) > 1 + threshold) or memory_ratio > 1 + threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:>34} {time_ratio - 1:>+8.1%}{' ' if timed else '~'} {memory_ratio - 1:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="Include the 1M-row catalogs and 100k response sets.")
+    parser.add_argument("--catalog-rows", type=int, nargs="+", help="Catalog sizes, instead of the defaults.")
+    parser.add_argument("--responses", type=int, nargs="+", help="Response set sizes, instead of the defaults.")
+    parser.add_argument("--case", nargs="+", help="Only run these cases.")
+    parser.add_argument("--repeat", type=int, default=MIN_SAMPLES, help="Minimum timed runs per case.")
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconds per case spent on extra runs.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown counted as a regression.")
+    args = parser.parse_args()
+
+    catalog_sizes = args.catalog_rows or (CATALOG_ROWS_FULL if args.full else CATALOG_ROWS)
+    response_sizes = args.responses or (RESPONSES_FULL if args.full else RESPONSES)
+
+    results = {}
+    print(f"{'case':>34} {'median ms':>11} {'items/s':>12} {'peak MB':>9}")
+    for name, size, items, setup, run in cases(catalog_sizes, response_sizes, args.seed):
+        if args.case and name not in args.case:
+            continue
+        samples, peak = measure(setup, run, args.repeat, args.budget)
+        median = statistics.median(samples)
+        key = f"{name}[{size}]"
+        results[key] = {
+            "median_s": median, "min_s": min(samples), "runs": len(samples),
+            "items": items, "throughput": items / median if median else float("inf"), "peak_mb": peak / 1e6,
+        }
+        print(f"{key:>34} {1000 * median:>11.3f} {results[key]['throughput']:>12.0f} {peak / 1e6:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "meta": {
+                    "python": platform.python_version(), "platform": platform.platform(),
+                    "numpy": np.__version__, "pandas": pd.__version__, "seed": args.seed,
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                },
+                "results": results,
+            }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressioni oltre il {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
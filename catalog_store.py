@@ -0,0 +1,640 @@
+"""
+Process-wide store for parsed KPI/KQI/KRI catalogs.
+
+Every Streamlit session used to parse its own copy of the uploaded catalog
+and keep the resulting DataFrame in its session state. The store parses each
+distinct catalog once per process, keyed by a content hash of the upload plus
+the scenario, and hands sessions a small `CatalogHandle` instead of a copy.
+Entries are evicted in least-recently-used order once the configured memory
+budget is exceeded.
+
+Each catalog is normalized once, when it is loaded, into a `KpiCatalog`:
+categorical columns, an exploded metric table and a prebuilt
+(objective, tipo) -> rows index, so that rendering the results is a set of
+direct lookups instead of repeated boolean filters and string splits.
+
+Catalogs returned by the store are shared between sessions and must be
+treated as read-only.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import CATALOG_ROWS, observe, timed
+from questionnaire import get_scenario
+
+REQUIRED_COLUMNS = ("Business Objective", "Tipo", "Categoria", "Focus", "Metriche")
+CATEGORICAL_COLUMNS = ("Business Objective", "Tipo", "Categoria", "Focus")
+
+# Uploaded file extensions and the reader used for each of them.
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+# Number of CSV rows parsed at a time when streaming an upload.
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Separator of the metrics listed in the "Metriche" column.
+METRIC_SEPARATOR = ", "
+
+# Memory budget of the process-wide store, in megabytes.
+DEFAULT_CACHE_MB = 256
+
+
+class MissingColumnsError(ValueError):
+    """
+    Raised when an uploaded catalog lacks one or more required columns.
+
+    Attributes:
+        missing (list): Names of the required columns that were not found.
+    """
+
+    def __init__(self, missing):
+        self.missing = sorted(missing)
+        super().__init__(f"Colonne mancanti: {', '.join(self.missing)}")
+
+
+@dataclass(frozen=True)
+class CatalogHandle:
+    """
+    Lightweight reference to a catalog held by the `CatalogStore`.
+
+    Attributes:
+        key (str): Store key, derived from the upload content and scenario.
+        scenario (str or None): Scenario the catalog was built for.
+        uploaded (bool): Whether the catalog comes from a user upload. Default
+            catalogs can always be rebuilt; uploads cannot once evicted.
+    """
+    key: str
+    scenario: str = None
+    uploaded: bool = False
+
+
+def _check_columns(columns):
+    missing = set(REQUIRED_COLUMNS) - set(columns)
+    if missing:
+        raise MissingColumnsError(missing)
+
+
+def compact_dtypes(df):
+    """
+    Restrict a catalog to the required columns with compact dtypes.
+
+    The low-cardinality columns become categoricals; `Metriche` stays a string.
+
+    Args:
+        df (pd.DataFrame): Catalog with at least the required columns.
+
+    Returns:
+        pd.DataFrame: A new frame holding only `REQUIRED_COLUMNS`.
+    """
+    df = df.loc[:, list(REQUIRED_COLUMNS)].astype("string")
+    return df.astype({column: "category" for column in CATEGORICAL_COLUMNS})
+
+
+def detect_format(data, filename=None):
+    """
+    Guess the format of an uploaded catalog.
+
+    The file extension wins when present; otherwise Parquet and Arrow files
+    are recognised by their magic bytes and everything else is read as CSV.
+
+    Args:
+        data (bytes): Content of the uploaded file.
+        filename (str, optional): Name of the uploaded file.
+
+    Returns:
+        str: One of "csv", "parquet" or "arrow".
+    """
+    if filename:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in FILE_FORMATS:
+            return FILE_FORMATS[extension]
+    if data[:4] == b"PAR1":
+        return "parquet"
+    if data[:6] == b"ARROW1":
+        return "arrow"
+    return "csv"
+
+
+def _report(progress, fraction):
+    if progress is not None:
+        progress(min(max(fraction, 0.0), 1.0))
+
+
+def _read_csv(data, progress=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    # Parse the header alone first so that a malformed export is rejected
+    # before any row is read.
+    header = pd.read_csv(io.BytesIO(data), nrows=0)
+    _check_columns(header.columns)
+
+    buffer = io.BytesIO(data)
+    reader = pd.read_csv(buffer, usecols=list(REQUIRED_COLUMNS), dtype="string", chunksize=chunk_rows)
+    chunks = []
+    with reader:
+        for chunk in reader:
+            chunks.append(compact_dtypes(chunk))
+            _report(progress, buffer.tell() / max(len(data), 1))
+    if not chunks:
+        return compact_dtypes(header.astype("string"))
+    return _concat(chunks)
+
+
+def _read_parquet(data, progress=None):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Il supporto ai file Parquet richiede il pacchetto 'pyarrow'.") from e
+
+    parquet_file = pq.ParquetFile(pa.BufferReader(data))
+    _check_columns(parquet_file.schema_arrow.names)
+    tables = []
+    for index in range(parquet_file.num_row_groups):
+        tables.append(parquet_file.read_row_group(index, columns=list(REQUIRED_COLUMNS)))
+        _report(progress, (index + 1) / parquet_file.num_row_groups)
+    if not tables:
+        return compact_dtypes(parquet_file.schema_arrow.empty_table().to_pandas())
+    return compact_dtypes(pa.concat_tables(tables).to_pandas())
+
+
+def _read_arrow(data, progress=None):
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+    except ImportError as e:
+        raise ValueError("Il supporto ai file Arrow richiede il pacchetto 'pyarrow'.") from e
+
+    source = pa.BufferReader(data)
+    if data[:6] == b"ARROW1":
+        reader = ipc.open_file(source)
+        _check_columns(reader.schema.names)
+        batches = []
+        for index in range(reader.num_record_batches):
+            batches.append(reader.get_batch(index).select(list(REQUIRED_COLUMNS)))
+            _report(progress, (index + 1) / reader.num_record_batches)
+    else:
+        reader = ipc.open_stream(source)
+        _check_columns(reader.schema.names)
+        batches = [batch.select(list(REQUIRED_COLUMNS)) for batch in reader]
+    schema = pa.schema([reader.schema.field(column) for column in REQUIRED_COLUMNS])
+    return compact_dtypes(pa.Table.from_batches(batches, schema=schema).to_pandas())
+
+
+def _concat(frames):
+    # Categoricals with differing categories would be upcast to object by
+    # pd.concat, so the categories are unified first.
+    for column in CATEGORICAL_COLUMNS:
+        union = pd.api.types.union_categoricals([frame[column] for frame in frames], ignore_order=True)
+        for frame in frames:
+            frame[column] = frame[column].cat.set_categories(union.categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+@timed()
+def parse_kpi_upload(data, filename=None, progress=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Parse an uploaded KPI/KQI/KRI catalog (CSV, Parquet or Arrow).
+
+    The header (or schema) is validated before any row is read, so files
+    lacking required columns are rejected immediately. CSV files are then
+    streamed in bounded chunks; Parquet and Arrow files are read column-wise
+    without text parsing. Only `REQUIRED_COLUMNS` are kept, with compact dtypes.
+
+    Args:
+        data (bytes): Content of the uploaded file.
+        filename (str, optional): Name of the uploaded file, used to detect its format.
+        progress (callable, optional): Called with the fraction read so far (0.0-1.0).
+        chunk_rows (int, optional): Number of CSV rows parsed per chunk.
+
+    Returns:
+        pd.DataFrame: The parsed catalog.
+
+    Raises:
+        MissingColumnsError: If any of `REQUIRED_COLUMNS` is missing.
+    """
+    file_format = detect_format(data, filename)
+    if file_format == "parquet":
+        df = _read_parquet(data, progress)
+    elif file_format == "arrow":
+        df = _read_arrow(data, progress)
+    else:
+        df = _read_csv(data, progress, chunk_rows)
+    _report(progress, 1.0)
+    return df
+
+
+@timed()
+def build_catalog(base_df, scenario=None):
+    """
+    Merge scenario-specific indicators into a base catalog.
+
+    Args:
+        base_df (pd.DataFrame): The base catalog (default or uploaded).
+        scenario (str, optional): Scenario whose additional indicators are
+            merged in (e.g. "Churn" adds the churn-focused KPIs).
+
+    Returns:
+        pd.DataFrame: The catalog for the given scenario, with compact dtypes.
+    """
+    frames = [compact_dtypes(base_df)]
+    extra_rows = get_scenario(scenario).extra_kpi_rows
+    if extra_rows:
+        frames.append(compact_dtypes(pd.DataFrame([dict(row) for row in extra_rows])))
+    if len(frames) == 1:
+        return frames[0]
+    return _concat(frames)
+
+
+def _decode(column, row):
+    codes, categories = column
+    code = codes[row]
+    return categories[code] if code >= 0 else None
+
+
+class KpiCatalog:
+    """
+    KPI/KQI/KRI catalog normalized for fast lookups.
+
+    Built once per catalog by the store. Besides the categorical frame it
+    holds:
+
+    - an exploded metric table: the metric names of every row, stored as
+      categorical codes in CSR layout (row i owns codes
+      `metric_offsets[i]:metric_offsets[i + 1]`);
+    - an index mapping each (objective, tipo) pair to its row positions,
+      in catalog order, and the tipi of each objective in order of appearance.
+
+    Args:
+        frame (pd.DataFrame): Catalog with compact dtypes, as returned by
+            `build_catalog`.
+    """
+
+    def __init__(self, frame):
+        frame = frame.reset_index(drop=True)
+        self.frame = frame
+
+        metric_lists = frame["Metriche"].fillna("").str.split(METRIC_SEPARATOR, regex=False)
+        lengths = metric_lists.str.len().to_numpy(dtype=np.int64)
+        self.metric_offsets = np.concatenate(([0], np.cumsum(lengths)))
+        metrics = pd.Categorical(metric_lists.explode().to_numpy(dtype=object))
+        self.metric_codes = metrics.codes
+        self.metric_names = np.asarray(metrics.categories, dtype=object)
+
+        self._categoria = (frame["Categoria"].cat.codes.to_numpy(), np.asarray(frame["Categoria"].cat.categories, dtype=object))
+        self._focus = (frame["Focus"].cat.codes.to_numpy(), np.asarray(frame["Focus"].cat.categories, dtype=object))
+        self._groups = {
+            key: positions
+            for key, positions in frame.groupby(["Business Objective", "Tipo"], observed=True, sort=False).indices.items()
+        }
+        self._pages = {}
+        self._tipi = {}
+        for objective, tipo in self._groups:
+            self._tipi.setdefault(objective, []).append(tipo)
+        for objective, tipi in self._tipi.items():
+            tipi.sort(key=lambda tipo: self._groups[(objective, tipo)][0])
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def objectives(self):
+        """
+        list: Business objectives present in the catalog.
+        """
+        return list(self._tipi)
+
+    def tipi(self, objective):
+        """
+        Return the tipi (KPI/KQI/KRI) of an objective, in order of appearance.
+
+        Args:
+            objective (str): Business objective.
+
+        Returns:
+            list: The tipi with at least one indicator for the objective.
+        """
+        return self._tipi.get(objective, [])
+
+    def rows(self, objective, tipo):
+        """
+        Return the row positions of the indicators of an (objective, tipo) pair.
+
+        Args:
+            objective (str): Business objective.
+            tipo (str): Tipo (KPI/KQI/KRI).
+
+        Returns:
+            np.ndarray: Row positions, in catalog order.
+        """
+        return self._groups.get((objective, tipo), np.empty(0, dtype=np.intp))
+
+    def metric_count(self, rows):
+        """
+        Return the number of metrics of each indicator.
+
+        Args:
+            rows (np.ndarray): Row positions.
+
+        Returns:
+            np.ndarray: Number of metrics per row.
+        """
+        return self.metric_offsets[rows + 1] - self.metric_offsets[rows]
+
+    def pages(self, objective, page_size, element_budget, indicator_cost=2, metric_cost=3):
+        """
+        Split the indicators of an objective into pages.
+
+        Indicators are ordered by tipo (in order of appearance), then by
+        catalog order. A page holds at most `page_size` indicators and, past
+        its first indicator, at most `element_budget` rendered elements, an
+        indicator costing `indicator_cost + metric_cost * metrics`. Results
+        are memoized on the (shared) catalog.
+
+        Args:
+            objective (str): Business objective.
+            page_size (int): Maximum number of indicators per page.
+            element_budget (int): Maximum number of elements per page.
+            indicator_cost (int, optional): Elements rendered per indicator.
+            metric_cost (int, optional): Elements rendered per metric.
+
+        Returns:
+            tuple: (rows, tipi, bounds) where rows are the ordered row
+            positions, tipi the tipo of each of them and bounds the list of
+            (start, end) slices of each page.
+        """
+        key = (objective, page_size, element_budget, indicator_cost, metric_cost)
+        cached = self._pages.get(key)
+        if cached is not None:
+            return cached
+
+        tipi = self.tipi(objective)
+        groups = [self.rows(objective, tipo) for tipo in tipi]
+        rows = np.concatenate(groups) if groups else np.empty(0, dtype=np.intp)
+        row_tipi = np.repeat(np.asarray(tipi, dtype=object), [len(group) for group in groups])
+        costs = indicator_cost + metric_cost * self.metric_count(rows)
+
+        bounds = []
+        start, used = 0, 0
+        for position, cost in enumerate(costs.tolist()):
+            if position > start and (position - start >= page_size or used + cost > element_budget):
+                bounds.append((start, position))
+                start, used = position, 0
+            used += cost
+        if len(rows):
+            bounds.append((start, len(rows)))
+
+        result = (rows, row_tipi, bounds)
+        self._pages[key] = result
+        return result
+
+    def indicator(self, row):
+        """
+        Return the details of an indicator.
+
+        Args:
+            row (int): Row position.
+
+        Returns:
+            tuple: (categoria, focus, metrics) where metrics is the list of
+            metric names of the indicator.
+        """
+        codes = self.metric_codes[self.metric_offsets[row]:self.metric_offsets[row + 1]]
+        return _decode(self._categoria, row), _decode(self._focus, row), self.metric_names[codes].tolist()
+
+    def memory_usage(self):
+        """
+        Return the memory held by the catalog, in bytes.
+
+        Returns:
+            int: Size of the frame, metric table and index.
+        """
+        return int(
+            self.frame.memory_usage(deep=True).sum()
+            + self.metric_offsets.nbytes
+            + self.metric_codes.nbytes
+            + sum(len(name.encode("utf-8")) for name in self.metric_names)
+            + sum(positions.nbytes for positions in self._groups.values())
+        )
+
+
+def content_key(data, scenario=None):
+    """
+    Compute the store key for an uploaded catalog.
+
+    Args:
+        data (bytes): Content of the uploaded file.
+        scenario (str, optional): Scenario the catalog is built for.
+
+    Returns:
+        str: Hex digest identifying the (content, scenario) pair.
+    """
+    digest = hashlib.sha256(data)
+    # A tag byte, so that no scenario name (not even "None") hashes like no scenario
+    digest.update(b"\0" if scenario is None else b"\1" + scenario.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def default_handle(scenario=None):
+    """
+    Return the handle of the built-in catalog for a scenario.
+
+    Args:
+        scenario (str, optional): Scenario the catalog is built for.
+
+    Returns:
+        CatalogHandle: Handle of the default catalog.
+    """
+    return CatalogHandle(key=f"default:{scenario}", scenario=scenario, uploaded=False)
+
+
+class CatalogStore:
+    """
+    Thread-safe LRU store of parsed catalogs bounded by a memory budget.
+
+    Args:
+        max_bytes (int): Memory budget for all cached catalogs. The most
+            recently inserted entry is always kept, even if it alone exceeds
+            the budget.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _insert(self, key, catalog):
+        nbytes = catalog.memory_usage()
+        observe(CATALOG_ROWS, len(catalog))
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key][0]
+            self._entries[key] = (catalog, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+            return catalog
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached catalog for `key`, calling `loader` on a miss.
+
+        Concurrent misses on the same key wait for a single load instead of
+        parsing the same catalog several times. Exceptions raised by `loader`
+        propagate and nothing is cached.
+
+        Args:
+            key (str): Store key.
+            loader (callable): Zero-argument function returning a `KpiCatalog`.
+
+        Returns:
+            KpiCatalog: The cached (shared, read-only) catalog.
+        """
+        catalog = self._lookup(key)
+        if catalog is not None:
+            return catalog
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            catalog = self._lookup(key)
+            if catalog is not None:
+                return catalog
+            with self._lock:
+                self.misses += 1
+            try:
+                return self._insert(key, loader())
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def load_upload(self, data, scenario=None, filename=None, progress=None):
+        """
+        Parse (or reuse) an uploaded catalog and return its handle.
+
+        Args:
+            data (bytes): Content of the uploaded file.
+            scenario (str, optional): Scenario the catalog is built for.
+            filename (str, optional): Name of the uploaded file, used to detect its format.
+            progress (callable, optional): Progress callback forwarded to
+                `parse_kpi_upload`; not called on a cache hit.
+
+        Returns:
+            CatalogHandle: Handle to pass to `resolve`.
+
+        Raises:
+            MissingColumnsError: If the upload lacks required columns.
+        """
+        key = content_key(data, scenario)
+        self.get_or_load(key, lambda: KpiCatalog(build_catalog(parse_kpi_upload(data, filename, progress), scenario)))
+        return CatalogHandle(key=key, scenario=scenario, uploaded=True)
+
+    def load_default(self, scenario=None):
+        """
+        Build (or reuse) the built-in catalog and return its handle.
+
+        Args:
+            scenario (str, optional): Scenario the catalog is built for.
+
+        Returns:
+            CatalogHandle: Handle to pass to `resolve`.
+        """
+        handle = default_handle(scenario)
+        self._get_default(handle)
+        return handle
+
+    def _get_default(self, handle):
+        base_rows = get_scenario(handle.scenario).base_kpi_rows
+        return self.get_or_load(
+            handle.key, lambda: KpiCatalog(build_catalog(pd.DataFrame([dict(row) for row in base_rows]), handle.scenario))
+        )
+
+    def resolve(self, handle):
+        """
+        Return the catalog behind a handle.
+
+        Default catalogs are rebuilt transparently if they were evicted.
+
+        Args:
+            handle (CatalogHandle): Handle returned by `load_upload` or `load_default`.
+
+        Returns:
+            KpiCatalog or None: The catalog, or None if an uploaded catalog
+            has been evicted and must be uploaded again.
+        """
+        if not handle.uploaded:
+            return self._get_default(handle)
+        return self._lookup(handle.key)
+
+    def stats(self):
+        """
+        Return the store counters.
+
+        Returns:
+            dict: Hits, misses, evictions, entry count and memory usage.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        """
+        Drop every cached catalog. Counters are left untouched.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_catalog_store():
+    """
+    Return the process-wide catalog store, creating it on first use.
+
+    The memory budget is read from the `VALORE_AI_CATALOG_CACHE_MB`
+    environment variable (default: 256).
+
+    Returns:
+        CatalogStore: The shared store.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                budget_mb = float(os.environ.get("VALORE_AI_CATALOG_CACHE_MB", DEFAULT_CACHE_MB))
+                _store = CatalogStore(max_bytes=int(budget_mb * 1024 * 1024))
+    return _store
@@ -0,0 +1,433 @@
+"""
+Charts of the evaluation results: the tangibility gauge and the Ease of
+Implementation vs Value Delivered quadrant.
+
+Templates build a chart once and only update its data for each evaluation,
+so that rendering many charts in a row (e.g. the batch report export) does
+not pay for the figure, axes, labels and quadrant lines every time:
+
+- `GaugeTemplate` keeps a Plotly gauge and updates its value;
+- `QuadrantTemplate` draws the static quadrant background once, keeps it as
+  a pixel buffer and blits only the marker for each PNG;
+- `GaugePlotTemplate` is a matplotlib rendering of the gauge, for outputs
+  Plotly cannot produce without extra dependencies (PDF).
+
+`quadrant_figure` is the vector alternative to the PNG quadrant: a Plotly
+figure of a few kilobytes that the browser draws itself.
+
+`tornado_figure` and `sensitivity_heatmap` chart the what-if analysis of an
+evaluation (see `scoring.sensitivity_sweep`).
+
+Templates are not thread-safe: use one per thread or process, or borrow one
+from the process-wide pool with `quadrant_template`.
+
+Matplotlib figures are created with `matplotlib.figure.Figure` and an Agg
+canvas, not through pyplot, so they are never registered in pyplot's global
+figure manager and are released with the template.
+"""
+import io
+import math
+import threading
+from contextlib import contextmanager
+
+# Color bands of the gauge, as (start, end, color) on the 0-100 scale.
+GAUGE_STEPS = ((0, 33, "lightgray"), (33, 66, "yellow"), (66, 100, "lightgreen"))
+
+# Quadrant labels, as (x, y, label).
+QUADRANT_LABELS = (
+    (20, 80, "Easy Value"),
+    (80, 80, "Moonshots"),
+    (20, 20, "Low Value"),
+    (80, 20, "Money Pits"),
+)
+
+QUADRANT_TITLE = "Ease of Implementation vs Value Delivered"
+QUADRANT_XLABEL = "Ease of Implementation (0-100)"
+QUADRANT_YLABEL = "Value Delivered (0-100)"
+
+# Size of the quadrant chart, in inches at `CHART_DPI` dots per inch.
+QUADRANT_SIZE = (6, 6)
+CHART_DPI = 100
+
+# Colors of the palette of PNG charts.
+PNG_COLORS = 64
+
+# Questions shown on the tornado chart, those with the widest range.
+TORNADO_BARS = 20
+
+# Characters of a question kept in the axis labels of the what-if charts.
+LABEL_LENGTH = 60
+
+
+def gauge_figure(score, title="Tangibility Score"):
+    """
+    Build the Plotly gauge of a score.
+
+    Args:
+        score (float): The score to be displayed on the gauge (0-100).
+        title (str, optional): Title of the gauge.
+
+    Returns:
+        plotly.graph_objects.Figure: The gauge.
+    """
+    import plotly.graph_objects as go
+
+    return go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=score,
+        title={'text': title},
+        gauge={
+            'axis': {'range': [0, 100]},
+            'bar': {'color': "darkblue"},
+            'steps': [{'range': [start, end], 'color': color} for start, end, color in GAUGE_STEPS],
+            'threshold': {'line': {'color': "red", 'width': 4}, 'thickness': 0.75, 'value': score}
+        }
+    ))
+
+
+class GaugeTemplate:
+    """
+    Plotly gauge built once and updated for each score.
+    """
+
+    def __init__(self):
+        self.figure = gauge_figure(0.0)
+
+    def update(self, score, title="Tangibility Score"):
+        """
+        Set the score and title of the gauge.
+
+        Args:
+            score (float): The score to be displayed on the gauge.
+            title (str, optional): Title of the gauge.
+
+        Returns:
+            plotly.graph_objects.Figure: The template figure, updated in place.
+        """
+        self.figure.update_traces(value=score, title_text=title, gauge_threshold_value=score)
+        return self.figure
+
+    def to_html(self, score, title="Tangibility Score", include_plotlyjs="cdn"):
+        """
+        Render the gauge of a score as an HTML fragment.
+
+        Args:
+            score (float): The score to be displayed on the gauge.
+            title (str, optional): Title of the gauge.
+            include_plotlyjs (str or bool, optional): How plotly.js is
+                included, as for `plotly.io.to_html`.
+
+        Returns:
+            str: A <div> with the chart.
+        """
+        import plotly.io as pio
+
+        return pio.to_html(self.update(score, title), include_plotlyjs=include_plotlyjs, full_html=False)
+
+
+def quadrant_layout(fig, height=None):
+    """
+    Add the static part of the quadrant chart to a Plotly figure: midlines,
+    labels, titles and axis ranges.
+
+    Args:
+        fig (plotly.graph_objects.Figure): Figure to update in place.
+        height (int, optional): Height of the figure in pixels.
+
+    Returns:
+        plotly.graph_objects.Figure: The figure.
+    """
+    fig.add_vline(x=50, line={"color": "grey", "dash": "dash"})  # Mid vertical line
+    fig.add_hline(y=50, line={"color": "grey", "dash": "dash"})  # Mid horizontal line
+    for x, y, label in QUADRANT_LABELS:
+        fig.add_annotation(x=x, y=y, text=f"<b>{label}</b>", showarrow=False, font={"size": 14})
+    fig.update_layout(
+        title=QUADRANT_TITLE, height=height, showlegend=False, plot_bgcolor="white",
+        xaxis={"title": QUADRANT_XLABEL, "range": [0, 100], "dtick": 10, "showgrid": False},
+        yaxis={"title": QUADRANT_YLABEL, "range": [0, 100], "dtick": 10, "showgrid": False},
+    )
+    return fig
+
+
+def quadrant_figure(ease_score, value_score):
+    """
+    Build the quadrant chart of a model as a Plotly figure.
+
+    Args:
+        ease_score (float): The ease of implementation score.
+        value_score (float): The value delivered score.
+
+    Returns:
+        plotly.graph_objects.Figure: The figure.
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Scatter(
+        x=[ease_score], y=[value_score], mode="markers", marker={"color": "red", "size": 14},
+        hovertemplate="Ease: %{x:.1f}<br>Value: %{y:.1f}<extra></extra>",
+    ))
+    return quadrant_layout(fig, height=600)
+
+
+def question_labels(questions, length=LABEL_LENGTH):
+    """
+    Build short, distinct axis labels for questions: their number and the
+    start of their text.
+
+    Args:
+        questions (list): The questions.
+        length (int, optional): Characters of a question kept.
+
+    Returns:
+        list: One label per question.
+    """
+    return [
+        f"D{number} · {question if len(question) <= length else question[:length - 1] + '…'}"
+        for number, question in enumerate(questions, start=1)
+    ]
+
+
+def tornado_figure(questions, low, high, score, bars=TORNADO_BARS):
+    """
+    Build the tornado chart of a score: for each question, the range the
+    score spans when that question alone is answered from 1 to 7.
+
+    Args:
+        questions (list): The questions.
+        low (np.ndarray): Lowest score reached per question.
+        high (np.ndarray): Highest score reached per question.
+        score (float): The score of the evaluation, marked by a line.
+        bars (int, optional): Questions shown, those with the widest range.
+
+    Returns:
+        plotly.graph_objects.Figure: The figure.
+    """
+    import numpy as np
+    import plotly.graph_objects as go
+
+    # Widest range last, so it is drawn at the top
+    order = np.argsort(high - low, kind="stable")[-bars:]
+    labels = question_labels(questions)
+    fig = go.Figure(go.Bar(
+        y=[labels[i] for i in order], x=(high - low)[order], base=low[order], orientation="h",
+        marker={"color": "darkblue"}, customdata=np.column_stack([low[order], high[order]]),
+        hovertemplate="%{y}<br>Da %{customdata[0]:.1f} a %{customdata[1]:.1f}<extra></extra>",
+    ))
+    fig.add_vline(x=score, line={"color": "red", "dash": "dash"})
+    fig.update_layout(
+        title="Sensibilità della Tangibility per domanda", height=120 + 24 * len(order), showlegend=False,
+        xaxis={"title": "Tangibility (0-100)"}, yaxis={"automargin": True}, plot_bgcolor="white",
+    )
+    return fig
+
+
+def sensitivity_heatmap(questions, values, deltas, title, notes=None):
+    """
+    Build the heatmap of the change of a score for every question and answer.
+
+    Args:
+        questions (list): The questions, one row each.
+        values (np.ndarray): The answers tried, one column each.
+        deltas (np.ndarray): Questions x values changes of the score.
+        title (str): Title of the chart.
+        notes (np.ndarray, optional): Questions x values strings, e.g. the
+            changes of the relevant objectives; cells with a note are
+            marked and the note is shown on hover.
+
+    Returns:
+        plotly.graph_objects.Figure: The figure.
+    """
+    import numpy as np
+    import plotly.graph_objects as go
+
+    if notes is None:
+        notes = np.full(deltas.shape, "", dtype=object)
+    bound = float(np.nanmax(np.abs(deltas))) or 1.0
+    fig = go.Figure(go.Heatmap(
+        z=deltas, x=[f"{value:g}" for value in values], y=question_labels(questions),
+        zmin=-bound, zmax=bound, colorscale="RdBu", customdata=notes,
+        text=np.where(notes != "", "◆", ""), texttemplate="%{text}",
+        hovertemplate="%{y}<br>Risposta %{x}: %{z:+.1f}<br>%{customdata}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=title, height=160 + 22 * len(questions),
+        xaxis={"title": "Risposta", "side": "top"}, yaxis={"autorange": "reversed", "automargin": True},
+    )
+    return fig
+
+
+def draw_quadrant(ax):
+    """
+    Draw the static part of the quadrant chart: limits, midlines, labels and titles.
+
+    Args:
+        ax (matplotlib.axes.Axes): Axes to draw on.
+    """
+    ax.axvline(50, color='grey', linestyle='--')  # Mid vertical line
+    ax.axhline(50, color='grey', linestyle='--')  # Mid horizontal line
+    for x, y, label in QUADRANT_LABELS:
+        ax.text(x, y, label, ha="center", va="center", fontsize=12, fontweight='bold')
+    ax.set_xlim(0, 100)
+    ax.set_ylim(0, 100)
+    ax.set_xticks(range(0, 101, 10))
+    ax.set_yticks(range(0, 101, 10))
+    ax.set_title(QUADRANT_TITLE)
+    ax.set_xlabel(QUADRANT_XLABEL)
+    ax.set_ylabel(QUADRANT_YLABEL)
+
+
+def encode_png(pixels, colors=PNG_COLORS):
+    """
+    Encode an RGBA pixel buffer of an opaque chart as a palette PNG.
+
+    Charts use few colors, so a palette of `PNG_COLORS` keeps them visually
+    unchanged at about a third of the size of an RGBA PNG.
+
+    Args:
+        pixels (np.ndarray): Height x width x 4 array of uint8.
+        colors (int, optional): Size of the palette.
+
+    Returns:
+        bytes: The PNG image.
+    """
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    image = Image.fromarray(pixels[..., :3]).quantize(colors, method=Image.Quantize.FASTOCTREE)
+    image.save(buffer, format="png")
+    return buffer.getvalue()
+
+
+class QuadrantTemplate:
+    """
+    Quadrant chart whose background is rendered once.
+
+    The figure is drawn without the marker and its pixels are kept; each
+    PNG restores them and draws the marker alone on top.
+
+    Args:
+        size (tuple, optional): Figure size in inches.
+        dpi (int, optional): Resolution of the PNG output.
+    """
+
+    def __init__(self, size=QUADRANT_SIZE, dpi=CHART_DPI):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=size, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        draw_quadrant(self.ax)
+        self.marker = self.ax.scatter([50], [50], color="red", s=100, animated=True)
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def png(self, ease_score, value_score):
+        """
+        Render the quadrant with the marker at the given scores.
+
+        Args:
+            ease_score (float): The ease of implementation score.
+            value_score (float): The value delivered score.
+
+        Returns:
+            bytes: The PNG image.
+        """
+        import numpy as np
+
+        self.canvas.restore_region(self._background)
+        self.marker.set_offsets([[ease_score, value_score]])
+        self.ax.draw_artist(self.marker)
+        return encode_png(np.asarray(self.canvas.buffer_rgba()))
+
+
+_quadrant_templates = []
+_quadrant_templates_lock = threading.Lock()
+
+
+@contextmanager
+def quadrant_template():
+    """
+    Borrow a `QuadrantTemplate` from the process-wide pool.
+
+    The pool holds at most one template per concurrent caller: a template is
+    created only when all the existing ones are in use, and returned to the
+    pool afterwards, so memory does not grow with the number of renders.
+
+    Yields:
+        QuadrantTemplate: A template for the exclusive use of the caller.
+    """
+    with _quadrant_templates_lock:
+        template = _quadrant_templates.pop() if _quadrant_templates else None
+    if template is None:
+        template = QuadrantTemplate()
+    try:
+        yield template
+    finally:
+        with _quadrant_templates_lock:
+            _quadrant_templates.append(template)
+
+
+def quadrant_png(ease_score, value_score):
+    """
+    Render the quadrant chart of a model to PNG with a pooled template.
+
+    Args:
+        ease_score (float): The ease of implementation score.
+        value_score (float): The value delivered score.
+
+    Returns:
+        bytes: The PNG image.
+    """
+    with quadrant_template() as template:
+        return template.png(ease_score, value_score)
+
+
+class GaugePlotTemplate:
+    """
+    Matplotlib rendering of the gauge, drawn once and updated for each score.
+
+    The gauge is a half ring with the color bands, a dark blue bar from 0 to
+    the score, a red threshold tick at the score and the score in the center.
+
+    Args:
+        ax (matplotlib.axes.Axes): Axes to draw the gauge on; they are given
+            an equal aspect and no frame.
+    """
+
+    def __init__(self, ax):
+        from matplotlib.patches import Wedge
+
+        self.ax = ax
+        ax.set_xlim(-1.1, 1.1)
+        ax.set_ylim(-0.25, 1.2)
+        ax.set_aspect("equal")
+        ax.axis("off")
+        for start, end, color in GAUGE_STEPS:
+            ax.add_patch(Wedge((0, 0), 1.0, self._angle(end), self._angle(start), width=0.3, color=color))
+        self.bar = ax.add_patch(Wedge((0, 0), 0.92, 180, 180, width=0.14, color="darkblue"))
+        self.threshold, = ax.plot([], [], color="red", linewidth=3)
+        self.value = ax.text(0, 0.1, "", ha="center", va="center", fontsize=28)
+        self.title = ax.text(0, 1.12, "", ha="center", va="center", fontsize=13)
+        for tick in range(0, 101, 20):
+            angle = math.radians(self._angle(tick))
+            ax.text(1.08 * math.cos(angle), 1.08 * math.sin(angle), str(tick), ha="center", va="center", fontsize=8)
+
+    @staticmethod
+    def _angle(score):
+        # 0 is on the left (180 degrees), 100 on the right (0 degrees)
+        return 180.0 - 1.8 * min(max(score, 0.0), 100.0)
+
+    def update(self, score, title="Tangibility Score"):
+        """
+        Set the score and title of the gauge.
+
+        Args:
+            score (float): The score to be displayed on the gauge.
+            title (str, optional): Title of the gauge.
+        """
+        self.bar.set_theta1(self._angle(score))
+        angle = math.radians(self._angle(score))
+        self.threshold.set_data([0.68 * math.cos(angle), 1.02 * math.cos(angle)], [0.68 * math.sin(angle), 1.02 * math.sin(angle)])
+        self.value.set_text(f"{score:.1f}")
+        self.title.set_text(title)
@@ -0,0 +1,436 @@
+"""
+Persistent storage of AI model descriptions and their evaluations.
+
+Session state is lost on a browser refresh or a worker restart and is not
+shared between workers. The store keeps models, scenarios and the raters'
+responses in a database instead. `EvaluationStore` is the interface the app
+uses; `SQLiteEvaluationStore` is the default implementation: a local SQLite
+file in WAL mode (concurrent readers, one writer), with a small per-process
+pool of reusable connections.
+
+The backend is chosen by the `VALORE_AI_STORE_URL` environment variable,
+e.g. "sqlite:///path/to/evaluations.sqlite3". Other backends can be added
+with `register_store_backend`.
+"""
+import abc
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_STORE_URL = "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "valore_ai.sqlite3")
+
+# Number of SQLite connections kept open per process.
+DEFAULT_POOL_SIZE = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    scenario TEXT,
+    catalog_key TEXT,
+    catalog_uploaded INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS models_name ON models (name);
+CREATE INDEX IF NOT EXISTS models_updated ON models (updated_at);
+CREATE INDEX IF NOT EXISTS models_scenario ON models (scenario, updated_at);
+
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY,
+    model_id INTEGER NOT NULL REFERENCES models (id) ON DELETE CASCADE,
+    rater TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (model_id, rater)
+);
+
+CREATE TABLE IF NOT EXISTS responses (
+    evaluation_id INTEGER NOT NULL REFERENCES evaluations (id) ON DELETE CASCADE,
+    question TEXT NOT NULL,
+    objective TEXT,
+    score REAL NOT NULL,
+    PRIMARY KEY (evaluation_id, question)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS responses_objective ON responses (objective, evaluation_id);
+
+CREATE TABLE IF NOT EXISTS model_objectives (
+    model_id INTEGER NOT NULL REFERENCES models (id) ON DELETE CASCADE,
+    objective TEXT NOT NULL,
+    PRIMARY KEY (model_id, objective)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS model_objectives_objective ON model_objectives (objective, model_id);
+"""
+
+
+class EvaluationStore(abc.ABC):
+    """
+    Interface of a persistent evaluation store.
+
+    Models are dictionaries with "id", "name", "description", "scenario",
+    "catalog_key", "catalog_uploaded", "created_at" and "updated_at" keys.
+    Evaluations map each rater to a dictionary of question:score pairs.
+    """
+
+    @abc.abstractmethod
+    def save_model(self, name, description, scenario=None, catalog_key=None, catalog_uploaded=False, model_id=None):
+        """
+        Insert a model, or update it if `model_id` is given.
+
+        Args:
+            name (str): Name of the AI model/app.
+            description (str): Description of the AI model/app.
+            scenario (str, optional): Evaluation scenario.
+            catalog_key (str, optional): Key of its KPI catalog in the catalog store.
+            catalog_uploaded (bool, optional): Whether the catalog was uploaded.
+            model_id (int, optional): Model to update.
+
+        Returns:
+            int: The model id.
+        """
+
+    @abc.abstractmethod
+    def save_evaluations(self, model_id, evaluations, question_objectives=None):
+        """
+        Insert or replace the evaluations of several raters in one transaction.
+
+        Args:
+            model_id (int): Model being evaluated.
+            evaluations (dict): Rater -> dictionary of question:score pairs.
+            question_objectives (dict, optional): Question -> business objective,
+                stored alongside each response for objective queries.
+
+        Returns:
+            list: The evaluation ids, in the order of `evaluations`.
+        """
+
+    def save_evaluation(self, model_id, rater, responses, question_objectives=None):
+        """
+        Insert or replace the evaluation of a single rater.
+
+        Args:
+            model_id (int): Model being evaluated.
+            rater (str): Name of the rater.
+            responses (dict): Dictionary of question:score pairs.
+            question_objectives (dict, optional): Question -> business objective.
+
+        Returns:
+            int: The evaluation id.
+        """
+        return self.save_evaluations(model_id, {rater: responses}, question_objectives)[0]
+
+    @abc.abstractmethod
+    def load_model(self, model_id):
+        """
+        Return a model, or None if it does not exist.
+
+        Args:
+            model_id (int): Model id.
+
+        Returns:
+            dict or None: The model.
+        """
+
+    @abc.abstractmethod
+    def load_evaluations(self, model_id):
+        """
+        Return the evaluations of a model.
+
+        Args:
+            model_id (int): Model id.
+
+        Returns:
+            dict: Rater -> dictionary of question:score pairs, oldest rater first.
+        """
+
+    @abc.abstractmethod
+    def load_consensus(self, updated_since=None):
+        """
+        Return the consensus answers of every model: for each question, the
+        mean score over the raters who answered it.
+
+        Args:
+            updated_since (float, optional): Only models saved or evaluated
+                at or after this timestamp.
+
+        Returns:
+            list: (model_id, question, mean score) tuples.
+        """
+
+    @abc.abstractmethod
+    def data_version(self):
+        """
+        Return a value that changes whenever a model or evaluation is saved.
+
+        Returns:
+            tuple: (number of models, timestamp of the latest save).
+        """
+
+    @abc.abstractmethod
+    def list_models(self, limit=50, offset=0, name=None, scenario=None, objective=None, updated_since=None):
+        """
+        List models, most recently updated first.
+
+        Args:
+            limit (int, optional): Maximum number of models returned; None
+                for all of them.
+            offset (int, optional): Number of models skipped.
+            name (str, optional): Only models whose name contains this text.
+            scenario (str, optional): Only models of this scenario.
+            objective (str, optional): Only models with responses for this
+                business objective.
+            updated_since (float, optional): Only models saved or evaluated
+                at or after this timestamp.
+
+        Returns:
+            list: Models, each with an extra "evaluations" count.
+        """
+
+    def close(self):
+        """
+        Release the resources held by the store.
+        """
+
+
+class SQLiteEvaluationStore(EvaluationStore):
+    """
+    SQLite implementation of `EvaluationStore`, in WAL mode.
+
+    Connections are created lazily, up to `pool_size`, and reused by every
+    thread of the process; each operation borrows one for its duration.
+
+    Args:
+        path (str): Path to the database file (":memory:" is not supported,
+            as pooled connections would not share it).
+        pool_size (int, optional): Maximum number of open connections.
+    """
+
+    def __init__(self, path, pool_size=DEFAULT_POOL_SIZE):
+        self.path = path
+        self._pool = queue.LifoQueue()
+        self._semaphore = threading.BoundedSemaphore(pool_size)
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_url(cls, url):
+        """
+        Create a store from a "sqlite:///path" URL.
+
+        Args:
+            url (str): Store URL.
+
+        Returns:
+            SQLiteEvaluationStore: The store.
+        """
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite://"):]
+        return cls(os.path.expanduser(path))
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        self._semaphore.acquire()
+        try:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                self._pool.put(conn)
+        finally:
+            self._semaphore.release()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def save_model(self, name, description, scenario=None, catalog_key=None, catalog_uploaded=False, model_id=None):
+        now = time.time()
+        with self._transaction() as conn:
+            if model_id is not None:
+                updated = conn.execute(
+                    "UPDATE models SET name = ?, description = ?, scenario = ?, catalog_key = ?,"
+                    " catalog_uploaded = ?, updated_at = ? WHERE id = ?",
+                    (name, description, scenario, catalog_key, int(catalog_uploaded), now, model_id)
+                ).rowcount
+                if updated:
+                    return model_id
+            cursor = conn.execute(
+                "INSERT INTO models (name, description, scenario, catalog_key, catalog_uploaded, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, description, scenario, catalog_key, int(catalog_uploaded), now, now)
+            )
+            return cursor.lastrowid
+
+    def save_evaluations(self, model_id, evaluations, question_objectives=None):
+        question_objectives = question_objectives or {}
+        now = time.time()
+        ids = []
+        with self._transaction() as conn:
+            for rater, responses in evaluations.items():
+                evaluation_id = conn.execute(
+                    "INSERT INTO evaluations (model_id, rater, created_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT (model_id, rater) DO UPDATE SET created_at = excluded.created_at"
+                    " RETURNING id",
+                    (model_id, rater, now)
+                ).fetchone()[0]
+                conn.execute("DELETE FROM responses WHERE evaluation_id = ?", (evaluation_id,))
+                conn.executemany(
+                    "INSERT INTO responses (evaluation_id, question, objective, score) VALUES (?, ?, ?, ?)",
+                    [(evaluation_id, question, question_objectives.get(question), score)
+                     for question, score in responses.items()]
+                )
+                ids.append(evaluation_id)
+            objectives = {question_objectives[question] for responses in evaluations.values()
+                          for question in responses if question_objectives.get(question)}
+            conn.executemany(
+                "INSERT OR IGNORE INTO model_objectives (model_id, objective) VALUES (?, ?)",
+                [(model_id, objective) for objective in sorted(objectives)]
+            )
+            conn.execute("UPDATE models SET updated_at = ? WHERE id = ?", (now, model_id))
+        return ids
+
+    def load_model(self, model_id):
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM models WHERE id = ?", (model_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def load_evaluations(self, model_id):
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT e.rater, r.question, r.score FROM evaluations e"
+                " JOIN responses r ON r.evaluation_id = e.id"
+                " WHERE e.model_id = ? ORDER BY e.created_at, e.id",
+                (model_id,)
+            ).fetchall()
+        evaluations = {}
+        for rater, question, score in rows:
+            evaluations.setdefault(rater, {})[question] = score
+        return evaluations
+
+    def load_consensus(self, updated_since=None):
+        where, params = "", ()
+        if updated_since is not None:
+            where, params = " WHERE e.model_id IN (SELECT id FROM models WHERE updated_at >= ?)", (updated_since,)
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT e.model_id, r.question, AVG(r.score) FROM evaluations e"
+                f" JOIN responses r ON r.evaluation_id = e.id{where} GROUP BY e.model_id, r.question",
+                params
+            ).fetchall()
+
+    def data_version(self):
+        with self._connection() as conn:
+            return tuple(conn.execute("SELECT COUNT(*), MAX(updated_at) FROM models").fetchone())
+
+    def list_models(self, limit=50, offset=0, name=None, scenario=None, objective=None, updated_since=None):
+        conditions, params = [], []
+        if name:
+            conditions.append("m.name LIKE ? ESCAPE '\\'")
+            params.append("%" + name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if scenario is not None:
+            conditions.append("m.scenario IS ?")
+            params.append(scenario)
+        if objective is not None:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM model_objectives o WHERE o.model_id = m.id AND o.objective = ?)"
+            )
+            params.append(objective)
+        if updated_since is not None:
+            conditions.append("m.updated_at >= ?")
+            params.append(updated_since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT m.*, (SELECT COUNT(*) FROM evaluations e WHERE e.model_id = m.id) AS evaluations"
+                f" FROM models m {where} ORDER BY m.updated_at DESC, m.id DESC LIMIT ? OFFSET ?",
+                (*params, -1 if limit is None else limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+STORE_BACKENDS = {
+    "sqlite": SQLiteEvaluationStore.from_url,
+}
+
+
+def register_store_backend(scheme, factory):
+    """
+    Register an evaluation store backend.
+
+    Args:
+        scheme (str): URL scheme handled by the backend, e.g. "postgresql".
+        factory (callable): Function taking the store URL and returning an
+            `EvaluationStore`.
+    """
+    STORE_BACKENDS[scheme] = factory
+
+
+def open_store(url):
+    """
+    Open the evaluation store designated by a URL.
+
+    Args:
+        url (str): Store URL, e.g. "sqlite:///evaluations.sqlite3".
+
+    Returns:
+        EvaluationStore: The store.
+
+    Raises:
+        ValueError: If no backend handles the URL scheme.
+    """
+    scheme = url.split("://", 1)[0]
+    if scheme not in STORE_BACKENDS:
+        raise ValueError(f"Archivio valutazioni non supportato: {scheme!r}")
+    return STORE_BACKENDS[scheme](url)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_evaluation_store():
+    """
+    Return the process-wide evaluation store, opening it on first use.
+
+    The store URL is read from the `VALORE_AI_STORE_URL` environment variable
+    and defaults to a SQLite file next to the app.
+
+    Returns:
+        EvaluationStore: The shared store.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = open_store(os.environ.get("VALORE_AI_STORE_URL", DEFAULT_STORE_URL))
+    return _store
@@ -0,0 +1,555 @@
+"""
+Lightweight metrics of the app: latency histograms, counters and gauges.
+
+Instrumentation is off unless one of these environment variables is set:
+
+- `VALORE_AI_METRICS=1`: collect metrics and show them in the debug panel
+  (`?debug=1`);
+- `VALORE_AI_METRICS_FILE`: also write them, in the Prometheus text format,
+  to this file (e.g. for the node exporter textfile collector), at most
+  every `METRICS_FILE_INTERVAL` seconds;
+- `VALORE_AI_METRICS_PORT`: also serve them on `http://<host>:<port>/metrics`
+  from a background thread; the endpoint listens on `VALORE_AI_METRICS_HOST`,
+  the loopback interface by default.
+
+When it is off, `timed` returns the decorated function unchanged and
+`timer`, `observe`, `increment`, `advance_counter`, `set_gauge` and
+`start_session` do nothing, so instrumented hot paths cost one function call. When it is on,
+a measure costs a clock read and a locked bucket update.
+
+Kept free of Streamlit so that the scoring, catalog and store modules can
+be instrumented as well.
+"""
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+import weakref
+from contextlib import nullcontext
+
+METRICS_FILE = os.environ.get("VALORE_AI_METRICS_FILE", "")
+METRICS_PORT = int(os.environ.get("VALORE_AI_METRICS_PORT", 0) or 0)
+METRICS_HOST = os.environ.get("VALORE_AI_METRICS_HOST", "127.0.0.1")
+ENABLED = os.environ.get("VALORE_AI_METRICS", "0") not in ("", "0") or bool(METRICS_FILE) or bool(METRICS_PORT)
+
+# Minimum number of seconds between two writes of the metrics file.
+METRICS_FILE_INTERVAL = 5.0
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the catalog size histogram buckets, in rows.
+ROW_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Metric names, with their type and help text.
+PAGE_SECONDS = "valore_ai_page_seconds"
+FUNCTION_SECONDS = "valore_ai_function_seconds"
+RUNS_TOTAL = "valore_ai_runs_total"
+SESSIONS_TOTAL = "valore_ai_sessions_total"
+ACTIVE_SESSIONS = "valore_ai_active_sessions"
+CATALOG_ROWS = "valore_ai_catalog_rows"
+CATALOG_CACHE_BYTES = "valore_ai_catalog_cache_bytes"
+CATALOG_CACHE_ENTRIES = "valore_ai_catalog_cache_entries"
+CATALOG_CACHE_HITS = "valore_ai_catalog_cache_hits_total"
+CATALOG_CACHE_MISSES = "valore_ai_catalog_cache_misses_total"
+CATALOG_CACHE_EVICTIONS = "valore_ai_catalog_cache_evictions_total"
+CHART_BYTES_TOTAL = "valore_ai_chart_bytes_total"
+RESIDENT_MEMORY_BYTES = "valore_ai_process_resident_memory_bytes"
+
+METRICS = {
+    PAGE_SECONDS: ("histogram", "Server time to render a page, by page."),
+    FUNCTION_SECONDS: ("histogram", "Time spent in instrumented functions, by function."),
+    RUNS_TOTAL: ("counter", "Script runs, by scope: 'app' for full runs, or the fragment rerun alone."),
+    SESSIONS_TOTAL: ("counter", "Sessions started."),
+    ACTIVE_SESSIONS: ("gauge", "Sessions whose state the server still holds."),
+    CATALOG_ROWS: ("histogram", "Rows of the KPI catalogs parsed (not served from the catalog store)."),
+    CATALOG_CACHE_BYTES: ("gauge", "Memory used by the process-wide catalog store."),
+    CATALOG_CACHE_ENTRIES: ("gauge", "Catalogs held by the process-wide catalog store."),
+    CATALOG_CACHE_HITS: ("counter", "Catalog lookups served from the process-wide catalog store."),
+    CATALOG_CACHE_MISSES: ("counter", "Catalog lookups that parsed the catalog."),
+    CATALOG_CACHE_EVICTIONS: ("counter", "Catalogs evicted from the process-wide catalog store."),
+    CHART_BYTES_TOTAL: ("counter", "Bytes of the charts sent to the browser, by kind."),
+    RESIDENT_MEMORY_BYTES: ("gauge", "Resident memory of the server process."),
+}
+
+# Buckets of the histograms that do not measure latency.
+HISTOGRAM_BUCKETS = {CATALOG_ROWS: ROW_BUCKETS}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed buckets, per label set.
+
+    Args:
+        name (str): Metric name.
+        help (str): Help text.
+        buckets (tuple, optional): Increasing upper bounds of the buckets.
+    """
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Record a value.
+
+        Args:
+            value (float): The observed value.
+            **labels: Label values of the series.
+        """
+        key = _label_key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def quantile(self, q, **labels):
+        """
+        Estimate a quantile of a series from its buckets.
+
+        Args:
+            q (float): Quantile, between 0 and 1.
+            **labels: Label values of the series.
+
+        Returns:
+            float: Upper bound of the bucket holding the quantile, `math.inf`
+            when it is above the largest bound, or NaN without observations.
+        """
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            counts = list(series[0]) if series else []
+        total = sum(counts)
+        if not total:
+            return float("nan")
+        seen = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return math.inf
+
+    def summary(self):
+        """
+        Summarize every series.
+
+        Returns:
+            list: (labels dict, count, mean) tuples, by label set.
+        """
+        with self._lock:
+            items = [(dict(key), series[2], series[1] / series[2]) for key, series in sorted(self._series.items())]
+        return items
+
+    def samples(self):
+        """
+        Render the series in the Prometheus text format.
+
+        Returns:
+            list: The sample lines.
+        """
+        lines = []
+        with self._lock:
+            series = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Counter:
+    """
+    Monotonic total, per label set.
+
+    Args:
+        name (str): Metric name.
+        help (str): Help text.
+    """
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Add to the total.
+
+        Args:
+            amount (float, optional): Non-negative amount added.
+            **labels: Label values of the series.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def advance(self, total, **labels):
+        """
+        Bring the total up to a value counted elsewhere, adding the
+        difference; a total below the current one is ignored.
+
+        Args:
+            total (float): The total reached by the source count.
+            **labels: Label values of the series.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            if key not in self._values or total > self._values[key]:
+                self._values[key] = total
+
+    def values(self):
+        """
+        Return the value of every series.
+
+        Returns:
+            list: (labels dict, value) tuples, by label set.
+        """
+        with self._lock:
+            return [(dict(key), value) for key, value in sorted(self._values.items())]
+
+    def samples(self):
+        """
+        Render the series in the Prometheus text format.
+
+        Returns:
+            list: The sample lines.
+        """
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, per label set.
+
+    Args:
+        name (str): Metric name.
+        help (str): Help text.
+    """
+
+    def set(self, value, **labels):
+        """
+        Set the value.
+
+        Args:
+            value (float): The new value.
+            **labels: Label values of the series.
+        """
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class MetricsRegistry:
+    """
+    Set of named metrics, created on first use from `METRICS`.
+    """
+
+    _types = {"counter": Counter, "gauge": Gauge}
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def metric(self, name):
+        """
+        Return a metric, creating it on first use.
+
+        Args:
+            name (str): Metric name, one of `METRICS`.
+
+        Returns:
+            Histogram, Counter or Gauge: The metric.
+
+        Raises:
+            KeyError: If the metric is not declared in `METRICS`.
+        """
+        metric = self._metrics.get(name)
+        if metric is None:
+            kind, help = METRICS[name]
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    if kind == "histogram":
+                        metric = Histogram(name, help, HISTOGRAM_BUCKETS.get(name, LATENCY_BUCKETS))
+                    else:
+                        metric = self._types[kind](name, help)
+                    self._metrics[name] = metric
+        return metric
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {METRICS[name][0]}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry():
+    """
+    Return the process-wide metrics registry, creating it on first use.
+
+    Returns:
+        MetricsRegistry: The shared registry.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+_NULL_TIMER = nullcontext()
+
+
+def timer(metric, **labels):
+    """
+    Time a block of code into a latency histogram.
+
+    Args:
+        metric (str): Histogram name, e.g. `PAGE_SECONDS`.
+        **labels: Label values of the series, e.g. page="Risultati".
+
+    Returns:
+        contextmanager: The timer; a shared no-op one when instrumentation is off.
+    """
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(get_metrics_registry().metric(metric), labels)
+
+
+def timed(function=None, metric=FUNCTION_SECONDS):
+    """
+    Decorator timing every call of a function into a latency histogram.
+
+    When instrumentation is off the function is returned unchanged.
+
+    Args:
+        function (str, optional): Value of the "function" label; defaults
+            to the qualified name of the function.
+        metric (str, optional): Histogram name.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorate(func):
+        if not ENABLED:
+            return func
+        histogram = get_metrics_registry().metric(metric)
+        label = function or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, function=label)
+        return wrapper
+    return decorate
+
+
+def observe(metric, value, **labels):
+    """
+    Record a value in a histogram; does nothing when instrumentation is off.
+
+    Args:
+        metric (str): Histogram name, e.g. `CATALOG_ROWS`.
+        value (float): The observed value.
+        **labels: Label values of the series.
+    """
+    if ENABLED:
+        get_metrics_registry().metric(metric).observe(value, **labels)
+
+
+def increment(metric, amount=1, **labels):
+    """
+    Add to a counter; does nothing when instrumentation is off.
+
+    Args:
+        metric (str): Counter name, e.g. `RUNS_TOTAL`.
+        amount (float, optional): Amount added.
+        **labels: Label values of the series.
+    """
+    if ENABLED:
+        get_metrics_registry().metric(metric).inc(amount, **labels)
+
+
+def advance_counter(metric, total, **labels):
+    """
+    Bring a counter up to a total counted elsewhere, e.g. by a cache; does
+    nothing when instrumentation is off.
+
+    Args:
+        metric (str): Counter name, e.g. `CATALOG_CACHE_HITS`.
+        total (float): The total reached by the source count.
+        **labels: Label values of the series.
+    """
+    if ENABLED:
+        get_metrics_registry().metric(metric).advance(total, **labels)
+
+
+def set_gauge(metric, value, **labels):
+    """
+    Set a gauge; does nothing when instrumentation is off.
+
+    Args:
+        metric (str): Gauge name, e.g. `ACTIVE_SESSIONS`.
+        value (float): The new value.
+        **labels: Label values of the series.
+    """
+    if ENABLED:
+        get_metrics_registry().metric(metric).set(value, **labels)
+
+
+class SessionToken:
+    """
+    Marker kept in the state of a session, counted as active until the
+    server releases the state and the token with it.
+    """
+    __slots__ = ("__weakref__",)
+
+
+def start_session():
+    """
+    Count a new session, and count it as active while the returned token lives.
+
+    Keep the token in the session state: when the server drops the session,
+    the token is released and the session is no longer counted as active.
+
+    Returns:
+        SessionToken: The token, or None when instrumentation is off.
+    """
+    if not ENABLED:
+        return None
+    registry = get_metrics_registry()
+    registry.metric(SESSIONS_TOTAL).inc()
+    active = registry.metric(ACTIVE_SESSIONS)
+    active.inc()
+    token = SessionToken()
+    weakref.finalize(token, active.inc, -1)
+    return token
+
+
+def write_metrics_file(path):
+    """
+    Write the metrics to a file in the Prometheus text format.
+
+    The file is replaced atomically, so that a collector never reads it
+    half-written.
+
+    Args:
+        path (str): Destination file.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(get_metrics_registry().render())
+    os.replace(temporary, path)
+
+
+_last_export = 0.0
+_server = None
+_export_lock = threading.Lock()
+
+
+def _start_server(host, port):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = get_metrics_registry().render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def export_metrics():
+    """
+    Publish the metrics as configured: start the HTTP endpoint on first
+    call, and write the metrics file if `METRICS_FILE_INTERVAL` seconds
+    have passed since the last write. Does nothing when instrumentation is
+    off.
+    """
+    global _last_export, _server
+    if not ENABLED:
+        return
+    with _export_lock:
+        if METRICS_PORT and _server is None:
+            _server = _start_server(METRICS_HOST, METRICS_PORT)
+        now = time.monotonic()
+        if METRICS_FILE and now - _last_export >= METRICS_FILE_INTERVAL:
+            _last_export = now
+            write_metrics_file(METRICS_FILE)
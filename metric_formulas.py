@@ -0,0 +1,342 @@
+"""
+Registry of metric formulas and examples shown on the results page.
+
+Rules are read once per process from `metric_formulas.json` (plus any user
+files listed in the `VALORE_AI_METRIC_FORMULAS` environment variable) and
+resolved by normalized metric name:
+
+- "exact" rules are looked up in a dictionary;
+- "contains" rules are compiled into a single character trie, scanned once
+  per metric, so the cost depends on the metric length and not on the
+  number of rules.
+
+When several rules match, the one listed first wins, as in the original
+if/elif chain. Resolutions are memoized per normalized name.
+
+Metrics that match no rule can be given a suggestion: a character-trigram
+index over the rule patterns returns the most similar known metric and a
+Dice similarity score, using inverted postings instead of comparing the
+name with every pattern.
+"""
+import json
+import os
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+BUILTIN_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metric_formulas.json")
+
+DEFAULT_FORMULA = r"\text{Metrica non definita con unità specifiche}"
+DEFAULT_EXAMPLE = "Nessun esempio specifico disponibile."
+
+MATCH_TYPES = ("exact", "contains")
+
+# Maximum number of distinct metric names whose resolution is memoized.
+RESOLVE_CACHE_SIZE = 65536
+
+# Suggestions scoring below this Dice similarity are discarded. Names sharing
+# only a word with a pattern ("Tempo di Sviluppo" and "tempo di attesa",
+# 0.52) stay below it; inflections of a pattern ("Ordine sociale", 0.64)
+# do not. tests/test_metric_formulas.py pins both sides.
+MIN_SUGGESTION_CONFIDENCE = 0.62
+
+# Length of the character n-grams used by the similarity index.
+NGRAM_SIZE = 3
+
+# Trie key marking the end of a "contains" pattern.
+_END = None
+
+
+@dataclass(frozen=True)
+class MetricFormula:
+    """
+    Formula and worked example for a metric.
+
+    Attributes:
+        formula (str): LaTeX formula, rendered with `st.latex`.
+        example (str): Worked example in plain text.
+        pattern (str or None): Pattern of the rule that matched, None for the default.
+    """
+    formula: str
+    example: str
+    pattern: str = None
+
+
+DEFAULT_METRIC_FORMULA = MetricFormula(DEFAULT_FORMULA, DEFAULT_EXAMPLE)
+
+
+@dataclass(frozen=True)
+class FormulaSuggestion:
+    """
+    Known formula suggested for a metric that matches no rule.
+
+    Attributes:
+        formula (MetricFormula): Formula of the most similar known metric.
+        confidence (float): Dice similarity of the character n-grams (0-1).
+    """
+    formula: MetricFormula
+    confidence: float
+
+
+def normalize_metric(metric):
+    """
+    Normalize a metric name the way rules are matched.
+
+    Args:
+        metric (str): Metric name as written in the catalog.
+
+    Returns:
+        str: Lowercased, stripped name.
+    """
+    return metric.lower().strip()
+
+
+def ngrams(text, size=NGRAM_SIZE):
+    """
+    Return the set of character n-grams of a metric name.
+
+    The normalized name is padded with spaces so that short names and word
+    boundaries still produce n-grams.
+
+    Args:
+        text (str): Metric name.
+        size (int, optional): N-gram length.
+
+    Returns:
+        set: The distinct n-grams.
+    """
+    padded = f" {normalize_metric(text)} "
+    return {padded[i:i + size] for i in range(max(len(padded) - size + 1, 1))}
+
+
+class SimilarityIndex:
+    """
+    Character n-gram index over known metric names.
+
+    Each n-gram maps to the array of names containing it, so a query only
+    touches the names that share at least one n-gram with it.
+
+    Args:
+        entries (list): Tuples of (name, value) to index.
+        size (int, optional): N-gram length.
+    """
+
+    def __init__(self, entries, size=NGRAM_SIZE):
+        self.size = size
+        self._values = [value for _, value in entries]
+        postings = {}
+        sizes = []
+        for position, (name, _) in enumerate(entries):
+            grams = ngrams(name, size)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self._postings = {gram: np.asarray(ids, dtype=np.intp) for gram, ids in postings.items()}
+        self._sizes = np.asarray(sizes, dtype=np.float64)
+
+    def nearest(self, text):
+        """
+        Find the indexed name most similar to `text`.
+
+        Args:
+            text (str): Name to look up.
+
+        Returns:
+            tuple or None: (value, Dice similarity) of the best match, or None
+            if no indexed name shares an n-gram with `text`.
+        """
+        grams = ngrams(text, self.size)
+        hits = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not hits:
+            return None
+        overlap = np.bincount(np.concatenate(hits), minlength=len(self._values))
+        scores = 2.0 * overlap / (self._sizes + len(grams))
+        best = int(np.argmax(scores))
+        return self._values[best], float(scores[best])
+
+
+class FormulaRegistry:
+    """
+    Ordered set of formula rules with constant-time lookup.
+
+    `resolve(metric)` returns the matching `MetricFormula` (or the default
+    one) and `suggest(metric)` the nearest known formula as a
+    `FormulaSuggestion` (or None); both are memoized per metric name.
+
+    Args:
+        rules (list): Dictionaries with "match" ("exact" or "contains"),
+            "pattern", "formula" and "example" keys, in priority order.
+
+    Raises:
+        ValueError: If a rule is malformed.
+    """
+
+    def __init__(self, rules):
+        self._exact = {}
+        self._trie = {}
+        self.size = 0
+        self._index = None
+        self._index_lock = threading.Lock()
+        for rule in rules:
+            self.add_rule(rule)
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+        self.suggest = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._suggest)
+
+    def add_rule(self, rule):
+        """
+        Append a rule with the lowest priority so far.
+
+        Args:
+            rule (dict): Rule with "match", "pattern", "formula" and "example" keys.
+
+        Raises:
+            ValueError: If the rule is malformed.
+        """
+        missing = {"match", "pattern", "formula", "example"} - set(rule)
+        if missing:
+            raise ValueError(f"Regola di formula incompleta, campi mancanti: {', '.join(sorted(missing))}")
+        if rule["match"] not in MATCH_TYPES:
+            raise ValueError(f"Tipo di corrispondenza non valido: {rule['match']!r}")
+        pattern = normalize_metric(rule["pattern"])
+        if not pattern:
+            raise ValueError("Il pattern di una regola di formula non può essere vuoto.")
+
+        entry = (self.size, MetricFormula(rule["formula"], rule["example"], pattern))
+        self.size += 1
+        if rule["match"] == "exact":
+            self._exact.setdefault(pattern, entry)
+        else:
+            node = self._trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node.setdefault(_END, entry)
+        self._index = None
+        if hasattr(self, "resolve"):
+            self.resolve.cache_clear()
+            self.suggest.cache_clear()
+
+    def patterns(self):
+        """
+        Return the normalized patterns of every rule.
+
+        Returns:
+            list: Tuples of (pattern, MetricFormula) in priority order.
+        """
+        entries = list(self._exact.values())
+        stack = [self._trie]
+        while stack:
+            node = stack.pop()
+            for char, child in node.items():
+                if char is _END:
+                    entries.append(child)
+                else:
+                    stack.append(child)
+        return [(formula.pattern, formula) for _, formula in sorted(entries, key=lambda entry: entry[0])]
+
+    def match(self, metric):
+        """
+        Find the highest-priority rule matching a metric.
+
+        Args:
+            metric (str): Metric name, normalized or not.
+
+        Returns:
+            MetricFormula or None: The matching formula, or None if no rule applies.
+        """
+        name = normalize_metric(metric)
+        best = self._exact.get(name)
+        trie = self._trie
+        for start in range(len(name)):
+            node = trie
+            for char in name[start:]:
+                node = node.get(char)
+                if node is None:
+                    break
+                found = node.get(_END)
+                if found is not None and (best is None or found[0] < best[0]):
+                    best = found
+        return best[1] if best is not None else None
+
+    def _resolve(self, metric):
+        found = self.match(metric)
+        return found if found is not None else DEFAULT_METRIC_FORMULA
+
+    def similarity_index(self):
+        """
+        Return the n-gram index over the rule patterns, building it on first use.
+
+        Returns:
+            SimilarityIndex: Index mapping pattern n-grams to formulas.
+        """
+        index = self._index
+        if index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = SimilarityIndex(self.patterns())
+                index = self._index
+        return index
+
+    def _suggest(self, metric, min_confidence=MIN_SUGGESTION_CONFIDENCE):
+        nearest = self.similarity_index().nearest(metric)
+        if nearest is None or nearest[1] < min_confidence:
+            return None
+        return FormulaSuggestion(formula=nearest[0], confidence=nearest[1])
+
+
+def read_rules(path):
+    """
+    Read formula rules from a JSON file.
+
+    The file holds either a list of rules or an object with a "rules" list.
+
+    Args:
+        path (str): Path to the JSON file.
+
+    Returns:
+        list: The rules, in file order.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["rules"] if isinstance(data, dict) else data
+
+
+def load_registry(extra_paths=()):
+    """
+    Build a registry from the built-in rules followed by user rule files.
+
+    Args:
+        extra_paths (iterable, optional): Additional JSON rule files. Their
+            rules rank after the built-in ones.
+
+    Returns:
+        FormulaRegistry: The compiled registry.
+    """
+    rules = read_rules(BUILTIN_RULES_PATH)
+    for path in extra_paths:
+        rules.extend(read_rules(path))
+    return FormulaRegistry(rules)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_formula_registry():
+    """
+    Return the process-wide formula registry, building it on first use.
+
+    User rule files are read from the `VALORE_AI_METRIC_FORMULAS`
+    environment variable, separated by `os.pathsep`.
+
+    Returns:
+        FormulaRegistry: The shared registry.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                extra = os.environ.get("VALORE_AI_METRIC_FORMULAS", "")
+                _registry = load_registry([path for path in extra.split(os.pathsep) if path])
+    return _registry
@@ -0,0 +1,284 @@
+"""
+Portfolio of evaluated models on the Ease of Implementation vs Value
+Delivered quadrant.
+
+`get_portfolio` scores every model of the evaluation store at once: the
+consensus answers are averaged by the database, pivoted into one responses
+matrix and scored per scenario with `score_matrix`. The resulting frame is
+kept per process; when the stored data changes, only the models saved since
+then are read and scored again.
+`import_portfolio` scores a responses file the same way, so imported
+assessments can be shown next to the stored ones.
+
+`portfolio_figure` picks the cheapest faithful rendering for the number of
+points:
+
+- up to `WEBGL_POINTS` points, an SVG scatter;
+- up to `DENSITY_POINTS` points, a WebGL scatter (a single canvas element;
+  coordinates are sent as binary arrays);
+- beyond that, a density heatmap binned on the server, whose size depends
+  on the number of bins and not on the number of models.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from questionnaire import get_scenario, get_scenario_registry
+
+# Point counts above which the scatter is drawn with WebGL, and above which
+# the models are binned into a density heatmap.
+WEBGL_POINTS = int(os.environ.get("VALORE_AI_PORTFOLIO_WEBGL_POINTS", 2_000))
+DENSITY_POINTS = int(os.environ.get("VALORE_AI_PORTFOLIO_DENSITY_POINTS", 200_000))
+
+# Bins per axis of the density heatmap.
+DENSITY_BINS = 50
+
+# Columns of an imported responses file that are not questions.
+IMPORT_ID_COLUMN = "id"
+IMPORT_NAME_COLUMN = "name"
+IMPORT_SCENARIO_COLUMN = "scenario"
+
+PORTFOLIO_COLUMNS = ["name", "scenario", "source", "raters", "ease", "value", "tangibility", "relevant"]
+
+# Separator of the relevant objectives in the "relevant" column.
+OBJECTIVE_SEPARATOR = "; "
+
+
+def _scored_frame(index, names, scenarios, source, raters, scores):
+    relevant = [
+        OBJECTIVE_SEPARATOR.join(objective for objective, keep in zip(scores.objectives, mask) if keep)
+        for mask in scores.relevant
+    ]
+    return pd.DataFrame({
+        "name": names,
+        "scenario": scenarios,
+        "source": source,
+        "raters": raters,
+        "ease": scores.ease,
+        "value": scores.value,
+        "tangibility": scores.tangibility,
+        "relevant": relevant,
+    }, index=index)
+
+
+def score_portfolio(models, consensus):
+    """
+    Score the consensus answers of many models at once.
+
+    Args:
+        models (list): Stored models, as returned by `list_models`.
+        consensus (list): (model_id, question, mean score) tuples, as
+            returned by `load_consensus`.
+
+    Returns:
+        pd.DataFrame: One row per model with answers, indexed by model id,
+        with the `PORTFOLIO_COLUMNS`.
+    """
+    from scoring import score_matrix
+
+    if not consensus:
+        return pd.DataFrame(columns=PORTFOLIO_COLUMNS)
+    answers = pd.DataFrame.from_records(consensus, columns=["model_id", "question", "score"])
+    responses = answers.pivot(index="model_id", columns="question", values="score")
+    meta = pd.DataFrame.from_records(models, index="id").reindex(responses.index)
+
+    names = get_scenario_registry().names()
+    scenarios = meta["scenario"].where(meta["scenario"].isin(names), None)
+    frames = []
+    for scenario, group in responses.groupby(scenarios.fillna(get_scenario_registry().default), sort=False):
+        group = group.dropna(axis=1, how="all")
+        scores = score_matrix(group, get_scenario(scenario))
+        rows = meta.loc[group.index]
+        frames.append(_scored_frame(group.index, rows["name"], scenario, "archivio", rows["evaluations"], scores))
+    return pd.concat(frames).reindex(responses.index)
+
+
+def import_portfolio(table, scenario=None):
+    """
+    Score an imported responses table for the portfolio.
+
+    The table has one row per assessment and one column per question, as
+    for `scoring.py`, plus the optional `IMPORT_ID_COLUMN`,
+    `IMPORT_NAME_COLUMN` and `IMPORT_SCENARIO_COLUMN` columns.
+
+    Args:
+        table (pd.DataFrame): The imported table.
+        scenario (str, optional): Scenario of the rows without a scenario column.
+
+    Returns:
+        pd.DataFrame: One row per assessment with the `PORTFOLIO_COLUMNS`.
+
+    Raises:
+        ValueError: If a question column is not numeric.
+        KeyError: If a scenario is unknown.
+    """
+    from scoring import score_table
+
+    table = table.reset_index(drop=True)
+    if IMPORT_ID_COLUMN in table:
+        labels = table[IMPORT_ID_COLUMN].astype(str)
+    else:
+        labels = pd.Series([f"Importato {i + 1}" for i in range(len(table))])
+    names = table[IMPORT_NAME_COLUMN].astype(str) if IMPORT_NAME_COLUMN in table else labels
+    questions = table.drop(columns=[column for column in (IMPORT_ID_COLUMN, IMPORT_NAME_COLUMN) if column in table])
+    scenario_column = IMPORT_SCENARIO_COLUMN if IMPORT_SCENARIO_COLUMN in questions else None
+    scores = score_table(questions, scenario=scenario, scenario_column=scenario_column)
+
+    default = get_scenario_registry().default
+    if scenario_column:
+        scenarios = scores[scenario_column].fillna(default).to_numpy(dtype=object)
+    else:
+        scenarios = scenario or default
+    frame = pd.DataFrame({
+        "name": names.to_numpy(),
+        "scenario": scenarios,
+        "source": "importato",
+        "raters": 1,
+        "ease": scores["ease"].to_numpy(),
+        "value": scores["value"].to_numpy(),
+        "tangibility": scores["tangibility"].to_numpy(),
+        "relevant": scores["relevant_objectives"].to_numpy(),
+    }, index=pd.Index("import:" + labels, name="model_id"))
+    return frame
+
+
+_portfolios = {}
+_portfolios_lock = threading.Lock()
+
+
+def get_portfolio(store):
+    """
+    Return the scored portfolio of a store, recomputing it only when the
+    stored data has changed.
+
+    The frame is shared between sessions and must be treated as read-only.
+
+    Args:
+        store (EvaluationStore): The evaluation store.
+
+    Returns:
+        pd.DataFrame: One row per model with answers, indexed by model id.
+    """
+    version = store.data_version()
+    cached = _portfolios.get(id(store))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _portfolios_lock:
+        cached = _portfolios.get(id(store))
+        if cached is None or cached[0][0] > version[0]:
+            frame = score_portfolio(store.list_models(limit=None), store.load_consensus())
+        elif cached[0] != version:
+            # Saving a model or its evaluations bumps its timestamp: rescore
+            # the models saved since the cached version and replace their rows
+            since = cached[0][1]
+            changed = score_portfolio(
+                store.list_models(limit=None, updated_since=since), store.load_consensus(updated_since=since)
+            )
+            frame = pd.concat([cached[1].drop(changed.index, errors="ignore"), changed]) if len(changed) else cached[1]
+        else:
+            return cached[1]
+        cached = _portfolios[id(store)] = (version, frame)
+    return cached[1]
+
+
+def filter_portfolio(frame, scenario=None, objective=None, name=None):
+    """
+    Select the models of a portfolio.
+
+    Args:
+        frame (pd.DataFrame): Portfolio frame.
+        scenario (str, optional): Only models of this scenario.
+        objective (str, optional): Only models for which this objective is relevant.
+        name (str, optional): Only models whose name contains this text (case-insensitive).
+
+    Returns:
+        pd.DataFrame: The selected rows.
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    if scenario is not None:
+        mask &= (frame["scenario"] == scenario).to_numpy()
+    if objective is not None:
+        # Objectives are joined by OBJECTIVE_SEPARATOR, so pad both ends to match whole names
+        padded = OBJECTIVE_SEPARATOR + frame["relevant"].astype(str) + OBJECTIVE_SEPARATOR
+        mask &= padded.str.contains(OBJECTIVE_SEPARATOR + objective + OBJECTIVE_SEPARATOR, regex=False).to_numpy()
+    if name:
+        mask &= frame["name"].astype(str).str.contains(name, case=False, regex=False).to_numpy()
+    return frame[mask]
+
+
+def rendering_mode(points, webgl_points=WEBGL_POINTS, density_points=DENSITY_POINTS):
+    """
+    Choose how a number of points is drawn.
+
+    Args:
+        points (int): Number of models.
+        webgl_points (int, optional): Point count above which WebGL is used.
+        density_points (int, optional): Point count above which points are binned.
+
+    Returns:
+        str: "svg", "webgl" or "density".
+    """
+    if points > density_points:
+        return "density"
+    if points > webgl_points:
+        return "webgl"
+    return "svg"
+
+
+def portfolio_figure(frame, highlight=None, mode=None, bins=DENSITY_BINS):
+    """
+    Build the portfolio quadrant as a Plotly figure.
+
+    Args:
+        frame (pd.DataFrame): Portfolio rows to plot.
+        highlight (tuple, optional): (ease, value) of a model to mark in red,
+            e.g. the one of the current session.
+        mode (str, optional): "svg", "webgl" or "density"; chosen from the
+            number of rows by default.
+        bins (int, optional): Bins per axis in density mode.
+
+    Returns:
+        plotly.graph_objects.Figure: The figure.
+    """
+    import plotly.graph_objects as go
+
+    from charts import quadrant_layout
+
+    mode = mode or rendering_mode(len(frame))
+    ease = frame["ease"].to_numpy(dtype=np.float64)
+    value = frame["value"].to_numpy(dtype=np.float64)
+    fig = go.Figure()
+
+    if mode == "density":
+        edges = np.linspace(0, 100, bins + 1)
+        counts, _, _ = np.histogram2d(ease, value, bins=[edges, edges])
+        centers = (edges[:-1] + edges[1:]) / 2
+        fig.add_trace(go.Heatmap(
+            x=centers, y=centers, z=np.where(counts > 0, counts, np.nan).T,
+            colorscale="Blues", colorbar={"title": "Modelli"},
+            hovertemplate="Ease %{x:.0f}, Value %{y:.0f}: %{z} modelli<extra></extra>",
+        ))
+    else:
+        scatter = go.Scattergl if mode == "webgl" else go.Scatter
+        fig.add_trace(scatter(
+            x=ease, y=value, mode="markers",
+            marker={"color": frame["tangibility"].to_numpy(dtype=np.float64), "colorscale": "Viridis",
+                    "cmin": 0, "cmax": 100, "size": 7, "opacity": 0.7, "colorbar": {"title": "Tangibility"}},
+            hovertext=frame["name"].astype(str).to_numpy(),
+            customdata=frame[["scenario", "raters", "tangibility"]].to_numpy(dtype=object),
+            hovertemplate=(
+                "<b>%{hovertext}</b><br>Scenario: %{customdata[0]}<br>Valutatori: %{customdata[1]}"
+                "<br>Ease: %{x:.1f}<br>Value: %{y:.1f}<br>Tangibility: %{customdata[2]:.1f}<extra></extra>"
+            ),
+        ))
+
+    if highlight is not None:
+        fig.add_trace(go.Scatter(
+            x=[highlight[0]], y=[highlight[1]], mode="markers", name="Modello corrente",
+            marker={"color": "red", "size": 14, "line": {"color": "white", "width": 2}},
+            hovertemplate="Modello corrente<br>Ease: %{x:.1f}<br>Value: %{y:.1f}<extra></extra>",
+        ))
+
+    return quadrant_layout(fig, height=650)
@@ -0,0 +1,360 @@
+"""
+Likert questionnaire and evaluation scenarios.
+
+Scenarios are read once per process from `scenarios.json` (plus any user
+files listed in the `VALORE_AI_SCENARIOS` environment variable) and compiled
+into immutable `Scenario` objects holding everything scoring and rendering
+need: the questions per business objective, integer question ids, the
+question -> objective map and the KPI/KQI/KRI rows of the default catalog.
+The questions x objectives membership matrix and the ease/value weight
+vectors scoring works on are NumPy arrays built on first use, so that the
+pages that only list questions do not import NumPy. Adding a scenario is a
+matter of configuration: a scenario may extend another one, appending
+questions and indicators to it.
+
+Kept free of Streamlit so that the scoring module and its command-line
+entry point can use it outside the app.
+"""
+import json
+import os
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+
+BUILTIN_SCENARIOS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios.json")
+
+# Scenario used when none is given; sessions and saved models store it as None.
+DEFAULT_SCENARIO = "Standard"
+
+# Answer assumed for an ease question that was not answered.
+DEFAULT_ANSWER = 4
+
+LIKERT_MIN = 1
+LIKERT_MAX = 7
+
+# Aspects of the "Valutazione Dettagliata" table and the question each one reports.
+DETAIL_ASPECTS = (
+    ("Comprensibilità e Misurabilità", "Il modello AI è facilmente comprensibile e misurabile."),
+    ("Contributo alla Riduzione dei Costi", "Il modello AI contribuisce significativamente alla riduzione dei costi."),
+    ("Contributo all'Aumento dei Ricavi", "Il modello AI contribuisce significativamente all'aumento dei ricavi."),
+)
+
+
+def _frozen_array(values, dtype):
+    import numpy as np
+
+    array = np.array(values, dtype=dtype)
+    array.setflags(write=False)
+    return array
+
+
+def _question_objectives(name, questions):
+    """
+    Map every question of a scenario to its business objective.
+
+    Raises:
+        ValueError: If a question is listed under two objectives.
+    """
+    question_objectives = {}
+    for objective, items in questions.items():
+        for question in items:
+            known = question_objectives.setdefault(question, objective)
+            if known != objective:
+                raise ValueError(
+                    f"La domanda {question!r} dello scenario {name!r} è sotto due obiettivi: "
+                    f"{known!r} e {objective!r}"
+                )
+    return question_objectives
+
+
+@dataclass(frozen=True, eq=False)
+class Scenario:
+    """
+    Compiled, read-only evaluation scenario.
+
+    Question ids are the positions in `question_list`, which follows the
+    questionnaire order (objective by objective); every question belongs to
+    exactly one objective.
+
+    Attributes:
+        name (str): Scenario name, as shown in the app.
+        questions (Mapping): Business objective -> tuple of questions.
+        objectives (tuple): Business objectives, in questionnaire order.
+        question_list (tuple): Every question, indexed by question id.
+        question_ids (Mapping): Question -> question id.
+        question_objectives (Mapping): Question -> business objective.
+        ease_questions (tuple): Questions measuring ease of implementation.
+        base_kpi_rows (tuple): Indicators of the built-in catalog the scenario
+            starts from, as read-only mappings.
+        extra_kpi_rows (tuple): Indicators the scenario adds to any catalog.
+    """
+    name: str
+    questions: MappingProxyType
+    objectives: tuple
+    question_list: tuple
+    question_ids: MappingProxyType
+    question_objectives: MappingProxyType
+    ease_questions: tuple
+    base_kpi_rows: tuple = ()
+    extra_kpi_rows: tuple = ()
+
+    @cached_property
+    def membership(self):
+        """
+        np.ndarray: Read-only questions x objectives matrix, 1.0 where the
+        question belongs to the objective.
+        """
+        objective_positions = {objective: position for position, objective in enumerate(self.objectives)}
+        membership = [[0.0] * len(self.objectives) for _ in self.question_list]
+        for question, objective in self.question_objectives.items():
+            membership[self.question_ids[question]][objective_positions[objective]] = 1.0
+        return _frozen_array(membership, "float64").reshape(len(self.question_list), len(self.objectives))
+
+    @cached_property
+    def ease_weights(self):
+        """
+        np.ndarray: Read-only vector over question ids, 1.0 for the ease questions.
+        """
+        ease_questions = set(self.ease_questions)
+        return _frozen_array([float(question in ease_questions) for question in self.question_list], "float64")
+
+    @cached_property
+    def value_weights(self):
+        """
+        np.ndarray: Read-only vector over question ids, 1.0 for the questions
+        averaged into the value score (all of them).
+        """
+        return _frozen_array([1.0] * len(self.question_list), "float64")
+
+    @classmethod
+    def compile(cls, name, questions, ease_questions, base_kpi_rows=(), extra_kpi_rows=()):
+        """
+        Build a scenario from plain questions.
+
+        Args:
+            name (str): Scenario name.
+            questions (dict): Business objective -> list of questions.
+            ease_questions (iterable): Questions measuring ease of implementation.
+            base_kpi_rows (iterable, optional): Indicators of the built-in catalog.
+            extra_kpi_rows (iterable, optional): Indicators added to any catalog.
+
+        Returns:
+            Scenario: The compiled scenario.
+
+        Raises:
+            ValueError: If a question is listed under two objectives.
+        """
+        questions = {objective: tuple(dict.fromkeys(items)) for objective, items in questions.items()}
+        question_objectives = _question_objectives(name, questions)
+        question_list = tuple(question_objectives)
+        question_ids = {question: position for position, question in enumerate(question_list)}
+
+        return cls(
+            name=name,
+            questions=MappingProxyType(questions),
+            objectives=tuple(questions),
+            question_list=question_list,
+            question_ids=MappingProxyType(question_ids),
+            question_objectives=MappingProxyType(question_objectives),
+            ease_questions=tuple(ease_questions),
+            base_kpi_rows=tuple(MappingProxyType(dict(row)) for row in base_kpi_rows),
+            extra_kpi_rows=tuple(MappingProxyType(dict(row)) for row in extra_kpi_rows),
+        )
+
+
+class ScenarioRegistry:
+    """
+    Ordered, read-only set of compiled scenarios.
+
+    Args:
+        definitions (list): Scenario definitions, dictionaries with "name",
+            "questions" (objective -> list of questions) and optionally
+            "extends", "ease_questions" and "kpi" (list of indicator rows).
+            A scenario extending another one inherits its questions, ease
+            questions and indicators, and appends its own; it must be
+            defined after it.
+
+    Raises:
+        ValueError: If a definition is malformed, duplicated, extends an
+            unknown scenario, lists a question under two objectives or has
+            no ease questions.
+    """
+
+    def __init__(self, definitions):
+        self._definitions = {}
+        self._scenarios = {}
+        for definition in definitions:
+            self._add(definition)
+        if not self._scenarios:
+            raise ValueError("Nessuno scenario di valutazione definito.")
+        self.default = DEFAULT_SCENARIO if DEFAULT_SCENARIO in self._scenarios else next(iter(self._scenarios))
+
+    def _add(self, definition):
+        name = definition.get("name")
+        if not name:
+            raise ValueError("Uno scenario di valutazione non ha un nome.")
+        if name in self._scenarios:
+            raise ValueError(f"Scenario di valutazione duplicato: {name!r}")
+
+        parent = definition.get("extends")
+        if parent is None:
+            questions, ease_questions, base_kpi, extra_kpi = {}, [], list(definition.get("kpi", [])), []
+        else:
+            if parent not in self._definitions:
+                raise ValueError(f"Lo scenario {name!r} estende uno scenario sconosciuto: {parent!r}")
+            inherited = self._definitions[parent]
+            questions = {objective: list(items) for objective, items in inherited["questions"].items()}
+            ease_questions = list(inherited["ease_questions"])
+            base_kpi = inherited["base_kpi"]
+            extra_kpi = inherited["extra_kpi"] + list(definition.get("kpi", []))
+
+        for objective, items in definition.get("questions", {}).items():
+            known = questions.setdefault(objective, [])
+            known.extend(question for question in items if question not in known)
+        if "ease_questions" in definition:
+            ease_questions = list(definition["ease_questions"])
+        if not questions:
+            raise ValueError(f"Lo scenario {name!r} non ha domande.")
+        # A question scores for one objective only: under two, the objective
+        # map shown by the app and the membership matrix would disagree
+        question_objectives = _question_objectives(name, questions)
+        unknown = set(ease_questions) - question_objectives.keys()
+        if unknown:
+            raise ValueError(f"Domande di facilità non presenti nello scenario {name!r}: {', '.join(sorted(unknown))}")
+        if not ease_questions:
+            raise ValueError(f"Lo scenario {name!r} non ha domande di facilità di implementazione.")
+
+        self._definitions[name] = {
+            "questions": questions, "ease_questions": ease_questions, "base_kpi": base_kpi, "extra_kpi": extra_kpi
+        }
+        self._scenarios[name] = Scenario.compile(name, questions, ease_questions, base_kpi, extra_kpi)
+
+    def names(self):
+        """
+        Return the scenario names, in definition order.
+
+        Returns:
+            tuple: The names.
+        """
+        return tuple(self._scenarios)
+
+    def get(self, name=None):
+        """
+        Return a compiled scenario.
+
+        Args:
+            name (str, optional): Scenario name; None selects the default one.
+
+        Returns:
+            Scenario: The scenario.
+
+        Raises:
+            KeyError: If no scenario has this name.
+        """
+        try:
+            return self._scenarios[self.default if name is None else name]
+        except KeyError:
+            raise KeyError(f"Scenario di valutazione sconosciuto: {name!r}") from None
+
+
+def read_scenarios(path):
+    """
+    Read scenario definitions from a JSON file.
+
+    The file holds either a list of scenarios or an object with a
+    "scenarios" list.
+
+    Args:
+        path (str): Path to the JSON file.
+
+    Returns:
+        list: The definitions, in file order.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["scenarios"] if isinstance(data, dict) else data
+
+
+def load_scenarios(extra_paths=()):
+    """
+    Build a registry from the built-in scenarios followed by user files.
+
+    Args:
+        extra_paths (iterable, optional): Additional JSON scenario files.
+
+    Returns:
+        ScenarioRegistry: The compiled registry.
+    """
+    definitions = read_scenarios(BUILTIN_SCENARIOS_PATH)
+    for path in extra_paths:
+        definitions.extend(read_scenarios(path))
+    return ScenarioRegistry(definitions)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_scenario_registry():
+    """
+    Return the process-wide scenario registry, building it on first use.
+
+    User scenario files are read from the `VALORE_AI_SCENARIOS` environment
+    variable, separated by `os.pathsep`.
+
+    Returns:
+        ScenarioRegistry: The shared registry.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                extra = os.environ.get("VALORE_AI_SCENARIOS", "")
+                _registry = load_scenarios([path for path in extra.split(os.pathsep) if path])
+    return _registry
+
+
+def get_scenario(scenario=None):
+    """
+    Return a compiled scenario from the process-wide registry.
+
+    Args:
+        scenario (str, optional): Scenario name; None (or "Standard") selects
+            the default scenario.
+
+    Returns:
+        Scenario: The scenario.
+
+    Raises:
+        KeyError: If no scenario has this name.
+    """
+    return get_scenario_registry().get(scenario)
+
+
+def get_likert_questions(scenario=None):
+    """
+    Get the business objectives of a scenario mapped to their Likert scale questions.
+
+    Args:
+        scenario (str, optional): Scenario name, e.g. 'Churn' to include the
+            churn-related question.
+
+    Returns:
+        Mapping: A read-only mapping of business objectives to tuples of questions.
+    """
+    return get_scenario(scenario).questions
+
+
+def detail_scores(responses):
+    """
+    Return the answers shown in the "Valutazione Dettagliata" table.
+
+    Args:
+        responses (dict): Dictionary of question:score pairs.
+
+    Returns:
+        list: (aspect, score) tuples, in `DETAIL_ASPECTS` order; unanswered
+        questions count as `DEFAULT_ANSWER`.
+    """
+    return [(aspect, responses.get(question, DEFAULT_ANSWER)) for aspect, question in DETAIL_ASPECTS]
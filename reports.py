@@ -0,0 +1,618 @@
+"""
+Batch export of evaluation reports, one HTML or PDF file per stored model.
+
+Each report holds what the "Risultati" page shows for the model: the
+tangibility gauge, the Ease of Implementation vs Value Delivered quadrant,
+the KPI/KQI/KRI of the relevant objectives with their formulas and the
+"Valutazione Dettagliata" table.
+
+Reports are rendered by a pool of worker processes. Each worker opens the
+evaluation store, the catalog store and the formula registry once, and
+builds its chart templates once (see `charts.py`), so a report only pays for
+its own data. Workers write their files as soon as they are rendered; the
+main process collects the results as they complete and reports the
+throughput.
+
+Models evaluated against an uploaded catalog are reported with the default
+catalog of their scenario (uploads are only kept in memory by the app),
+unless a catalog file is given with `--catalog`.
+
+Command-line usage:
+    python reports.py reports/ [--format html pdf] [--workers 8] [--scenario Churn] [--limit 500]
+"""
+import argparse
+import base64
+import html
+import os
+import re
+import sys
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+
+from questionnaire import detail_scores, get_scenario, get_scenario_registry
+
+REPORT_FORMATS = ("html", "pdf")
+
+# Models listed from the store per query.
+MODELS_PAGE_SIZE = 500
+
+# PDF page size (A4, inches) and layout of the listing pages.
+PDF_PAGE_SIZE = (8.27, 11.69)
+PDF_LINE_HEIGHT = 0.021
+PDF_TOP = 0.95
+PDF_BOTTOM = 0.05
+
+# Text style and height (in lines) of each kind of line of the listing pages.
+PDF_STYLES = {
+    "heading": {"fontsize": 13, "fontweight": "bold"},
+    "subheading": {"fontsize": 11, "fontweight": "bold"},
+    "bold": {"fontsize": 9, "fontweight": "bold"},
+    "text": {"fontsize": 9},
+    "formula": {"fontsize": 10},
+    "note": {"fontsize": 8, "color": "dimgray"},
+}
+PDF_LINE_SPACING = {"heading": 1.8, "subheading": 1.4, "bold": 1.2, "text": 1.0, "formula": 1.3, "note": 1.0}
+
+KATEX_CDN = "https://cdn.jsdelivr.net/npm/katex@0.16.11/dist"
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="it">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" href="{katex}/katex.min.css">
+<script defer src="{katex}/katex.min.js"></script>
+<script defer src="{katex}/contrib/auto-render.min.js" onload="renderMathInElement(document.body)"></script>
+<style>
+  body {{ font-family: sans-serif; color: #303030; max-width: 960px; margin: 2em auto; }}
+  table {{ border-collapse: collapse; }}
+  td, th {{ border: 1px solid #ddd; padding: 4px 12px; text-align: left; }}
+  .note {{ color: #808080; font-size: 0.9em; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+@dataclass
+class Metric:
+    """
+    Metric of an indicator, with its resolved formula.
+
+    Attributes:
+        name (str): Metric name.
+        formula (MetricFormula): Formula and example.
+        suggestion (FormulaSuggestion or None): Set when the formula was
+            suggested by similarity with a known metric.
+    """
+    name: str
+    formula: object
+    suggestion: object = None
+
+
+@dataclass
+class Indicator:
+    """
+    KPI/KQI/KRI of the report.
+
+    Attributes:
+        tipo (str): KPI, KQI or KRI.
+        categoria (str): Category of the indicator.
+        focus (str): Focus of the indicator.
+        metrics (list): `Metric` entries.
+    """
+    tipo: str
+    categoria: str
+    focus: str
+    metrics: list
+
+
+@dataclass
+class Report:
+    """
+    Content of the report of a model.
+
+    Attributes:
+        model (dict): The stored model.
+        scenario (Scenario): Scenario the model was evaluated with.
+        raters (list): Names of the raters.
+        ease (float): Ease of implementation score.
+        value (float): Value delivered score.
+        tangibility (float): Tangibility score.
+        indicators (dict): Relevant objective -> list of `Indicator`.
+        details (list): (aspect, score) rows of the "Valutazione Dettagliata" table.
+        notes (list): Remarks on how the report was produced.
+    """
+    model: dict
+    scenario: object
+    raters: list
+    ease: float
+    value: float
+    tangibility: float
+    indicators: dict
+    details: list
+    notes: list
+
+
+def build_report(model, evaluations, catalog, formulas, notes=()):
+    """
+    Score a model and collect the content of its report.
+
+    Args:
+        model (dict): The stored model.
+        evaluations (dict): Rater -> dictionary of question:score pairs.
+        catalog (KpiCatalog): Catalog the indicators are taken from.
+        formulas (FormulaRegistry): Registry resolving the metric formulas.
+        notes (iterable, optional): Remarks shown in the report.
+
+    Returns:
+        Report: The report content.
+    """
+    from scoring import consensus_responses, score_evaluation
+
+    notes = list(notes)
+    try:
+        scenario = get_scenario(model["scenario"])
+    except KeyError:
+        scenario = get_scenario()
+        notes.append(f"Lo scenario '{model['scenario']}' non è più configurato: utilizzo dello scenario predefinito.")
+    responses = consensus_responses(evaluations) if len(evaluations) > 1 else next(iter(evaluations.values()))
+    scores = score_evaluation(responses, scenario)
+
+    indicators = {}
+    for objective in scores.relevant_objectives():
+        entries = indicators.setdefault(objective, [])
+        for tipo in catalog.tipi(objective):
+            for row in catalog.rows(objective, tipo).tolist():
+                categoria, focus, names = catalog.indicator(row)
+                metrics = []
+                for name in names:
+                    formula = formulas.resolve(name)
+                    suggestion = formulas.suggest(name) if formula.pattern is None else None
+                    metrics.append(Metric(name, suggestion.formula if suggestion else formula, suggestion))
+                entries.append(Indicator(tipo, categoria, focus, metrics))
+
+    return Report(
+        model=model,
+        scenario=scenario,
+        raters=list(evaluations),
+        ease=float(scores.ease[0]),
+        value=float(scores.value[0]),
+        tangibility=float(scores.tangibility[0]),
+        indicators=indicators,
+        details=detail_scores(responses),
+        notes=notes,
+    )
+
+
+def report_filename(model, extension):
+    """
+    Return the file name of the report of a model.
+
+    Args:
+        model (dict): The stored model.
+        extension (str): "html" or "pdf".
+
+    Returns:
+        str: "<id>-<name>.<extension>", the name reduced to safe characters.
+    """
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", model["name"]).strip("-").lower()[:60] or "modello"
+    return f"{model['id']:06d}-{slug}.{extension}"
+
+
+def _format_score(score):
+    return f"{score:.2f}" if isinstance(score, float) else str(score)
+
+
+@lru_cache(maxsize=4096)
+def _mathtext_ok(formula):
+    from matplotlib.mathtext import MathTextParser
+
+    try:
+        MathTextParser("path").parse(f"${formula}$")
+        return True
+    except ValueError:
+        return False
+
+
+def _plain(text):
+    # Dollar signs would start a mathtext expression in matplotlib
+    return text.replace("$", r"\$")
+
+
+class ReportRenderer:
+    """
+    Renders reports to files, reusing its stores and chart templates.
+
+    One renderer is built per worker process.
+
+    Args:
+        output_dir (str): Directory the reports are written to.
+        formats (sequence): Formats to write ("html" and/or "pdf").
+        store_url (str): URL of the evaluation store.
+        catalog_path (str, optional): Catalog file used for every model
+            instead of the default catalog of its scenario.
+    """
+
+    def __init__(self, output_dir, formats, store_url, catalog_path=None):
+        from catalog_store import get_catalog_store
+        from charts import GaugeTemplate, QuadrantTemplate
+        from evaluation_store import open_store
+        from metric_formulas import get_formula_registry
+
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.store = open_store(store_url)
+        self.catalogs = get_catalog_store()
+        self.formulas = get_formula_registry()
+        self.catalog_path = catalog_path
+        self._catalog_data = None
+        if catalog_path:
+            with open(catalog_path, "rb") as f:
+                self._catalog_data = f.read()
+        self.gauge = GaugeTemplate() if "html" in self.formats else None
+        self.quadrant = QuadrantTemplate() if "html" in self.formats else None
+        self._pdf_pages = None
+
+    def _catalog(self, model):
+        scenario = model["scenario"] if model["scenario"] in get_scenario_registry().names() else None
+        notes = []
+        if self._catalog_data is not None:
+            handle = self.catalogs.load_upload(self._catalog_data, scenario=scenario, filename=self.catalog_path)
+        else:
+            handle = self.catalogs.load_default(scenario=scenario)
+            if model["catalog_uploaded"]:
+                notes.append("Il modello è stato valutato con un catalogo caricato: gli indicatori provengono dal catalogo predefinito.")
+        return self.catalogs.resolve(handle), notes
+
+    def render(self, model_id):
+        """
+        Render the reports of a model and write them to the output directory.
+
+        Args:
+            model_id (int): Id of the stored model.
+
+        Returns:
+            list: (path, size in bytes) of each file written; empty if the
+            model does not exist or has no evaluations.
+        """
+        model = self.store.load_model(model_id)
+        evaluations = self.store.load_evaluations(model_id) if model is not None else {}
+        if not evaluations:
+            return []
+        catalog, notes = self._catalog(model)
+        report = build_report(model, evaluations, catalog, self.formulas, notes)
+
+        written = []
+        for extension in self.formats:
+            path = os.path.join(self.output_dir, report_filename(model, extension))
+            if extension == "html":
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(self.html(report))
+            else:
+                self.pdf(report, path)
+            written.append((path, os.path.getsize(path)))
+        return written
+
+    def html(self, report):
+        """
+        Render a report as a standalone HTML page.
+
+        The gauge is an interactive Plotly chart (plotly.js and KaTeX, for
+        the formulas, are loaded from their CDN); the quadrant is an
+        embedded PNG.
+
+        Args:
+            report (Report): The report content.
+
+        Returns:
+            str: The HTML page.
+        """
+        model = report.model
+        escape = html.escape
+        parts = [
+            "<h1>Risultati della Valutazione</h1>",
+            f"<h2>Modello/App AI: {escape(model['name'])}</h2>",
+            f"<p><strong>Descrizione:</strong> {escape(model['description'] or '')}</p>",
+            f"<p><strong>Scenario:</strong> {escape(report.scenario.name)} &middot; "
+            f"<strong>Valutatori:</strong> {escape(', '.join(report.raters))}</p>",
+        ]
+        parts.extend(f'<p class="note">{escape(note)}</p>' for note in report.notes)
+
+        quadrant = base64.b64encode(self.quadrant.png(report.ease, report.value)).decode("ascii")
+        parts += [
+            "<h2>Valutazione Complessiva</h2>",
+            "<h3>Tangibility of the AI Model</h3>",
+            self.gauge.to_html(report.tangibility, "Model Tangibility Score"),
+            "<h3>Matrix Representation</h3>",
+            f'<img src="data:image/png;base64,{quadrant}" alt="Ease of Implementation vs Value Delivered" width="600">',
+            f"<p><strong>Ease of Implementation Score:</strong> {report.ease:.2f}<br>"
+            f"<strong>Value Delivered Score:</strong> {report.value:.2f}</p>",
+            "<h2>KPI/KQI/KRI per Obiettivo di Business</h2>",
+        ]
+        if not report.indicators:
+            parts.append("<p>Nessun obiettivo rilevante identificato dalla valutazione.</p>")
+        for objective, indicators in report.indicators.items():
+            parts.append(f"<h3>{escape(objective)}</h3>")
+            if not indicators:
+                parts.append("<p>Nessun indicatore disponibile per questo obiettivo.</p>")
+            current_tipo = None
+            for indicator in indicators:
+                if indicator.tipo != current_tipo:
+                    parts.append(f"<h4>{escape(indicator.tipo)}</h4>")
+                    current_tipo = indicator.tipo
+                parts.append(
+                    f"<p><strong>Categoria {escape(indicator.tipo)}:</strong> {escape(indicator.categoria)}<br>"
+                    f"<strong>Focus:</strong> {escape(indicator.focus)}</p><ul>"
+                )
+                for metric in indicator.metrics:
+                    parts.append(
+                        f"<li><strong>{escape(metric.name.capitalize())}:</strong> \\({escape(metric.formula.formula)}\\)"
+                    )
+                    if metric.suggestion is not None:
+                        parts.append(
+                            f'<br><span class="note">Formula suggerita per similarità con "{escape(metric.formula.pattern)}" '
+                            f"(confidenza {metric.suggestion.confidence:.0%}).</span>"
+                        )
+                    parts.append(f"<br><em>Esempio:</em> {escape(metric.formula.example)}</li>")
+                parts.append("</ul>")
+
+        parts.append("<h2>Valutazione Dettagliata</h2><table><tr><th>Aspetto</th><th>Valutazione</th></tr>")
+        parts.extend(
+            f"<tr><td>{escape(aspect)}</td><td>{_format_score(score)}</td></tr>" for aspect, score in report.details
+        )
+        parts.append("</table>")
+        return HTML_TEMPLATE.format(title=escape(model["name"]), katex=KATEX_CDN, body="\n".join(parts))
+
+    def _pdf_templates(self):
+        if self._pdf_pages is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+
+            from charts import GaugePlotTemplate, draw_quadrant
+
+            summary = Figure(figsize=PDF_PAGE_SIZE)
+            FigureCanvasAgg(summary)
+            gauge = GaugePlotTemplate(summary.add_axes([0.1, 0.52, 0.8, 0.22]))
+            quadrant_ax = summary.add_axes([0.2, 0.12, 0.6, 0.34])
+            draw_quadrant(quadrant_ax)
+            marker = quadrant_ax.scatter([50], [50], color="red", s=100)
+            header = summary.text(0.08, 0.95, "", fontsize=16, fontweight="bold", va="top")
+            body = summary.text(0.08, 0.91, "", fontsize=9, va="top", linespacing=1.4)
+            scores = summary.text(0.08, 0.07, "", fontsize=10, va="top", linespacing=1.5)
+
+            listing = Figure(figsize=PDF_PAGE_SIZE)
+            FigureCanvasAgg(listing)
+            self._pdf_pages = {
+                "summary": summary, "gauge": gauge, "marker": marker, "header": header,
+                "body": body, "scores": scores, "listing": listing,
+            }
+        return self._pdf_pages
+
+    def _pdf_lines(self, report):
+        lines = [("heading", "KPI/KQI/KRI per Obiettivo di Business")]
+        if not report.indicators:
+            lines.append(("text", "Nessun obiettivo rilevante identificato dalla valutazione."))
+        for objective, indicators in report.indicators.items():
+            lines.append(("heading", objective))
+            current_tipo = None
+            for indicator in indicators:
+                if indicator.tipo != current_tipo:
+                    lines.append(("subheading", indicator.tipo))
+                    current_tipo = indicator.tipo
+                lines.append(("bold", f"Categoria {indicator.tipo}: {indicator.categoria} - Focus: {indicator.focus}"))
+                for metric in indicator.metrics:
+                    lines.append(("text", f"{metric.name.capitalize()}:"))
+                    formula = metric.formula.formula
+                    lines.append(("formula", f"${formula}$" if _mathtext_ok(formula) else _plain(formula)))
+                    if metric.suggestion is not None:
+                        lines.append(("note", f"Formula suggerita per similarità con \"{metric.formula.pattern}\" "
+                                              f"(confidenza {metric.suggestion.confidence:.0%})."))
+                    for line in textwrap.wrap(f"Esempio: {metric.formula.example}", 110):
+                        lines.append(("note", line))
+        lines.append(("heading", "Valutazione Dettagliata"))
+        lines.extend(("text", f"{aspect}: {_format_score(score)}") for aspect, score in report.details)
+        return lines
+
+    def pdf(self, report, path):
+        """
+        Render a report as a PDF file: a summary page with the charts and
+        the scores, followed by the KPI listing.
+
+        Args:
+            report (Report): The report content.
+            path (str): Destination file.
+        """
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        pages = self._pdf_templates()
+        model = report.model
+        pages["header"].set_text(_plain(f"Risultati della Valutazione: {model['name']}"))
+        description = textwrap.fill(f"Descrizione: {model['description'] or ''}", 110, max_lines=6, placeholder=" ...")
+        pages["body"].set_text(_plain("\n".join([
+            description,
+            f"Scenario: {report.scenario.name} - Valutatori: {', '.join(report.raters)}",
+            *report.notes,
+        ])))
+        pages["gauge"].update(report.tangibility, "Model Tangibility Score")
+        pages["marker"].set_offsets([[report.ease, report.value]])
+        pages["scores"].set_text(
+            f"Ease of Implementation Score: {report.ease:.2f}\nValue Delivered Score: {report.value:.2f}"
+        )
+
+        listing = pages["listing"]
+        lines = self._pdf_lines(report)
+
+        with PdfPages(path) as pdf:
+            pdf.savefig(pages["summary"])
+            y = None
+            for style, line in lines:
+                height = PDF_LINE_HEIGHT * PDF_LINE_SPACING[style]
+                if y is None or y - height < PDF_BOTTOM:
+                    if y is not None:
+                        pdf.savefig(listing)
+                    for text in list(listing.texts):
+                        text.remove()
+                    y = PDF_TOP
+                text = line if style == "formula" else _plain(line)
+                indent = 0.1 if style in ("formula", "note") else 0.07
+                listing.text(indent, y - height + PDF_LINE_HEIGHT, text, va="top", **PDF_STYLES[style])
+                y -= height
+            if y is not None:
+                pdf.savefig(listing)
+
+
+_renderer = None
+
+
+def _init_worker(output_dir, formats, store_url, catalog_path):
+    global _renderer
+    _renderer = ReportRenderer(output_dir, formats, store_url, catalog_path)
+
+
+def _render_model(model_id):
+    return model_id, _renderer.render(model_id)
+
+
+def list_model_ids(store, scenario=None, objective=None, name=None, limit=None):
+    """
+    List the ids of the stored models that have at least one evaluation.
+
+    Args:
+        store (EvaluationStore): The evaluation store.
+        scenario (str, optional): Only models of this scenario; the default
+            scenario matches the models saved without one.
+        objective (str, optional): Only models with responses for this objective.
+        name (str, optional): Only models whose name contains this text.
+        limit (int, optional): Maximum number of ids.
+
+    Returns:
+        list: Model ids, most recently updated first.
+    """
+    default = scenario is not None and scenario == get_scenario_registry().default
+    ids, offset = [], 0
+    while limit is None or len(ids) < limit:
+        models = store.list_models(
+            limit=MODELS_PAGE_SIZE, offset=offset, name=name, scenario=None if default else scenario, objective=objective
+        )
+        if not models:
+            break
+        offset += len(models)
+        ids.extend(
+            model["id"] for model in models
+            if model["evaluations"] and (not default or model["scenario"] in (None, scenario))
+        )
+    return ids[:limit] if limit is not None else ids
+
+
+def export_reports(model_ids, output_dir, formats=("html",), workers=None, store_url=None, catalog_path=None):
+    """
+    Render the reports of several models in parallel.
+
+    Results are yielded as soon as each model is done, in completion order.
+
+    Args:
+        model_ids (iterable): Ids of the stored models.
+        output_dir (str): Directory the reports are written to (created if needed).
+        formats (sequence, optional): Formats to write ("html" and/or "pdf").
+        workers (int, optional): Worker processes; defaults to the number of
+            CPUs. With 1, reports are rendered in the calling process.
+        store_url (str, optional): URL of the evaluation store; defaults to
+            the `VALORE_AI_STORE_URL` environment variable or the app's file.
+        catalog_path (str, optional): Catalog file used for every model.
+
+    Yields:
+        tuple: (model_id, files, error) where files lists the (path, size)
+        written and error is the exception raised for the model, or None.
+    """
+    from evaluation_store import DEFAULT_STORE_URL
+
+    store_url = store_url or os.environ.get("VALORE_AI_STORE_URL", DEFAULT_STORE_URL)
+    os.makedirs(output_dir, exist_ok=True)
+    init_args = (output_dir, tuple(formats), store_url, catalog_path)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        _init_worker(*init_args)
+        for model_id in model_ids:
+            try:
+                yield (*_render_model(model_id), None)
+            except Exception as e:
+                yield model_id, [], e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+        futures = {pool.submit(_render_model, model_id): model_id for model_id in model_ids}
+        for future in as_completed(futures):
+            try:
+                yield (*future.result(), None)
+            except Exception as e:
+                yield futures[future], [], e
+
+
+def main(argv=None):
+    """
+    Command-line entry point: export the reports of the stored models.
+
+    Args:
+        argv (list, optional): Command-line arguments, defaults to `sys.argv[1:]`.
+    """
+    from evaluation_store import DEFAULT_STORE_URL, open_store
+
+    registry = get_scenario_registry()
+    parser = argparse.ArgumentParser(description="Esporta i report delle valutazioni salvate, uno per modello.")
+    parser.add_argument("output_dir", help="Cartella in cui scrivere i report.")
+    parser.add_argument("--format", nargs="+", choices=REPORT_FORMATS, default=["html"], help="Formati dei report.")
+    parser.add_argument("--workers", type=int, help="Processi di rendering (predefinito: numero di CPU).")
+    parser.add_argument("--store", default=os.environ.get("VALORE_AI_STORE_URL", DEFAULT_STORE_URL), help="URL dell'archivio valutazioni.")
+    parser.add_argument("--catalog", help="Catalogo KPI (CSV, Parquet o Arrow) da usare per tutti i modelli.")
+    parser.add_argument("--scenario", choices=registry.names(), help="Solo i modelli di questo scenario.")
+    parser.add_argument("--objective", help="Solo i modelli con risposte per questo obiettivo di business.")
+    parser.add_argument("--name", help="Solo i modelli il cui nome contiene questo testo.")
+    parser.add_argument("--limit", type=int, help="Numero massimo di report.")
+    parser.add_argument("--models", type=int, nargs="+", help="Id dei modelli da esportare (ignora i filtri).")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers deve essere almeno 1.")
+
+    if args.models:
+        model_ids = args.models
+    else:
+        store = open_store(args.store)
+        model_ids = list_model_ids(store, args.scenario, args.objective, args.name, args.limit)
+        store.close()
+    if not model_ids:
+        print("Nessun modello valutato da esportare.", file=sys.stderr)
+        return
+
+    start = time.perf_counter()
+    done, failed, total_bytes = 0, 0, 0
+    for model_id, files, error in export_reports(
+        model_ids, args.output_dir, args.format, args.workers, args.store, args.catalog
+    ):
+        if error is not None:
+            failed += 1
+            print(f"Modello {model_id}: errore: {error}", file=sys.stderr)
+            continue
+        if files:
+            done += 1
+            total_bytes += sum(size for _, size in files)
+            elapsed = time.perf_counter() - start
+            print(f"[{done}/{len(model_ids)}] {', '.join(path for path, _ in files)} ({done / elapsed:.1f} report/s)")
+    elapsed = time.perf_counter() - start
+    print(
+        f"{done} report in {elapsed:.2f}s ({done / elapsed:.1f} report/s, {total_bytes / 1e6:.1f} MB), {failed} errori.",
+        file=sys.stderr
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,664 @@
+"""
+Vectorized scoring of AI model assessments.
+
+The functions here take a responses matrix (one row per assessment, one
+column per question, NaN for unanswered questions) and compute, for every
+row at once:
+
+- the ease of implementation score (mean of the ease questions, scaled to 100);
+- the value delivered score (mean of all answered questions, scaled to 100);
+- the tangibility score (average of the two);
+- the score of each business objective (sum of its answered questions);
+- the relevant objectives (those scoring at least the average objective score).
+
+When several raters evaluate the same model, `consensus_responses`,
+`bootstrap_ci` and `intraclass_correlation` aggregate their answers; the
+bootstrap draws every resample at once as a matrix of multinomial counts.
+
+The interactive results page scores its single evaluation through the same
+code, so batch and interactive results are identical. Its what-if analysis
+(`sensitivity_sweep`) is a batch too: every single-answer change of the
+evaluation is a row of one responses matrix.
+
+Command-line usage:
+    python scoring.py responses.csv [--scenario Churn] [--id-column id] [-o scores.csv]
+"""
+import argparse
+import os
+import sys
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+from questionnaire import DEFAULT_ANSWER, Scenario, get_scenario, get_scenario_registry
+
+# Multiplier bringing a 1-7 Likert mean to a 0-100 scale.
+SCORE_SCALE = 14.3
+
+# Separator used for the relevant objectives column of the CLI output.
+OBJECTIVE_SEPARATOR = "; "
+
+# Defaults of the multi-rater bootstrap.
+BOOTSTRAP_RESAMPLES = 10_000
+BOOTSTRAP_CONFIDENCE = 0.95
+
+
+@dataclass
+class BatchScores:
+    """
+    Scores of a batch of assessments.
+
+    Attributes:
+        index (pd.Index): Row labels of the scored responses matrix, or
+            None for positions.
+        objectives (list): Business objectives, in questionnaire order.
+        ease (np.ndarray): Ease of implementation score per assessment.
+        value (np.ndarray): Value delivered score per assessment.
+        tangibility (np.ndarray): Tangibility score per assessment.
+        objective_scores (np.ndarray): Assessments x objectives sums; NaN where
+            no question of the objective was answered.
+        relevant (np.ndarray): Assessments x objectives boolean mask of the
+            relevant objectives.
+    """
+    index: pd.Index
+    objectives: list
+    ease: np.ndarray
+    value: np.ndarray
+    tangibility: np.ndarray
+    objective_scores: np.ndarray
+    relevant: np.ndarray
+
+    def relevant_objectives(self, row=0):
+        """
+        Return the relevant objectives of one assessment.
+
+        Args:
+            row (int, optional): Position of the assessment in the batch.
+
+        Returns:
+            list: Relevant objectives, in questionnaire order.
+        """
+        return [objective for objective, keep in zip(self.objectives, self.relevant[row]) if keep]
+
+    def business_scores(self, row=0):
+        """
+        Return the objective scores of one assessment.
+
+        Args:
+            row (int, optional): Position of the assessment in the batch.
+
+        Returns:
+            dict: Objective -> score, for the objectives with answered questions.
+        """
+        scores = self.objective_scores[row]
+        return {objective: score for objective, score in zip(self.objectives, scores) if not np.isnan(score)}
+
+    def to_frame(self):
+        """
+        Flatten the scores into a dataframe.
+
+        Returns:
+            pd.DataFrame: One row per assessment with the ease, value and
+            tangibility scores, one "score: <objective>" column per objective
+            and the relevant objectives joined by `OBJECTIVE_SEPARATOR`.
+        """
+        frame = pd.DataFrame({
+            "ease": self.ease,
+            "value": self.value,
+            "tangibility": self.tangibility,
+        }, index=self.index)
+        for position, objective in enumerate(self.objectives):
+            frame[f"score: {objective}"] = self.objective_scores[:, position]
+        objectives = np.asarray(self.objectives, dtype=object)
+        frame["relevant_objectives"] = [OBJECTIVE_SEPARATOR.join(objectives[mask]) for mask in self.relevant]
+        return frame
+
+
+def responses_matrix(evaluations, questions=None):
+    """
+    Build a responses matrix from a list of evaluations.
+
+    Args:
+        evaluations (list): Dictionaries of question:score pairs.
+        questions (list, optional): Column order; defaults to the order in
+            which questions first appear.
+
+    Returns:
+        pd.DataFrame: Assessments x questions matrix of floats, NaN where a
+        question was not answered.
+    """
+    return pd.DataFrame.from_records(list(evaluations), columns=questions).astype(np.float64)
+
+
+def as_scenario(likert_questions, ease_questions=None):
+    """
+    Return the compiled scenario to score against.
+
+    Args:
+        likert_questions (Scenario or dict): A compiled scenario, or business
+            objective -> list of questions.
+        ease_questions (sequence, optional): Questions measuring ease of
+            implementation; defaults to those of the scenario, or of the
+            default scenario for a plain dictionary.
+
+    Returns:
+        Scenario: `likert_questions` itself when it is already compiled and no
+        other ease questions are given, otherwise a scenario compiled from them.
+    """
+    if isinstance(likert_questions, Scenario):
+        if ease_questions is None or tuple(ease_questions) == likert_questions.ease_questions:
+            return likert_questions
+        questions = likert_questions.questions
+    else:
+        questions = likert_questions
+    if ease_questions is None:
+        ease_questions = get_scenario().ease_questions
+    return Scenario.compile("", questions, ease_questions)
+
+
+def column_weights(columns, scenario):
+    """
+    Align the precomputed weights of a scenario with the columns of a responses matrix.
+
+    Columns already in question-id order reuse the scenario arrays as they
+    are; otherwise they are gathered by question id. Columns that are not
+    questions of the scenario belong to no objective but still count
+    towards the value score.
+
+    Args:
+        columns (sequence): Questions, one per column of the responses matrix.
+        scenario (Scenario): The compiled scenario.
+
+    Returns:
+        tuple: (membership, ease_weights, value_weights) with one row (or
+        entry) per column.
+    """
+    if len(columns) == len(scenario.question_list) and tuple(columns) == scenario.question_list:
+        return scenario.membership, scenario.ease_weights, scenario.value_weights
+    ids = np.fromiter((scenario.question_ids.get(question, -1) for question in columns), dtype=np.intp, count=len(columns))
+    known = ids >= 0
+    membership = np.zeros((len(columns), len(scenario.objectives)))
+    membership[known] = scenario.membership[ids[known]]
+    ease_set = set(scenario.ease_questions)
+    ease_weights = np.fromiter((question in ease_set for question in columns), dtype=np.float64, count=len(columns))
+    value_weights = np.ones(len(columns))
+    value_weights[known] = scenario.value_weights[ids[known]]
+    return membership, ease_weights, value_weights
+
+
+@timed()
+def score_matrix(responses, likert_questions, ease_questions=None):
+    """
+    Score every assessment of a responses matrix at once.
+
+    Columns that belong to no objective of the scenario still count
+    towards the value score, as they would in a single evaluation.
+
+    Args:
+        responses (pd.DataFrame): Assessments x questions matrix, NaN where a
+            question was not answered.
+        likert_questions (Scenario or dict): The compiled scenario, or
+            business objective -> list of questions.
+        ease_questions (sequence, optional): Questions measuring ease of
+            implementation, overriding those of the scenario; unanswered
+            ones count as `DEFAULT_ANSWER`.
+
+    Returns:
+        BatchScores: The scores of every assessment.
+    """
+    scenario = as_scenario(likert_questions, ease_questions)
+    values = responses.to_numpy(dtype=np.float64, na_value=np.nan)
+    return score_values(values, responses.columns, scenario, responses.index)
+
+
+def score_values(values, columns, scenario, index=None):
+    """
+    Score the rows of a NumPy responses matrix.
+
+    This is the computation behind `score_matrix`, without the DataFrame
+    around it, so that a single evaluation is scored in microseconds.
+
+    Args:
+        values (np.ndarray): Assessments x questions matrix of floats, NaN
+            where a question was not answered.
+        columns (sequence): Questions, one per column of `values`.
+        scenario (Scenario): The compiled scenario.
+        index (pd.Index, optional): Row labels; None for positions.
+
+    Returns:
+        BatchScores: The scores of every assessment.
+    """
+    membership, ease_weights, value_weights = column_weights(columns, scenario)
+    answered = ~np.isnan(values)
+    filled = np.where(answered, values, 0.0)
+
+    # Value: mean of the answered questions
+    with np.errstate(invalid="ignore", divide="ignore"):
+        value = (filled @ value_weights) / (answered @ value_weights) * SCORE_SCALE
+
+    # Ease: mean of the ease questions, unanswered (or absent) ones counting as the default answer
+    n_ease = len(scenario.ease_questions)
+    if n_ease:
+        ease_total = np.where(answered, values, DEFAULT_ANSWER) @ ease_weights + (n_ease - ease_weights.sum()) * DEFAULT_ANSWER
+        ease = ease_total / n_ease * SCORE_SCALE
+    else:
+        # No ease question (a scenario compiled by hand; the registry refuses
+        # them): the ease is that of unanswered ones
+        ease = np.full(len(values), DEFAULT_ANSWER * SCORE_SCALE)
+
+    tangibility = (value + ease) / 2
+
+    # Objective scores: questions x objectives membership matrix
+    present = (answered.astype(np.float64) @ membership) > 0
+    objective_scores = np.where(present, filled @ membership, np.nan)
+
+    # Relevant objectives: score at least the average over objectives with answers
+    n_present = present.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        average = np.where(present, objective_scores, 0.0).sum(axis=1) / n_present
+    relevant = present & (objective_scores >= average[:, None])
+
+    return BatchScores(
+        index=index,
+        objectives=list(scenario.objectives),
+        ease=ease,
+        value=value,
+        tangibility=tangibility,
+        objective_scores=objective_scores,
+        relevant=relevant,
+    )
+
+
+def evaluation_columns(responses, scenario):
+    """
+    Return the columns a single evaluation is scored on: the questions of
+    the scenario in question-id order, so that its weights apply as they
+    are, then the other answered questions.
+
+    Args:
+        responses (dict): Dictionary of question:score pairs.
+        scenario (Scenario): The compiled scenario.
+
+    Returns:
+        tuple: The questions.
+    """
+    extra = tuple(question for question in responses if question not in scenario.question_ids)
+    return scenario.question_list + extra if extra else scenario.question_list
+
+
+def answer_vector(responses, columns):
+    """
+    Return the answers of a single evaluation as a vector.
+
+    Args:
+        responses (dict): Dictionary of question:score pairs.
+        columns (sequence): Questions, one per entry of the vector.
+
+    Returns:
+        np.ndarray: One float per column, NaN where the question was not answered.
+    """
+    return np.fromiter((responses.get(question, np.nan) for question in columns), dtype=np.float64, count=len(columns))
+
+
+def score_evaluation(responses, likert_questions):
+    """
+    Score a single evaluation.
+
+    Args:
+        responses (dict): Dictionary of question:score pairs.
+        likert_questions (Scenario or dict): The compiled scenario, or
+            business objective -> list of questions.
+
+    Returns:
+        BatchScores: A one-row batch.
+    """
+    scenario = as_scenario(likert_questions)
+    # Scored without a DataFrame: this runs on every rerun of the results page
+    columns = evaluation_columns(responses, scenario)
+    return score_values(answer_vector(responses, columns)[None, :], columns, scenario)
+
+
+def calculate_overall_scores(responses):
+    """
+    Calculate overall 'ease score' and 'value score' based on the responses.
+
+    Args:
+        responses (dict): Dictionary of question:score pairs.
+
+    Returns:
+        tuple: (ease_score, value_score) both scaled to 100.
+    """
+    scores = score_evaluation(responses, get_scenario())
+    return float(scores.ease[0]), float(scores.value[0])
+
+
+@dataclass
+class Sensitivity:
+    """
+    What-if scores of an evaluation, answering each question in turn with
+    every Likert value while the other answers stay as they are.
+
+    Attributes:
+        questions (list): The swept questions, in questionnaire order.
+        values (np.ndarray): The Likert values tried for each question.
+        base (BatchScores): Scores of the evaluation as it is.
+        scores (BatchScores): Scores of the variants, question-major: the
+            variant answering question `i` with `values[j]` is row
+            `i * len(values) + j`.
+    """
+    questions: list
+    values: np.ndarray
+    base: BatchScores
+    scores: BatchScores
+
+    def grid(self, metric):
+        """
+        Return a score of every variant as a questions x values grid.
+
+        Args:
+            metric (str): "ease", "value" or "tangibility".
+
+        Returns:
+            np.ndarray: The scores of the variants.
+        """
+        return getattr(self.scores, metric).reshape(len(self.questions), len(self.values))
+
+    def deltas(self, metric):
+        """
+        Return the change of a score for every variant.
+
+        Args:
+            metric (str): "ease", "value" or "tangibility".
+
+        Returns:
+            np.ndarray: Questions x values grid of the variant score minus the
+            score of the evaluation.
+        """
+        return self.grid(metric) - getattr(self.base, metric)[0]
+
+    def objective_changes(self):
+        """
+        Return the relevant objectives each variant adds and removes.
+
+        Returns:
+            tuple: (added, removed) questions x values x objectives boolean
+            arrays, against the relevant objectives of the evaluation.
+        """
+        relevant = self.scores.relevant.reshape(len(self.questions), len(self.values), -1)
+        base = self.base.relevant[0]
+        return relevant & ~base, base & ~relevant
+
+
+@timed()
+def sensitivity_sweep(responses, likert_questions, values=range(1, 8)):
+    """
+    Score every single-answer change of an evaluation in one batch.
+
+    The variants are the rows of one responses matrix (the evaluation
+    repeated, with the swept answer replaced along its diagonal), scored by
+    a single `score_values` call.
+
+    Args:
+        responses (dict): Dictionary of question:score pairs.
+        likert_questions (Scenario or dict): The compiled scenario, or
+            business objective -> list of questions.
+        values (sequence, optional): Likert values to try for each question.
+
+    Returns:
+        Sensitivity: The scores of the evaluation and of its variants.
+    """
+    scenario = as_scenario(likert_questions)
+    questions = list(scenario.question_list)
+    columns = evaluation_columns(responses, scenario)
+    answers = answer_vector(responses, columns)
+    values = np.asarray(values, dtype=np.float64)
+
+    # Question-major variants: row i * len(values) + j answers question i with values[j]
+    n_questions, n_values = len(questions), len(values)
+    matrix = np.repeat(answers[None, :], n_questions * n_values, axis=0)
+    rows = np.arange(n_questions * n_values)
+    matrix[rows, rows // n_values] = np.tile(values, n_questions)
+
+    return Sensitivity(
+        questions=questions,
+        values=values,
+        base=score_values(answers[None, :], columns, scenario),
+        scores=score_values(matrix, columns, scenario),
+    )
+
+
+def consensus_responses(evaluations):
+    """
+    Average the answers of several raters, question by question.
+
+    Scores are linear in the answers, so scoring the consensus gives the
+    mean of the raters' ease, value and tangibility scores.
+
+    Args:
+        evaluations (dict): Rater -> dictionary of question:score pairs.
+
+    Returns:
+        dict: Question -> mean score over the raters who answered it.
+    """
+    means = responses_matrix(evaluations.values()).mean(axis=0)
+    return {question: float(score) for question, score in means.items()}
+
+
+def bootstrap_ci(samples, n_resamples=BOOTSTRAP_RESAMPLES, confidence=BOOTSTRAP_CONFIDENCE, seed=None):
+    """
+    Percentile bootstrap confidence interval of the mean, for several statistics at once.
+
+    Raters are resampled with replacement. Every resample is drawn in a
+    single call as a resamples x raters matrix of multinomial counts, so
+    the resampled means are one matrix product.
+
+    Args:
+        samples (np.ndarray): Raters x statistics matrix (e.g. the ease,
+            value and tangibility score of each rater).
+        n_resamples (int, optional): Number of bootstrap resamples.
+        confidence (float, optional): Confidence level of the interval.
+        seed (int, optional): Seed of the random generator.
+
+    Returns:
+        tuple: (low, high) arrays with one bound per statistic.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    n_raters = samples.shape[0]
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(n_raters, np.full(n_raters, 1.0 / n_raters), size=n_resamples)
+    means = counts @ samples / n_raters
+    alpha = (1.0 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1.0 - alpha], axis=0)
+    return low, high
+
+
+def intraclass_correlation(ratings):
+    """
+    Inter-rater agreement as the intraclass correlation ICC(2,1).
+
+    Two-way random effects, absolute agreement, single rater (Shrout & Fleiss),
+    with the questions as targets.
+
+    Args:
+        ratings (np.ndarray): Questions x raters matrix without missing values.
+
+    Returns:
+        float: The ICC, or NaN if it is undefined (fewer than two questions
+        or raters, or no variance at all).
+    """
+    ratings = np.asarray(ratings, dtype=np.float64)
+    n, k = ratings.shape
+    if n < 2 or k < 2:
+        return float("nan")
+    grand_mean = ratings.mean()
+    ss_rows = k * np.sum((ratings.mean(axis=1) - grand_mean) ** 2)
+    ss_cols = n * np.sum((ratings.mean(axis=0) - grand_mean) ** 2)
+    ss_error = np.sum((ratings - grand_mean) ** 2) - ss_rows - ss_cols
+    ms_rows = ss_rows / (n - 1)
+    ms_cols = ss_cols / (k - 1)
+    ms_error = ss_error / ((n - 1) * (k - 1))
+    denominator = ms_rows + (k - 1) * ms_error + k * (ms_cols - ms_error) / n
+    if denominator <= 0:
+        return float("nan")
+    return float((ms_rows - ms_error) / denominator)
+
+
+def summarize_raters(evaluations, likert_questions, n_resamples=BOOTSTRAP_RESAMPLES,
+                     confidence=BOOTSTRAP_CONFIDENCE, seed=None):
+    """
+    Aggregate the scores of several raters with bootstrap confidence intervals.
+
+    Args:
+        evaluations (dict): Rater -> dictionary of question:score pairs.
+        likert_questions (Scenario or dict): The compiled scenario, or
+            business objective -> list of questions.
+        n_resamples (int, optional): Number of bootstrap resamples.
+        confidence (float, optional): Confidence level of the intervals.
+        seed (int, optional): Seed of the random generator.
+
+    Returns:
+        tuple: (summary, icc) where summary is a dataframe indexed by "ease",
+        "value" and "tangibility" with "mean", "low" and "high" columns, and
+        icc is the ICC(2,1) over the questions answered by every rater.
+    """
+    matrix = responses_matrix(evaluations.values())
+    scores = score_matrix(matrix, likert_questions)
+    samples = np.column_stack([scores.ease, scores.value, scores.tangibility])
+    low, high = bootstrap_ci(samples, n_resamples=n_resamples, confidence=confidence, seed=seed)
+    summary = pd.DataFrame(
+        {"mean": samples.mean(axis=0), "low": low, "high": high},
+        index=["ease", "value", "tangibility"],
+    )
+    icc = intraclass_correlation(matrix.dropna(axis=1).to_numpy().T)
+    return summary, icc
+
+
+def read_table(path):
+    """
+    Read a CSV or Parquet file, chosen by extension.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        pd.DataFrame: The file content.
+    """
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def write_table(frame, path):
+    """
+    Write a dataframe as CSV or Parquet, chosen by extension; "-" writes CSV to stdout.
+
+    Args:
+        frame (pd.DataFrame): Data to write.
+        path (str): Destination path.
+    """
+    if path == "-":
+        frame.to_csv(sys.stdout)
+    elif os.path.splitext(path)[1].lower() == ".parquet":
+        frame.to_parquet(path)
+    else:
+        frame.to_csv(path)
+
+
+def score_table(table, scenario=None, id_column=None, scenario_column=None):
+    """
+    Score a table of responses, as read from a CSV or Parquet file.
+
+    Only the columns that are questions of the scenario of a row are scored;
+    the other columns (apart from the id and scenario ones) are ignored,
+    with a warning.
+
+    Args:
+        table (pd.DataFrame): One row per assessment, one column per question.
+        scenario (str, optional): Scenario of every row (e.g. "Churn"); None
+            for the default one.
+        id_column (str, optional): Column identifying each assessment.
+        scenario_column (str, optional): Column holding the scenario of each
+            row; takes precedence over `scenario`.
+
+    Returns:
+        pd.DataFrame: The flattened scores, one row per assessment, in the
+        order and with the index of the table.
+
+    Raises:
+        ValueError: If a question column is not numeric.
+        KeyError: If a scenario is unknown.
+    """
+    if id_column:
+        table = table.set_index(id_column)
+    if scenario_column:
+        groups = [(None if pd.isna(name) else name, group)
+                  for name, group in table.reset_index(drop=True).groupby(scenario_column, sort=False, dropna=False)]
+    else:
+        groups = [(scenario, table)]
+    scenarios = [get_scenario(name) for name, _ in groups]
+
+    questions = {question for row_scenario in scenarios for question in row_scenario.question_ids}
+    columns = [column for column in table.columns if column != scenario_column]
+    unknown = [column for column in columns if column not in questions]
+    if unknown:
+        warnings.warn(f"Colonne ignorate, non domande dello scenario: {', '.join(map(str, unknown))}", stacklevel=2)
+    non_numeric = [column for column in columns
+                   if column in questions and not pd.api.types.is_numeric_dtype(table[column].dtype)]
+    if non_numeric:
+        raise ValueError(f"Colonne con risposte non numeriche: {', '.join(map(str, non_numeric))}")
+
+    frames = []
+    for (_, group), row_scenario in zip(groups, scenarios):
+        frame = score_matrix(group[[column for column in columns if column in row_scenario.question_ids]],
+                             row_scenario).to_frame()
+        if scenario_column:
+            frame.insert(0, scenario_column, group[scenario_column])
+        frames.append(frame)
+    if not scenario_column:
+        return frames[0]
+    # Groups hold positions of the table, whose own labels may repeat
+    scores = pd.concat(frames).sort_index()
+    scores.index = table.index
+    return scores
+
+
+def main(argv=None):
+    """
+    Command-line entry point: score a CSV/Parquet file of responses in one pass.
+
+    Args:
+        argv (list, optional): Command-line arguments, defaults to `sys.argv[1:]`.
+    """
+    parser = argparse.ArgumentParser(description="Calcola i punteggi di un insieme di valutazioni di modelli AI.")
+    parser.add_argument("input", help="File CSV o Parquet con una riga per valutazione e una colonna per domanda.")
+    parser.add_argument("-o", "--output", default="-", help="File di output (CSV o Parquet); '-' per stdout.")
+    registry = get_scenario_registry()
+    parser.add_argument("--scenario", choices=registry.names(), default=registry.default, help="Scenario di tutte le righe.")
+    parser.add_argument("--scenario-column", help="Colonna con lo scenario di ciascuna riga.")
+    parser.add_argument("--id-column", help="Colonna che identifica ciascuna valutazione.")
+    args = parser.parse_args(argv)
+
+    table = read_table(args.input)
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            scores = score_table(
+                table,
+                scenario=args.scenario,
+                id_column=args.id_column,
+                scenario_column=args.scenario_column,
+            )
+    except (KeyError, ValueError) as e:
+        parser.error(e.args[0] if e.args else str(e))
+    for warning in caught:
+        print(f"{parser.prog}: attenzione: {warning.message}", file=sys.stderr)
+    write_table(scores, args.output)
+
+
+if __name__ == "__main__":
+    main()
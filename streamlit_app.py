@@ -1,12 +1,49 @@
+import hashlib
+import json
+import math
+import os
+import time
+import warnings
+from contextlib import contextmanager
+
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
+
+from instrumentation import (
+    CATALOG_CACHE_BYTES, CATALOG_CACHE_ENTRIES, CATALOG_CACHE_EVICTIONS, CATALOG_CACHE_HITS, CATALOG_CACHE_MISSES,
+    CHART_BYTES_TOTAL, ENABLED as METRICS_ENABLED, FUNCTION_SECONDS, PAGE_SECONDS, RESIDENT_MEMORY_BYTES, RUNS_TOTAL,
+    advance_counter, export_metrics, get_metrics_registry, increment, set_gauge, start_session, timed, timer
+)
+from questionnaire import detail_scores, get_scenario, get_scenario_registry
+
+# Indicators rendered per page of the results listing, and the page sizes
+# offered to the user.
+RESULTS_PAGE_SIZE = int(os.environ.get("VALORE_AI_RESULTS_PAGE_SIZE", 20))
+RESULTS_PAGE_SIZES = (10, 20, 50, 100)
+
+# Maximum number of elements (markdown, LaTeX, captions) rendered per page of
+# the results listing; a page always holds at least one indicator.
+RESULTS_ELEMENT_BUDGET = int(os.environ.get("VALORE_AI_RESULTS_ELEMENT_BUDGET", 300))
+
+# Rendered charts kept per process, keyed by the content hash of the evaluation.
+CHART_CACHE_ENTRIES = int(os.environ.get("VALORE_AI_CHART_CACHE_ENTRIES", 512))
+
+# Format of the Ease of Implementation vs Value Delivered matrix: "png" for an
+# image, "plotly" for an interactive vector chart.
+MATRIX_FORMAT = os.environ.get("VALORE_AI_MATRIX_FORMAT", "png")
+
+# Scores charted by the what-if analysis of the results page, with their label.
+SENSITIVITY_METRICS = {"tangibility": "Tangibility", "ease": "Ease of Implementation", "value": "Value Delivered"}
+
+# Heavy dependencies (pandas through the catalog and scoring modules, and the
+# plotly/matplotlib charting stack) are imported by the pages that use them,
+# so that a cold worker serving "Input Modello AI" or "Feedback" does not
+# load them. benchmarks/bench_startup.py tracks the resulting budget.
 
 # Set page configuration with improved UI theme and icon
+# The emoji itself: a shortcode is first tried as an image, which imports NumPy
 st.set_page_config(
     page_title="Valore AI",
-    page_icon=":robot_face:",
+    page_icon="🤖",
     layout="wide"
 )
 
@@ -34,10 +71,11 @@ def sidebar_navigation():
     """
     # Updated menu to remove the "Panoramica" page and focus on input, evaluation, results, and feedback.
     st.sidebar.title("Valutazione Valore AI")
-    menu = ["Input Modello AI", "Valutazione", "Risultati", "Feedback"]
+    menu = ["Input Modello AI", "Valutazione", "Risultati", "Portafoglio", "Feedback"]
     choice = st.sidebar.radio("Naviga", menu)
     return choice
 
+@timed()
 def load_kpi_data(uploaded_file=None, scenario=None):
     """
     Load KPI/KQI/KRI data. If a file is uploaded, try to load it,
@@ -45,154 +83,434 @@ def load_kpi_data(uploaded_file=None, scenario=None):
     on churn evaluation in a Marketing & Sales scenario if the scenario
     is set to 'Churn'.
 
+    Catalogs are parsed once per process and shared between sessions
+    through the catalog store; the session only keeps the returned handle.
+
     Args:
-        uploaded_file (UploadedFile, optional): Uploaded CSV file.  
+        uploaded_file (UploadedFile, optional): Uploaded CSV, Parquet or Arrow file.
         scenario (str, optional): Scenario to load additional KPI data. 
             e.g. "Churn" to load extended marketing & sales metrics.
 
     Returns:
-        pd.DataFrame: Dataframe with KPI/KQI/KRI information.
-    """
-    default_kpi_data = [
-        {"Business Objective": "Nuove Fonti di Creazione di Valore", "Tipo": "KPI", "Categoria": "Canali Digitali", "Focus": "Ricavi & Profitti", "Metriche": "Ordini, Ricavi, Traffico Clienti, Transazioni, Ordini Sociali"},
-        {"Business Objective": "Nuove Fonti di Creazione di Valore", "Tipo": "KPI", "Categoria": "Ecosistema Digitale", "Focus": "Ricavi & Profitti", "Metriche": "Partner & Reti, Referral & Profitti"},
-        {"Business Objective": "Nuove Fonti di Creazione di Valore", "Tipo": "KPI", "Categoria": "Integrazione Fisica", "Focus": "Ricavi & Profitti", "Metriche": "Prodotti Digitali, Prezzi, Promozioni, Nuovi Modelli di Business"},
-        {"Business Objective": "Coinvolgimento del Cliente", "Tipo": "KQI", "Categoria": "Tempo Risparmiato dal Cliente", "Focus": "Tempo Risparmiato", "Metriche": "Ore Risparmiate, Tempo per Completare, Per Richiesta"},
-        {"Business Objective": "Efficienza Operativa", "Tipo": "KPI", "Categoria": "Velocità di Risposta, Consegna", "Focus": "Tempo & Conformità", "Metriche": "Riduzione del Tempo di Consegna, % Conformità, Tempo di Attesa, Lavoro Completato"},
-        {"Business Objective": "Coinvolgimento della Forza Lavoro", "Tipo": "KRI", "Categoria": "Diversità, Equità & Inclusione", "Focus": "Performance & Inclusione", "Metriche": "Indice DEI %, Ore di Formazione, Miglioramento %"},
-        {"Business Objective": "Coinvolgimento della Forza Lavoro", "Tipo": "KQI", "Categoria": "Gestione del Talento", "Focus": "Performance & Ritenzione", "Metriche": "Produttività & Efficienza, % Ritenzione Talenti, % Turnover"},
-        {"Business Objective": "Innovazione", "Tipo": "KQI", "Categoria": "Sviluppo Prodotto", "Focus": "Innovazione", "Metriche": "Numero di Nuovi Prodotti, Tempo di Sviluppo, Percentuale di Innovazione"},
-        {"Business Objective": "Soddisfazione del Cliente", "Tipo": "KQI", "Categoria": "Feedback Cliente", "Focus": "Soddisfazione", "Metriche": "Net Promoter Score, Recensioni Positive, Tasso di Ritorno"},
-        {"Business Objective": "Sostenibilità", "Tipo": "KRI", "Categoria": "Impatto Ambientale", "Focus": "Sostenibilità", "Metriche": "Emissioni di CO2, Consumo Energetico, Uso di Risorse Rinnovabili"}
-    ]
-    
-    # Additional churn-focused KPI if scenario is chosen
-    churn_kpi_data = [
-        {"Business Objective": "Coinvolgimento del Cliente", "Tipo": "KPI", "Categoria": "Churn Reduction", "Focus": "Retenzione", "Metriche": "Tasso Churn pre/post"}
-    ]
+        CatalogHandle: Handle of the KPI/KQI/KRI catalog in the catalog store.
+    """
+    from catalog_store import MissingColumnsError, get_catalog_store
+
+    store = get_catalog_store()
+    handle = None
 
     if uploaded_file:
         st.info("Tentativo di caricare i dati KPI/KQI/KRI dal file fornito...")
+        progress_bar = st.progress(0.0, text="Lettura del catalogo...")
         try:
-            df = pd.read_csv(uploaded_file)
-            required_columns = {"Business Objective", "Tipo", "Categoria", "Focus", "Metriche"}
-            if not required_columns.issubset(set(df.columns)):
-                missing = required_columns - set(df.columns)
-                st.error(f"Il file caricato manca delle seguenti colonne richieste: {', '.join(missing)}")
-                st.warning("Utilizzo dei dati KPI predefiniti.")
-                base_df = pd.DataFrame(default_kpi_data)
-            else:
-                st.success("Dati KPI/KQI/KRI caricati con successo.")
-                base_df = df
+            handle = store.load_upload(
+                uploaded_file.getvalue(),
+                scenario=scenario,
+                filename=uploaded_file.name,
+                progress=progress_bar.progress
+            )
+            st.success("Dati KPI/KQI/KRI caricati con successo.")
+        except MissingColumnsError as e:
+            st.error(f"Il file caricato manca delle seguenti colonne richieste: {', '.join(e.missing)}")
+            st.warning("Utilizzo dei dati KPI predefiniti.")
         except Exception as e:
             st.error(f"Errore nel caricamento del file: {e}. Utilizzo dei dati KPI predefiniti.")
-            base_df = pd.DataFrame(default_kpi_data)
+        finally:
+            progress_bar.empty()
     else:
         st.info("Utilizzo dei dati KPI/KQI/KRI predefiniti.")
-        base_df = pd.DataFrame(default_kpi_data)
 
-    # If scenario is 'Churn', we merge the churn-focused KPIs into the base dataframe.
-    if scenario == "Churn":
-        st.info("Caricamento dei KPI focalizzati sulla riduzione del churn...")
-        churn_df = pd.DataFrame(churn_kpi_data)
-        base_df = pd.concat([base_df, churn_df], ignore_index=True)
+    # Scenarios such as 'Churn' add their own KPIs, which the store merges into the base catalog.
+    if get_scenario(scenario).extra_kpi_rows:
+        st.info(f"Caricamento dei KPI aggiuntivi dello scenario {scenario}...")
 
-    return base_df
+    if handle is None:
+        handle = store.load_default(scenario=scenario)
+    return handle
 
-def get_likert_questions(scenario=None):
+def get_kpi_catalog():
     """
-    Get a dictionary of business objectives mapped to their respective Likert scale questions.
-    If scenario is 'Churn', we add a churn-related question under 'Coinvolgimento del Cliente'.
+    Resolve the KPI/KQI/KRI catalog of the current session.
+
+    If an uploaded catalog was evicted from the catalog store, the session
+    falls back to the default catalog for its scenario.
+
+    Returns:
+        KpiCatalog: Shared, read-only catalog with KPI/KQI/KRI information.
+    """
+    from catalog_store import default_handle, get_catalog_store
+
+    store = get_catalog_store()
+    handle = st.session_state.get('kpi_handle') or default_handle(st.session_state.get('scenario', None))
+    catalog = store.resolve(handle)
+    if catalog is None:
+        st.warning("Il catalogo KPI caricato non è più disponibile in memoria: ricaricalo nella sezione 'Input Modello AI'. Utilizzo dei dati KPI predefiniti.")
+        handle = default_handle(handle.scenario)
+        st.session_state['kpi_handle'] = handle
+        catalog = store.resolve(handle)
+    return catalog
+
+def evaluation_key(responses, scenario=None):
+    """
+    Hash the content of an evaluation.
+
+    Charts and aggregates derived from an evaluation are memoized on this
+    key, so equal evaluations share them across reruns and sessions.
 
     Args:
-        scenario (str, optional): If 'Churn', include churn-related question.
+        responses (dict): Dictionary of question:score pairs, or rater -> such
+            dictionary for several raters.
+        scenario (str, optional): Scenario the evaluation refers to.
 
     Returns:
-        dict: A mapping of business objectives to a list of questions.
-    """
-    base_questions = {
-        "Nuove Fonti di Creazione di Valore": [
-            "Il modello AI facilita l'innovazione all'interno dell'azienda.",
-            "Il modello AI contribuisce a migliorare la soddisfazione del cliente.",
-            "Il modello AI è facilmente integrabile con i sistemi esistenti."
-        ],
-        "Coinvolgimento del Cliente": [
-            "Il coinvolgimento del cliente è aumentato grazie all'implementazione del modello AI.",
-            "Il modello AI supporta efficacemente gli obiettivi di sostenibilità.",
-            "Le raccomandazioni generate dall'AI sono azionabili e rilevanti per gli obiettivi aziendali."
-        ],
-        "Efficienza Operativa": [
-            "Il modello AI riduce significativamente i tempi di processo.",
-            "Il modello AI aumenta la qualità dei servizi/prodotti offerti.",
-            "Il modello AI contribuisce significativamente alla riduzione dei costi.",
-            "Il modello AI contribuisce significativamente all'aumento dei ricavi.",
-            "Il modello AI è facilmente comprensibile e misurabile."
-        ],
-        "Coinvolgimento della Forza Lavoro": [
-            "Il modello AI ha un impatto positivo sulla produttività della forza lavoro e sulla gestione dei talenti."
-        ]
-    }
+        str: Hex digest of the evaluation content.
+    """
+    payload = json.dumps([scenario, responses], sort_keys=True, ensure_ascii=False, default=float)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
-    if scenario == "Churn":
-        base_questions["Coinvolgimento del Cliente"].append(
-            "Il modello di AI ha contribuito a ridurre il churn del cliente."
-        )
+@contextmanager
+def measure_run(scope):
+    """
+    Count a script or fragment run and the server CPU time it used.
+
+    Totals are kept per scope in `st.session_state['run_stats']`. A fragment
+    rendered as part of a full run is accounted to "app"; only the reruns of
+    the fragment alone are accounted to its own scope.
+
+    Args:
+        scope (str): "app" for a full run of the script, or the fragment name.
+    """
+    full_run = st.session_state.get('_full_run', False)
+    if scope != "app" and full_run:
+        yield
+        return
+    stats = st.session_state.setdefault('run_stats', {})
+    entry = stats.setdefault(scope, {"runs": 0, "cpu_s": 0.0})
+    st.session_state['_full_run'] = scope == "app"
+    start = time.thread_time()
+    try:
+        yield
+    finally:
+        entry["runs"] += 1
+        entry["cpu_s"] += time.thread_time() - start
+        increment(RUNS_TOTAL, scope=scope)
+        if scope == "app":
+            st.session_state['_full_run'] = False
+
+def process_rss_mb():
+    """
+    Return the resident memory of the server process.
+
+    Returns:
+        float: Resident set size in MiB; the peak one where the current one
+        is not available (outside Linux).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        import sys
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KiB elsewhere
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def record_chart(kind, size):
+    """
+    Count a chart sent to the browser and its payload in bytes.
+
+    Totals are kept per kind of chart in `st.session_state['chart_stats']`.
+
+    Args:
+        kind (str): Kind of chart, e.g. "gauge" or "matrix (png)".
+        size (int): Bytes of the serialized figure or image.
+    """
+    entry = st.session_state.setdefault('chart_stats', {}).setdefault(kind, {"renders": 0, "bytes": 0})
+    entry["renders"] += 1
+    entry["bytes"] += size
+    increment(CHART_BYTES_TOTAL, size, kind=kind)
+
+def publish_metrics():
+    """
+    Update the process gauges (catalog store, memory), bring the catalog
+    store counters up to date and export the metrics, when instrumentation
+    is enabled.
+    """
+    if not METRICS_ENABLED:
+        return
+    from catalog_store import get_catalog_store
+
+    stats = get_catalog_store().stats()
+    set_gauge(CATALOG_CACHE_BYTES, stats["bytes"])
+    set_gauge(CATALOG_CACHE_ENTRIES, stats["entries"])
+    # The store counts for the whole process: the counters add what it
+    # counted since the last run that published them
+    advance_counter(CATALOG_CACHE_HITS, stats["hits"])
+    advance_counter(CATALOG_CACHE_MISSES, stats["misses"])
+    advance_counter(CATALOG_CACHE_EVICTIONS, stats["evictions"])
+    set_gauge(RESIDENT_MEMORY_BYTES, process_rss_mb() * 2**20)
+    export_metrics()
+
+def display_latencies(title, metric, label):
+    """
+    Display the process-wide latency histogram of a metric as a list.
+
+    Args:
+        title (str): Heading of the list.
+        metric (str): Histogram name.
+        label (str): Label identifying each series, e.g. "page".
+    """
+    histogram = get_metrics_registry().metric(metric)
+    series = histogram.summary()
+    if not series:
+        return
+    st.markdown(f"**{title}**")
+    for labels, count, mean in series:
+        p95 = histogram.quantile(0.95, **labels)
+        # Above the largest bucket only a lower bound is known
+        p95_text = f"> {1000 * histogram.buckets[-1]:g}" if math.isinf(p95) else f"≤ {1000 * p95:g}"
+        st.markdown(f"- {labels[label]}: {count} volte, media {1000 * mean:.1f} ms, p95 {p95_text} ms")
+
+def display_catalog_cache():
+    """
+    Display the counters of the process-wide catalog store: hits, misses
+    and hit rate, evictions, and the catalogs and memory it holds.
+    """
+    from catalog_store import get_catalog_store
+
+    stats = get_catalog_store().stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "-"
+    st.markdown(
+        f"- **Catalog store (processo):** {stats['hits']} hit, {stats['misses']} miss "
+        f"(hit rate {hit_rate}), {stats['evictions']} evizioni, {stats['entries']} cataloghi, "
+        f"{stats['bytes'] / 1024:.0f} KiB"
+    )
+
+def display_run_stats():
+    """
+    Display the runs and CPU time per scope, the charts sent, the memory
+    of the server process and the catalog store counters in the sidebar,
+    when the page is opened with `?debug=1`. With instrumentation enabled, the page and function
+    latencies of the whole process are listed as well.
+    """
+    if st.query_params.get('debug') != "1":
+        return
+    stats = st.session_state.get('run_stats', {})
+    with st.sidebar.expander("Diagnostica esecuzioni"):
+        for scope, entry in sorted(stats.items()):
+            mean_ms = 1000 * entry["cpu_s"] / max(entry["runs"], 1)
+            st.markdown(f"- **{scope}:** {entry['runs']} esecuzioni, CPU media {mean_ms:.1f} ms")
+        for kind, entry in sorted(st.session_state.get('chart_stats', {}).items()):
+            mean_kb = entry["bytes"] / max(entry["renders"], 1) / 1024
+            st.markdown(f"- **Grafico {kind}:** {entry['renders']} invii, {mean_kb:.1f} KiB per invio")
+        st.markdown(f"- **Memoria del processo:** {process_rss_mb():.0f} MiB")
+        display_catalog_cache()
+        if METRICS_ENABLED:
+            display_latencies("Latenza delle pagine (processo)", PAGE_SECONDS, "page")
+            display_latencies("Latenza delle funzioni (processo)", FUNCTION_SECONDS, "function")
+
+def figure_payload(fig):
+    """
+    Serialize a Plotly figure for `st.plotly_chart`, without its template.
+
+    Streamlit restyles charts with its own theme in the browser, so the
+    layout template (most of the JSON of a small figure) is not sent.
+
+    Args:
+        fig (plotly.graph_objects.Figure): The figure.
+
+    Returns:
+        tuple: The figure as a dict, and the size of its JSON in bytes.
+    """
+    import plotly.io as pio
+
+    payload = fig.to_dict()
+    payload["layout"].pop("template", None)
+    return payload, len(pio.to_json(payload, validate=False))
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def gauge_figure(cache_key, _score, title):
+    """
+    Build the Plotly gauge for a score, memoized on `cache_key`.
 
-    return base_questions
+    Args:
+        cache_key (str): Content hash of the evaluation the score comes from.
+        _score (float): The score to be displayed on the gauge (not hashed).
+        title (str): Title of the gauge.
+
+    Returns:
+        tuple: The figure, serialized for `st.plotly_chart`, and its size in bytes.
+    """
+    import charts
 
-def display_gauge(score, title="Tangibility Score"):
+    return figure_payload(charts.gauge_figure(_score, title))
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def matrix_png(cache_key, _ease_score, _value_score):
+    """
+    Render the Ease of Implementation vs Value Delivered matrix to PNG,
+    memoized on `cache_key`.
+
+    The quadrant background is drawn once per template of the process-wide
+    pool; only the marker is drawn for each evaluation.
+
+    Args:
+        cache_key (str): Content hash of the evaluation the scores come from.
+        _ease_score (float): The ease of implementation score (not hashed).
+        _value_score (float): The value delivered score (not hashed).
+
+    Returns:
+        bytes: The PNG image.
+    """
+    from charts import quadrant_png
+
+    return quadrant_png(_ease_score, _value_score)
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def matrix_figure(cache_key, _ease_score, _value_score):
+    """
+    Build the Ease of Implementation vs Value Delivered matrix as a Plotly
+    figure, memoized on `cache_key`.
+
+    Args:
+        cache_key (str): Content hash of the evaluation the scores come from.
+        _ease_score (float): The ease of implementation score (not hashed).
+        _value_score (float): The value delivered score (not hashed).
+
+    Returns:
+        tuple: The figure, serialized for `st.plotly_chart`, and its size in bytes.
+    """
+    from charts import quadrant_figure
+
+    return figure_payload(quadrant_figure(_ease_score, _value_score))
+
+@timed()
+def display_gauge(score, title="Tangibility Score", cache_key=None):
     """
     Display a gauge chart using Plotly for the given score.
 
     Args:
         score (float): The score to be displayed on the gauge.
         title (str, optional): Title of the gauge.
+        cache_key (str, optional): Content hash of the evaluation the score
+            comes from; defaults to the score itself.
     """
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=score,
-        title={'text': title},
-        gauge={
-            'axis': {'range': [0, 100]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [0, 33], 'color': "lightgray"},
-                {'range': [33, 66], 'color': "yellow"},
-                {'range': [66, 100], 'color': "lightgreen"}
-            ],
-            'threshold': {'line': {'color': "red", 'width': 4}, 'thickness': 0.75, 'value': score}
-        }
-    ))
-    st.plotly_chart(fig, use_container_width=True)
+    fig, size = gauge_figure(cache_key or repr(score), score, title)
+    record_chart("gauge", size)
+    st.plotly_chart(fig, width="stretch")
 
-def display_matrix(ease_score, value_score):
+@timed()
+def display_matrix(ease_score, value_score, cache_key=None):
     """
-    Display a matrix (quadrant) chart using matplotlib to show Ease of Implementation vs Value Delivered.
+    Display a matrix (quadrant) chart to show Ease of Implementation vs Value Delivered.
+
+    The chart is a PNG image, or an interactive Plotly figure when
+    `MATRIX_FORMAT` is "plotly".
 
     Args:
         ease_score (float): The ease of implementation score.
         value_score (float): The value delivered score.
+        cache_key (str, optional): Content hash of the evaluation the scores
+            come from; defaults to the scores themselves.
+    """
+    cache_key = cache_key or repr((ease_score, value_score))
+    if MATRIX_FORMAT == "plotly":
+        fig, size = matrix_figure(cache_key, ease_score, value_score)
+        record_chart("matrix (plotly)", size)
+        st.plotly_chart(fig, width="stretch")
+    else:
+        png = matrix_png(cache_key, ease_score, value_score)
+        record_chart("matrix (png)", len(png))
+        st.image(png, width="stretch")
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def sensitivity_figures(cache_key, _responses, _scenario):
+    """
+    Run the what-if analysis of an evaluation and build its charts,
+    memoized on `cache_key`.
+
+    Args:
+        cache_key (str): Content hash of the evaluation.
+        _responses (dict): Dictionary of question:score pairs (not hashed).
+        _scenario (Scenario): The compiled scenario (not hashed).
+
+    Returns:
+        tuple: The tornado chart and its size, a dict of heatmaps and their
+        sizes keyed by the metrics of `SENSITIVITY_METRICS`, and a DataFrame
+        of the answers that change the relevant objectives.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from charts import sensitivity_heatmap, tornado_figure
+    from scoring import sensitivity_sweep
+
+    sweep = sensitivity_sweep(_responses, _scenario)
+    tangibility = sweep.grid("tangibility")
+    tornado = figure_payload(tornado_figure(
+        sweep.questions, tangibility.min(axis=1), tangibility.max(axis=1), float(sweep.base.tangibility[0])
+    ))
+
+    # Relevant objectives added and removed, only for the answers changing them
+    added, removed = sweep.objective_changes()
+    objectives = np.asarray(sweep.base.objectives, dtype=object)
+    notes = np.full(tangibility.shape, "", dtype=object)
+    changes = []
+    for question, value in zip(*np.nonzero((added | removed).any(axis=2))):
+        plus = ", ".join(objectives[added[question, value]])
+        minus = ", ".join(objectives[removed[question, value]])
+        notes[question, value] = "<br>".join(
+            text for text in (plus and f"+ {plus}", minus and f"− {minus}") if text
+        )
+        changes.append((sweep.questions[question], int(sweep.values[value]), plus, minus))
+
+    heatmaps = {
+        metric: figure_payload(sensitivity_heatmap(
+            sweep.questions, sweep.values, sweep.deltas(metric), f"Variazione di {label} per risposta", notes
+        ))
+        for metric, label in SENSITIVITY_METRICS.items()
+    }
+    changes = pd.DataFrame(changes, columns=["Domanda", "Risposta", "Obiettivi aggiunti", "Obiettivi rimossi"])
+    return tornado, heatmaps, changes
+
+@st.fragment
+def display_sensitivity(responses, scenario, cache_key):
     """
-    fig, ax = plt.subplots(figsize=(6, 6))
-    plt.axvline(50, color='grey', linestyle='--')  # Mid vertical line
-    plt.axhline(50, color='grey', linestyle='--')  # Mid horizontal line
-
-    # Labels in quadrants
-    plt.text(20, 80, "Easy Value", ha="center", va="center", fontsize=12, fontweight='bold')
-    plt.text(80, 80, "Moonshots", ha="center", va="center", fontsize=12, fontweight='bold')
-    plt.text(20, 20, "Low Value", ha="center", va="center", fontsize=12, fontweight='bold')
-    plt.text(80, 20, "Money Pits", ha="center", va="center", fontsize=12, fontweight='bold')
-
-    # Place the dot
-    ax.scatter(ease_score, value_score, color="red", s=100)
-    plt.xlim(0, 100)
-    plt.ylim(0, 100)
-    plt.xticks(range(0, 101, 10))
-    plt.yticks(range(0, 101, 10))
-    plt.title("Ease of Implementation vs Value Delivered")
-    plt.xlabel("Ease of Implementation (0-100)")
-    plt.ylabel("Value Delivered (0-100)")
-    st.pyplot(fig, use_container_width=True)
+    Display the what-if analysis of an evaluation: how the scores and the
+    relevant objectives change when a single answer changes.
+
+    The analysis runs as a fragment: switching the charted score reruns
+    only the analysis.
+
+    Args:
+        responses (dict): Dictionary of question:score pairs.
+        scenario (Scenario): The compiled scenario of the session.
+        cache_key (str): Content hash of the evaluation.
+    """
+    with measure_run("sensitivity"):
+        (tornado, tornado_size), heatmaps, changes = sensitivity_figures(cache_key, responses, scenario)
+        st.caption(
+            "Ogni domanda è valutata con ogni risposta da 1 a 7, lasciando invariate le altre: "
+            "la linea rossa indica la Tangibility attuale."
+        )
+        record_chart("tornado", tornado_size)
+        st.plotly_chart(tornado, width="stretch")
+
+        metric = st.radio(
+            "Punteggio", list(SENSITIVITY_METRICS), format_func=SENSITIVITY_METRICS.get,
+            horizontal=True, key='sensitivity_metric'
+        )
+        heatmap, heatmap_size = heatmaps[metric or "tangibility"]
+        record_chart("heatmap", heatmap_size)
+        st.plotly_chart(heatmap, width="stretch")
+
+        st.markdown("**Risposte che cambiano gli obiettivi rilevanti** (◆ nella mappa)")
+        if changes.empty:
+            st.write("Nessuna risposta a una singola domanda cambia gli obiettivi rilevanti.")
+        else:
+            st.dataframe(changes, hide_index=True, width="stretch")
 
 def input_ai_model():
     """
@@ -203,25 +521,128 @@ def input_ai_model():
         ai_name = st.text_input("Nome del Modello/App AI", "es. Previsione di Abbandono Cliente")
         ai_description = st.text_area("Descrizione del Modello/App AI", 
                                       "Descrivi lo scopo, il dominio target, i fattori di rischio e il contesto operativo del tuo modello AI...", height=200)
-        scenario = st.selectbox("Scenario di Valutazione", ["Standard", "Churn"])
-        uploaded_file = st.file_uploader("Carica Dati KPI/KQI/KRI (Opzionale)", type=["csv"])
+        scenarios = get_scenario_registry()
+        scenario = st.selectbox("Scenario di Valutazione", scenarios.names())
+        uploaded_file = st.file_uploader("Carica Dati KPI/KQI/KRI (Opzionale)", type=["csv", "parquet", "arrow", "feather"])
         submit_button = st.form_submit_button(label='Salva Descrizione')
     
     if submit_button:
         if ai_name and ai_description:
+            if st.session_state.get('ai_name') != ai_name:
+                # Ratings collected so far (and the saved record) belong to the previous model
+                st.session_state.pop('evaluations', None)
+                st.session_state.pop('evaluation', None)
+                st.session_state.pop('model_id', None)
             st.session_state['ai_name'] = ai_name
             st.session_state['ai_description'] = ai_description
-            scenario_param = "Churn" if scenario == "Churn" else None
-            st.session_state['kpi_data'] = load_kpi_data(uploaded_file, scenario=scenario_param)
+            # The default scenario is stored as None, as in the saved models
+            scenario_param = None if scenario == scenarios.default else scenario
+            st.session_state['kpi_handle'] = load_kpi_data(uploaded_file, scenario=scenario_param)
             st.session_state['scenario'] = scenario_param
+            persist_model()
             st.success("Dettagli del Modello/App AI salvati con successo!")
         else:
             st.error("Per favore, fornisci sia il Nome del Modello/App AI che la Descrizione.")
 
+    display_saved_models()
+
+def persist_model():
+    """
+    Save (or update) the model described in the session in the evaluation store
+    and record its id in the URL, so that a refresh or another worker can reload it.
+    """
+    from evaluation_store import get_evaluation_store
+
+    handle = st.session_state['kpi_handle']
+    try:
+        model_id = get_evaluation_store().save_model(
+            st.session_state['ai_name'],
+            st.session_state['ai_description'],
+            scenario=st.session_state['scenario'],
+            catalog_key=handle.key,
+            catalog_uploaded=handle.uploaded,
+            model_id=st.session_state.get('model_id')
+        )
+    except Exception as e:
+        st.warning(f"Impossibile salvare il modello nell'archivio: {e}")
+        return
+    st.session_state['model_id'] = model_id
+    st.query_params['model'] = str(model_id)
+
+def restore_model(model_id):
+    """
+    Reload a saved model and its evaluations from the evaluation store into the session.
+
+    Args:
+        model_id (int): Id of the saved model.
+
+    Returns:
+        bool: True if the model was found.
+    """
+    from catalog_store import CatalogHandle, default_handle
+    from evaluation_store import get_evaluation_store
+    from scoring import consensus_responses
+
+    store = get_evaluation_store()
+    model = store.load_model(model_id)
+    if model is None:
+        return False
+    evaluations = store.load_evaluations(model_id)
+
+    st.session_state['model_id'] = model['id']
+    st.session_state['ai_name'] = model['name']
+    st.session_state['ai_description'] = model['description']
+    scenario = model['scenario']
+    if scenario is not None and scenario not in get_scenario_registry().names():
+        st.warning(f"Lo scenario '{scenario}' non è più configurato: utilizzo dello scenario predefinito.")
+        scenario = None
+    st.session_state['scenario'] = scenario
+    if model['catalog_key'] and scenario == model['scenario']:
+        st.session_state['kpi_handle'] = CatalogHandle(
+            key=model['catalog_key'], scenario=scenario, uploaded=bool(model['catalog_uploaded'])
+        )
+    else:
+        st.session_state['kpi_handle'] = default_handle(scenario)
+    st.session_state.pop('evaluations', None)
+    st.session_state.pop('evaluation', None)
+    if evaluations:
+        st.session_state['evaluations'] = evaluations
+        st.session_state['evaluation'] = consensus_responses(evaluations) if len(evaluations) > 1 else next(iter(evaluations.values()))
+    st.query_params['model'] = str(model['id'])
+    return True
+
+def display_saved_models():
+    """
+    List the models saved in the evaluation store and allow reloading one of them.
+    """
+    from evaluation_store import get_evaluation_store
+
+    with st.expander("Valutazioni Salvate"):
+        search = st.text_input("Cerca per nome", key='saved_models_search')
+        try:
+            models = get_evaluation_store().list_models(limit=50, name=search or None)
+        except Exception as e:
+            st.warning(f"Impossibile leggere l'archivio delle valutazioni: {e}")
+            return
+        if not models:
+            st.write("Nessuna valutazione salvata.")
+            return
+        labels = {
+            model['id']: f"{model['name']} ({model['scenario'] or 'Standard'}, {model['evaluations']} valutazioni)"
+            for model in models
+        }
+        selected = st.selectbox("Modello salvato", list(labels), format_func=labels.get, key='saved_model_choice')
+        if st.button("Carica", key='load_saved_model'):
+            if restore_model(selected):
+                st.success(f"Modello '{st.session_state['ai_name']}' caricato.")
+            else:
+                st.error("Il modello selezionato non è più disponibile.")
+
 def evaluate_ai_model():
     """
     Allows the user to evaluate the AI model by answering Likert scale questions.
-    Includes scenario-based questions if applicable.
+    Includes scenario-based questions if applicable. Several raters can submit
+    their own evaluation of the same model; the results page aggregates them.
     """
     st.header("Valuta il Tuo Modello/App AI")
     if 'ai_name' not in st.session_state or 'ai_description' not in st.session_state:
@@ -232,47 +653,225 @@ def evaluate_ai_model():
     st.subheader(f"Modello/App AI: {st.session_state['ai_name']}")
     st.write(f"**Descrizione:** {st.session_state['ai_description']}")
     
-    likert_questions = get_likert_questions(scenario=scenario)
-    evaluation_tabs = st.tabs(likert_questions.keys())
-    responses = {}
-    
-    with st.form(key='evaluation_form'):
-        for tab, (objective, questions) in zip(evaluation_tabs, likert_questions.items()):
-            with tab:
-                st.markdown(f"### {objective}")
-                for question in questions:
-                    responses[question] = st.slider(
-                        question,
-                        min_value=1,
-                        max_value=7,
-                        value=4,
-                        step=1,
-                        format="{}",
-                        help="1: Fortemente in disaccordo | 7: Fortemente d'accordo"
-                    )
-        submit_evaluation = st.form_submit_button(label='Invia Valutazione')
-    
-    if submit_evaluation:
-        st.session_state['evaluation'] = responses
-        st.success("Valutazione inviata con successo!")
+    evaluation_form(get_scenario(scenario))
 
-def calculate_overall_scores(responses):
+@st.fragment
+def evaluation_form(scenario):
     """
-    Calculate overall 'ease score' and 'value score' based on the responses.
+    Render the evaluation form and record a rater's submission.
+
+    The form runs as a fragment: submitting it reruns only this section of
+    the page.
 
     Args:
+        scenario (Scenario): The compiled scenario of the session.
+    """
+    likert_questions = scenario.questions
+    with measure_run("evaluation_form"):
+        evaluations = st.session_state.get('evaluations', {})
+        if evaluations:
+            st.caption(f"Valutazioni raccolte ({len(evaluations)}): {', '.join(evaluations)}")
+
+        evaluation_tabs = st.tabs(list(likert_questions.keys()))
+        responses = {}
+
+        with st.form(key='evaluation_form'):
+            rater = st.text_input(
+                "Nome del Valutatore",
+                f"Valutatore {len(evaluations) + 1}",
+                help="Ogni valutatore invia la propria valutazione; reinviando con lo stesso nome la si sostituisce."
+            )
+            for tab, (objective, questions) in zip(evaluation_tabs, likert_questions.items()):
+                with tab:
+                    st.markdown(f"### {objective}")
+                    for question in questions:
+                        responses[question] = st.slider(
+                            question,
+                            min_value=1,
+                            max_value=7,
+                            value=4,
+                            step=1,
+                            format="{}",
+                            help="1: Fortemente in disaccordo | 7: Fortemente d'accordo"
+                        )
+            submit_evaluation = st.form_submit_button(label='Invia Valutazione')
+
+        if submit_evaluation:
+            if not rater:
+                st.error("Per favore, indica il nome del valutatore.")
+                return
+            from scoring import consensus_responses
+
+            evaluations = {**evaluations, rater: responses}
+            st.session_state['evaluations'] = evaluations
+            persist_evaluation(rater, responses, scenario)
+            # The results page scores the consensus (per-question mean) of all raters
+            st.session_state['evaluation'] = responses if len(evaluations) == 1 else consensus_responses(evaluations)
+            st.success("Valutazione inviata con successo!")
+
+def persist_evaluation(rater, responses, scenario):
+    """
+    Save a rater's evaluation of the session's model to the evaluation store.
+
+    Args:
+        rater (str): Name of the rater.
         responses (dict): Dictionary of question:score pairs.
+        scenario (Scenario): The compiled scenario of the session.
+    """
+    from evaluation_store import get_evaluation_store
+
+    if 'model_id' not in st.session_state:
+        return
+    try:
+        get_evaluation_store().save_evaluation(
+            st.session_state['model_id'], rater, responses, question_objectives=scenario.question_objectives
+        )
+    except Exception as e:
+        st.warning(f"Impossibile salvare la valutazione nell'archivio: {e}")
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def rater_summary(cache_key, _evaluations, _scenario):
+    """
+    Aggregate several raters' evaluations, memoized on `cache_key`.
+
+    Args:
+        cache_key (str): Content hash of the evaluations.
+        _evaluations (dict): Rater -> dictionary of question:score pairs (not hashed).
+        _scenario (Scenario): The compiled scenario (not hashed).
 
     Returns:
-        tuple: (ease_score, value_score) both scaled to 100.
+        tuple: (summary DataFrame, ICC) as returned by `summarize_raters`.
+    """
+    from scoring import summarize_raters
+
+    return summarize_raters(_evaluations, _scenario, seed=0)
+
+def display_rater_agreement(evaluations, scenario, cache_key=None):
+    """
+    Display the scores aggregated over several raters, with bootstrap
+    confidence intervals and the inter-rater agreement.
+
+    Args:
+        evaluations (dict): Rater -> dictionary of question:score pairs.
+        scenario (Scenario): The compiled scenario of the session.
+        cache_key (str, optional): Content hash of the evaluations; computed
+            from them if omitted.
+    """
+    from scoring import BOOTSTRAP_CONFIDENCE
+
+    if cache_key is None:
+        cache_key = evaluation_key(evaluations, scenario.name)
+    summary, icc = rater_summary(cache_key, evaluations, scenario)
+    st.markdown(f"### **Valutazione Multi-Valutatore ({len(evaluations)} valutatori)**")
+    table = summary.rename(
+        index={"ease": "Ease of Implementation", "value": "Value Delivered", "tangibility": "Tangibility"},
+        columns={"mean": "Media", "low": f"IC {BOOTSTRAP_CONFIDENCE:.0%} Inf.", "high": f"IC {BOOTSTRAP_CONFIDENCE:.0%} Sup."}
+    )
+    st.table(table.round(2))
+
+    if math.isnan(icc):
+        st.markdown("**Accordo tra valutatori (ICC 2,1):** non determinabile.")
+        return
+    if icc < 0.5:
+        level = "scarso"
+    elif icc < 0.75:
+        level = "moderato"
+    elif icc < 0.9:
+        level = "buono"
+    else:
+        level = "eccellente"
+    st.markdown(f"**Accordo tra valutatori (ICC 2,1):** {icc:.2f} ({level})")
+
+def display_indicators_with_examples(catalog, rows, tipi):
     """
-    ease_questions = [
-        "Il modello AI è facilmente integrabile con i sistemi esistenti.",
-        "Il modello AI è facilmente comprensibile e misurabile."
-    ]
-    value_score = sum(responses.values()) / len(responses) * 14.3  # Scale to 100
-    ease_score = sum([responses.get(q, 4) for q in ease_questions]) / len(ease_questions) * 14.3
-    return ease_score, value_score
+    Display given indicators (KPI/KQI/KRI) with their formula and example,
+    resolved through the metric formula registry.
+
+    Args:
+        catalog (KpiCatalog): The session's catalog.
+        rows (np.ndarray): Catalog rows of the indicators for a given Business Objective.
+        tipi (np.ndarray): Tipo (KPI/KQI/KRI) of each row; a heading is shown
+            whenever it changes.
+    """
+    from metric_formulas import get_formula_registry
+
+    formulas = get_formula_registry()
+    current_tipo = None
+    for row, tipo in zip(rows, tipi):
+        if tipo != current_tipo:
+            st.markdown(f"### {tipo}")
+            current_tipo = tipo
+        categoria, focus, metriche = catalog.indicator(row)
+
+        st.markdown(f"**Categoria {tipo}:** {categoria}")
+        st.markdown(f"- **Focus:** {focus}")
+
+        for metrica in metriche:
+            # Formulas with units of measure come from the metric formula registry
+            metric_formula = formulas.resolve(metrica)
+            suggestion = None
+            if metric_formula.pattern is None:
+                # Unknown metric: fall back to the most similar known one, if any
+                suggestion = formulas.suggest(metrica)
+                if suggestion is not None:
+                    metric_formula = suggestion.formula
+            formula = metric_formula.formula
+            example = metric_formula.example
+
+            st.markdown(f"**{metrica.capitalize()}:**")
+            st.latex(formula)
+            if suggestion is not None:
+                st.caption(f"Formula suggerita per similarità con \"{metric_formula.pattern}\" (confidenza {suggestion.confidence:.0%}).")
+            st.markdown(f"*Esempio:* {example}\n")
+
+@st.fragment
+def display_kpi_results(catalog, relevant_objectives):
+    """
+    Display the KPI/KQI/KRI of one relevant objective at a time, paginated.
+
+    Only the selected objective and page are rendered, so the number of
+    elements sent per rerun is bounded by the page size and the element
+    budget, whatever the size of the catalog. The listing runs as a
+    fragment: changing objective, page size or page reruns only the listing.
+
+    Args:
+        catalog (KpiCatalog): The session's catalog.
+        relevant_objectives (list): Relevant business objectives.
+    """
+    with measure_run("kpi_results"):
+        render_kpi_page(catalog, relevant_objectives)
+
+@timed()
+def render_kpi_page(catalog, relevant_objectives):
+    """
+    Render the selected objective and page of the KPI listing.
+
+    Args:
+        catalog (KpiCatalog): The session's catalog.
+        relevant_objectives (list): Relevant business objectives.
+    """
+    objective = st.radio("Obiettivo di Business", relevant_objectives, horizontal=True, key='results_objective')
+    if objective is None:
+        objective = relevant_objectives[0]
+
+    st.subheader(f"KPI/KQI/KRI per {objective}")
+    st.markdown("**KPI/KQI/KRI Utilizzabili**")
+
+    page_sizes = sorted({*RESULTS_PAGE_SIZES, RESULTS_PAGE_SIZE})
+    page_size = st.selectbox(
+        "Indicatori per pagina", page_sizes, index=page_sizes.index(RESULTS_PAGE_SIZE), key='results_page_size'
+    )
+    rows, tipi, bounds = catalog.pages(objective, page_size, RESULTS_ELEMENT_BUDGET)
+    if not bounds:
+        st.write("Nessun indicatore disponibile per questo obiettivo.")
+        return
+
+    page = 1
+    if len(bounds) > 1:
+        page = st.number_input("Pagina", min_value=1, max_value=len(bounds), value=1, step=1, key=f'results_page_{objective}')
+    start, end = bounds[page - 1]
+    st.caption(f"Pagina {page} di {len(bounds)}: indicatori {start + 1}-{end} di {len(rows)}.")
+    display_indicators_with_examples(catalog, rows[start:end], tipi[start:end])
 
 def show_results():
     """
@@ -284,48 +883,45 @@ def show_results():
         st.warning("Per favore, completa una valutazione nella sezione 'Valutazione' prima.")
         return
     
+    import pandas as pd
+
+    from scoring import score_evaluation
+
     responses = st.session_state['evaluation']
-    kpi_df = st.session_state['kpi_data']
+    catalog = get_kpi_catalog()
     scenario = st.session_state.get('scenario', None)
-    likert_questions = get_likert_questions(scenario=scenario)
+    questionnaire = get_scenario(scenario)
     
-    # Mapping of questions to Business Objectives
-    question_mapping = {}
-    for objective, questions in likert_questions.items():
-        for question in questions:
-            question_mapping[question] = objective
-    
-    # Calculate scores per Business Objective
-    business_scores = {}
-    for question, score in responses.items():
-        obj = question_mapping.get(question)
-        if obj:
-            business_scores[obj] = business_scores.get(obj, 0) + score
-    
-    # Calculate average score to determine relevant objectives
-    avg_score = sum(business_scores.values()) / len(business_scores) if business_scores else 0
-    relevant_objectives = [obj for obj, score in business_scores.items() if score >= avg_score]
-    
-    # Filter KPI/KQI/KRI based on relevant objectives
-    relevant_kpis = kpi_df[(kpi_df['Business Objective'].isin(relevant_objectives)) & (kpi_df['Tipo'] == "KPI")]
-    relevant_kqis = kpi_df[(kpi_df['Business Objective'].isin(relevant_objectives)) & (kpi_df['Tipo'] == "KQI")]
-    relevant_kris = kpi_df[(kpi_df['Business Objective'].isin(relevant_objectives)) & (kpi_df['Tipo'] == "KRI")]
+    # Score the evaluation: per-objective scores, relevant objectives and overall scores
+    scores = score_evaluation(responses, questionnaire)
+    relevant_objectives = scores.relevant_objectives()
+
+    # Overall scores are shown with the tangibility gauge and matrix before the KPI tabs
+    ease_score = float(scores.ease[0])
+    value_score = float(scores.value[0])
+    tangibility_score = float(scores.tangibility[0])  # Average for tangibility
 
-    # Calculate overall scores first and show the overall tangibility and matrix before KPI tabs
-    ease_score, value_score = calculate_overall_scores(responses)
-    tangibility_score = (value_score + ease_score) / 2  # Average for tangibility
+    # Charts are memoized on the content of the evaluation
+    cache_key = evaluation_key(responses, scenario)
 
     st.subheader("Valutazione Complessiva")
     # Show gauge and matrix first
     st.markdown("### **Tangibility of the AI Model**")
-    display_gauge(tangibility_score, "Model Tangibility Score")
+    display_gauge(tangibility_score, "Model Tangibility Score", cache_key=cache_key)
     
     st.markdown("### **Matrix Representation**")
-    display_matrix(ease_score, value_score)
+    display_matrix(ease_score, value_score, cache_key=cache_key)
     st.markdown(f"**Ease of Implementation Score:** {ease_score:.2f}")
     st.markdown(f"**Value Delivered Score:** {value_score:.2f}")
 
-    # Now show KPI tabs after overall evaluation
+    with st.expander("Analisi di Sensibilità (what-if)"):
+        display_sensitivity(responses, questionnaire, cache_key)
+
+    evaluations = st.session_state.get('evaluations', {})
+    if len(evaluations) > 1:
+        display_rater_agreement(evaluations, questionnaire, cache_key=evaluation_key(evaluations, scenario))
+
+    # Now show the KPI listing after overall evaluation
     st.markdown("---")
     st.info("Visualizzazione dei KPI/KQI/KRI in base agli obiettivi di business rilevanti...")
 
@@ -334,114 +930,12 @@ def show_results():
         st.write("Nessun obiettivo rilevante identificato dalla valutazione.")
         return
     
-    result_tabs = st.tabs(relevant_objectives)
-
-    def display_indicators_with_examples(indicators, tipo):
-        """
-        Display given indicators (KPI/KQI/KRI) with their formula and example.
-        Now with more quantitative and specific units of measure in LaTeX.
-        
-        Args:
-            indicators (pd.DataFrame): Subset of indicators for a given Business Objective.
-            tipo (str): Tipo (KPI/KQI/KRI).
-        """
-        # More detailed formulas with units
-        for index, row in indicators.iterrows():
-            categoria = row.get('Categoria', 'N/A')
-            focus = row.get('Focus', 'N/A')
-            metriche = row.get('Metriche', 'N/A').split(', ')
-            
-            st.markdown(f"**Categoria {tipo}:** {categoria}")
-            st.markdown(f"- **Focus:** {focus}")
-            
-            for metrica in metriche:
-                metric = metrica.lower().strip()
-                
-                # Define a dictionary of improved formulas with units where possible
-                if "tasso churn" in metric:
-                    formula = r"Tasso\ Churn(\%) = \frac{\text{Clienti Persi nel Periodo}}{\text{Clienti Iniziali}} \times 100"
-                    example = "Se su 1,000 clienti iniziali, 50 abbandonano nel mese, il Tasso Churn = (50/1000)*100 = 5%."
-                
-                elif metric == "ordini":
-                    formula = r"\text{Ordini} = \text{Numero di Ordini (unità)}"
-                    example = "Se in un mese ricevi 150 ordini, Ordini = 150 unità."
-                elif metric == "ricavi":
-                    formula = r"\text{Ricavi (€)} = \text{Prezzo Medio per Ordine (€)} \times \text{Numero di Ordini (unità)}"
-                    example = "Se il prezzo medio è 50€ e ricevi 150 ordini, Ricavi = 50€ * 150 = 7,500€."
-                elif "traffico clienti" in metric:
-                    formula = r"\text{Traffico Clienti} = \text{Visite Totali (sessioni/mese)}"
-                    example = "Se il tuo sito riceve 10,000 visite al mese, Traffico Clienti = 10,000 sessioni/mese."
-                elif "transazioni" in metric:
-                    formula = r"\text{Transazioni} = \text{Numero di Transazioni Completate (unità)}"
-                    example = "Se vengono processate 200 transazioni in una settimana, Transazioni = 200."
-                elif "ordini sociali" in metric:
-                    formula = r"\text{Ordini Sociali} = \text{Ordini Provenienti da Canali Social (unità)}"
-                    example = "Se 50 ordini provengono da canali social in un mese, Ordini Sociali = 50."
-                elif "partner & reti" in metric:
-                    formula = r"\text{Partner & Reti} = \text{Conteggio Partner Attivi e Reti (unità)}"
-                    example = "Se hai 5 partner attivi e collabori con 3 reti, totale = 8."
-                elif "referral & profitti" in metric:
-                    formula = r"\text{Referral & Profitti (€)} = \text{Profitti da Referral (€)}"
-                    example = "Se i referral generano 2,000€ di profitti, Referral & Profitti = 2,000€."
-                elif "prodotti digitali" in metric:
-                    formula = r"\text{Prodotti Digitali} = \text{Numero di Prodotti Digitali Offerti (unità)}"
-                    example = "Se offri 10 prodotti digitali, Prodotti Digitali = 10."
-                elif "prezzi" in metric:
-                    formula = r"\text{Prezzi Medi (€)} = \frac{\text{Somma dei Prezzi di Tutti i Prodotti Venduti (€)}}{\text{Numero di Prodotti Venduti (unità)}}"
-                    example = "Se vendi 100 prodotti per un totale di 5,000€, il prezzo medio è 5,000€/100 = 50€."
-                elif "promozioni" in metric:
-                    formula = r"\text{Promozioni} = \text{Numero di Promozioni Attuate (unità)}"
-                    example = "Se lanci 3 promozioni in un mese, Promozioni = 3."
-                elif "nuovi modelli di business" in metric:
-                    formula = r"\text{Nuovi Modelli di Business} = \text{Numero di Modelli Introdotti (unità)}"
-                    example = "Se introduci 2 nuovi modelli di business, Nuovi Modelli di Business = 2."
-                elif "riduzione del tempo di consegna" in metric:
-                    formula = r"\Delta \text{Tempo Consegna (giorni)} = \text{Tempo Iniziale} - \text{Tempo Attuale}"
-                    example = "Se riduci la consegna da 5 a 3 giorni, riduzione = 2 giorni."
-                elif "% conformità" in metric:
-                    formula = r"\% Conformità = \frac{\text{Processi Conformi}}{\text{Processi Totali}} \times 100"
-                    example = "Se 90 su 100 processi sono conformi, % Conformità = 90%."
-                elif "tempo di attesa" in metric:
-                    formula = r"\text{Tempo di Attesa (minuti)} = \text{Tempo Medio di Attesa per Cliente}"
-                    example = "Se il tempo medio di attesa è 2 minuti, Tempo di Attesa = 2 min."
-                elif "lavoro completato" in metric:
-                    formula = r"\text{Lavoro Completato (unità)} = \text{Numero di Task Completati}"
-                    example = "Se completi 50 task in una settimana, Lavoro Completato = 50."
-                else:
-                    # Default if not matched
-                    formula = r"\text{Metrica non definita con unità specifiche}"
-                    example = "Nessun esempio specifico disponibile."
-
-                st.markdown(f"**{metrica.capitalize()}:**")
-                st.latex(formula)
-                st.markdown(f"*Esempio:* {example}\n")
-
-    for tab, objective in zip(result_tabs, relevant_objectives):
-        with tab:
-            st.subheader(f"KPI/KQI/KRI per {objective}")
-            st.markdown("**KPI/KQI/KRI Utilizzabili**")
-            indicators = kpi_df[kpi_df['Business Objective'] == objective]
-            tipi = indicators['Tipo'].unique()
-            for tipo in tipi:
-                st.markdown(f"### {tipo}")
-                subset = indicators[indicators['Tipo'] == tipo]
-                display_indicators_with_examples(subset, tipo)
+    display_kpi_results(catalog, relevant_objectives)
     
-    # After showing KPI tabs, show a detailed evaluation summary
+    # After showing the KPI listing, show a detailed evaluation summary
     st.markdown("---")
     st.subheader("Valutazione Dettagliata")
-    eval_summary = pd.DataFrame({
-        "Aspetto": [
-            "Comprensibilità e Misurabilità", 
-            "Contributo alla Riduzione dei Costi", 
-            "Contributo all'Aumento dei Ricavi"
-        ],
-        "Valutazione": [
-            responses.get("Il modello AI è facilmente comprensibile e misurabile.", 4),
-            responses.get("Il modello AI contribuisce significativamente alla riduzione dei costi.", 4),
-            responses.get("Il modello AI contribuisce significativamente all'aumento dei ricavi.", 4)
-        ]
-    })
+    eval_summary = pd.DataFrame(detail_scores(responses), columns=["Aspetto", "Valutazione"])
     st.table(eval_summary)
     
     st.markdown("### Dettagli Valutazione")
@@ -449,20 +943,126 @@ def show_results():
         st.markdown(f"- **{row['Aspetto']}:** {row['Valutazione']}")
 
 
+def show_portfolio():
+    """
+    Display every stored evaluation, and optionally imported ones, on the
+    Ease of Implementation vs Value Delivered quadrant.
+    """
+    st.header("Portafoglio dei Modelli AI")
+
+    import pandas as pd
+
+    from evaluation_store import get_evaluation_store
+    from portfolio import get_portfolio, import_portfolio
+
+    try:
+        frames = [get_portfolio(get_evaluation_store())]
+    except Exception as e:
+        st.warning(f"Impossibile leggere l'archivio delle valutazioni: {e}")
+        frames = []
+
+    uploaded_file = st.file_uploader(
+        "Importa Valutazioni (Opzionale)", type=["csv", "parquet"], key='portfolio_upload',
+        help="Una riga per valutazione e una colonna per domanda, più le colonne opzionali 'id', 'name' e 'scenario'."
+    )
+    if uploaded_file is not None:
+        imported = st.session_state.get('portfolio_import')
+        if imported is None or imported[0] != uploaded_file.file_id:
+            try:
+                reader = pd.read_parquet if uploaded_file.name.lower().endswith(".parquet") else pd.read_csv
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter("always")
+                    frame = import_portfolio(reader(uploaded_file))
+                imported = (uploaded_file.file_id, frame, [str(warning.message) for warning in caught])
+                st.session_state['portfolio_import'] = imported
+            except (KeyError, ValueError) as e:
+                st.error(f"Errore nell'importazione delle valutazioni: {e.args[0] if e.args else e}")
+                imported = None
+        if imported is not None:
+            for message in imported[2]:
+                st.warning(message)
+            frames.append(imported[1])
+    else:
+        st.session_state.pop('portfolio_import', None)
+
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        st.write("Nessuna valutazione salvata o importata.")
+        return
+    display_portfolio(pd.concat(frames) if len(frames) > 1 else frames[0])
+
+@st.fragment
+def display_portfolio(frame):
+    """
+    Display the portfolio quadrant with its filters.
+
+    The view runs as a fragment: changing a filter reruns only the chart.
+
+    Args:
+        frame (pd.DataFrame): Portfolio rows, as returned by `get_portfolio`.
+    """
+    with measure_run("portfolio"):
+        from portfolio import filter_portfolio, portfolio_figure, rendering_mode
+        from scoring import score_evaluation
+
+        all_label = "Tutti"
+        columns = st.columns(3)
+        scenario = columns[0].selectbox("Scenario", [all_label, *get_scenario_registry().names()], key='portfolio_scenario')
+        scenarios = get_scenario_registry().names() if scenario == all_label else [scenario]
+        objectives = list(dict.fromkeys(objective for name in scenarios for objective in get_scenario(name).objectives))
+        objective = columns[1].selectbox("Obiettivo rilevante", [all_label, *objectives], key='portfolio_objective')
+        name = columns[2].text_input("Cerca per nome", key='portfolio_search')
+        density = st.checkbox("Mostra densità", key='portfolio_density', help="Raggruppa i modelli in celle invece di mostrarli uno per uno.")
+
+        selected = filter_portfolio(
+            frame,
+            scenario=None if scenario == all_label else scenario,
+            objective=None if objective == all_label else objective,
+            name=name
+        )
+        mode = "density" if density else rendering_mode(len(selected))
+
+        highlight = None
+        if 'evaluation' in st.session_state:
+            scores = score_evaluation(st.session_state['evaluation'], get_scenario(st.session_state.get('scenario', None)))
+            highlight = (float(scores.ease[0]), float(scores.value[0]))
+
+        labels = {"svg": "punti", "webgl": "punti (WebGL)", "density": "densità"}
+        st.caption(f"{len(selected)} modelli su {len(frame)}, visualizzazione: {labels[mode]}.")
+        st.plotly_chart(portfolio_figure(selected, highlight=highlight, mode=mode), width="stretch")
+
+
 def main():
     """
     Main function to orchestrate the rendering of pages based on user's selection.
     """
+    # A refreshed page (or a request served by another worker) reloads the
+    # model referenced in the URL from the evaluation store.
+    if 'ai_name' not in st.session_state and 'model' in st.query_params:
+        try:
+            restore_model(int(st.query_params['model']))
+        except Exception as e:
+            st.warning(f"Impossibile ricaricare la valutazione salvata: {e}")
+
+    if 'session_token' not in st.session_state:
+        # Counts the session as active until Streamlit releases its state
+        st.session_state['session_token'] = start_session()
+
     choice = sidebar_navigation()
+    display_run_stats()
     
-    if choice == "Input Modello AI":
-        input_ai_model()
-    
-    elif choice == "Valutazione":
-        evaluate_ai_model()
-    
-    elif choice == "Risultati":
-        show_results()
+    with timer(PAGE_SECONDS, page=choice):
+        if choice == "Input Modello AI":
+            input_ai_model()
+
+        elif choice == "Valutazione":
+            evaluate_ai_model()
+
+        elif choice == "Risultati":
+            show_results()
+
+        elif choice == "Portafoglio":
+            show_portfolio()
     
     # Footer
     st.markdown("""
@@ -472,4 +1072,7 @@ def main():
     """)
 
 if __name__ == "__main__":
-    main()
+    # Every full run is counted, with its CPU time, next to the fragment reruns
+    with measure_run("app"):
+        main()
+    publish_metrics()
@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_suite import MIN_SAMPLES, TIME_FLOOR_S, compare  # noqa: E402
+
+
+def result(min_s, runs=MIN_SAMPLES, peak_mb=1.0, median_s=None):
+    return {"median_s": median_s or min_s, "min_s": min_s, "runs": runs, "items": 1, "throughput": 1 / min_s, "peak_mb": peak_mb}
+
+
+RESULTS = {
+    "catalog_listing[10]": result(20e-6, runs=15, peak_mb=0.01),
+    "score_matrix[1]": result(150e-6, runs=15, peak_mb=0.02),
+    "catalog_parse[100000]": result(0.4),
+    "score_matrix[10000]": result(0.02, runs=15, peak_mb=12.0),
+}
+
+
+def test_results_compared_with_themselves_do_not_regress():
+    assert compare(RESULTS, RESULTS, 0.10) == []
+
+
+def test_noise_on_fast_cases_is_not_a_regression():
+    assert RESULTS["score_matrix[1]"]["min_s"] < TIME_FLOOR_S
+    noisy = dict(RESULTS)
+    noisy["catalog_listing[10]"] = result(32e-6, runs=15, peak_mb=0.01)
+    noisy["score_matrix[1]"] = result(240e-6, runs=15, peak_mb=0.02)
+    assert compare(noisy, RESULTS, 0.10) == []
+
+
+def test_cases_timed_too_few_times_are_not_compared():
+    slower = dict(RESULTS)
+    slower["catalog_parse[100000]"] = result(0.6, runs=MIN_SAMPLES - 1)
+    assert compare(slower, RESULTS, 0.10) == []
+
+
+def test_slower_fastest_run_alone_is_not_a_regression():
+    slower = dict(RESULTS)
+    slower["catalog_parse[100000]"] = result(0.56, median_s=0.41)
+    assert compare(slower, RESULTS, 0.10) == []
+
+
+def test_slower_case_above_floor_is_a_regression():
+    slower = dict(RESULTS)
+    slower["catalog_parse[100000]"] = result(0.5)
+    slower["score_matrix[10000]"] = result(0.03, runs=15, peak_mb=12.0)
+    assert compare(slower, RESULTS, 0.10) == ["catalog_parse[100000]", "score_matrix[10000]"]
+
+
+def test_memory_growth_is_a_regression_whatever_the_time():
+    heavier = dict(RESULTS)
+    heavier["score_matrix[10000]"] = result(0.02, runs=15, peak_mb=20.0)
+    assert compare(heavier, RESULTS, 0.10) == ["score_matrix[10000]"]
@@ -0,0 +1,130 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from catalog_store import (REQUIRED_COLUMNS, CatalogStore, KpiCatalog, MissingColumnsError, build_catalog,
+                           content_key, parse_kpi_upload)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_catalog_index import synthetic_catalog  # noqa: E402
+
+
+def catalog_frame(metrics):
+    return pd.DataFrame({
+        "Business Objective": ["Obiettivo"], "Tipo": ["KPI"], "Categoria": ["Categoria"],
+        "Focus": ["Focus"], "Metriche": [metrics],
+    })
+
+
+def to_csv(frame):
+    return frame.to_csv(index=False).encode("utf-8")
+
+
+def to_parquet(frame):
+    buffer = io.BytesIO()
+    # Small row groups, so that the file is read in several steps
+    frame.to_parquet(buffer, index=False, row_group_size=100)
+    return buffer.getvalue()
+
+
+def to_arrow_file(frame):
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=100)
+    return sink.getvalue().to_pybytes()
+
+
+def to_arrow_stream(frame):
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=100)
+    return sink.getvalue().to_pybytes()
+
+
+@pytest.mark.parametrize("encode, filename", [
+    (to_csv, "catalogo.csv"),
+    (to_csv, None),
+    (to_parquet, "catalogo.parquet"),
+    (to_parquet, None),
+    (to_arrow_file, "catalogo.arrow"),
+    (to_arrow_file, None),
+    (to_arrow_stream, "catalogo.feather"),
+])
+def test_parse_kpi_upload_reads_every_format(encode, filename):
+    frame = synthetic_catalog(450, seed=1).assign(Note="ignorata")
+    progress = []
+    parsed = parse_kpi_upload(encode(frame), filename, progress=progress.append, chunk_rows=100)
+    assert list(parsed.columns) == list(REQUIRED_COLUMNS)
+    assert parsed["Business Objective"].dtype == "category"
+    pd.testing.assert_frame_equal(parsed.astype(str), frame.loc[:, list(REQUIRED_COLUMNS)].astype(str))
+    assert progress[-1] == 1.0
+    assert progress == sorted(progress)
+
+
+@pytest.mark.parametrize("encode", [to_csv, to_parquet, to_arrow_file])
+def test_parse_kpi_upload_rejects_missing_columns(encode):
+    frame = synthetic_catalog(10).drop(columns=["Focus", "Tipo"])
+    with pytest.raises(MissingColumnsError) as error:
+        parse_kpi_upload(encode(frame))
+    assert error.value.missing == ["Focus", "Tipo"]
+
+
+def test_catalog_lookups_follow_the_catalog_order():
+    frame = synthetic_catalog(300, seed=2)
+    catalog = KpiCatalog(build_catalog(frame))
+    for (objective, tipo), group in frame.groupby(["Business Objective", "Tipo"], sort=False):
+        rows = catalog.rows(objective, tipo)
+        assert rows.tolist() == group.index.tolist()
+        for row in rows.tolist():
+            categoria, focus, metrics = catalog.indicator(row)
+            assert (categoria, focus) == (frame["Categoria"][row], frame["Focus"][row])
+            assert metrics == frame["Metriche"][row].split(", ")
+
+
+def test_store_evicts_the_least_recently_used_catalog():
+    catalogs = {key: KpiCatalog(build_catalog(synthetic_catalog(200, seed=seed))) for seed, key in enumerate("abc")}
+    store = CatalogStore(max_bytes=int(2.5 * max(catalog.memory_usage() for catalog in catalogs.values())))
+    store.get_or_load("a", lambda: catalogs["a"])
+    store.get_or_load("b", lambda: catalogs["b"])
+    assert store.get_or_load("a", lambda: pytest.fail("caricato di nuovo")) is catalogs["a"]
+    store.get_or_load("c", lambda: catalogs["c"])
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (1, 3, 1, 2)
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert store._lookup("b") is None
+    assert store._lookup("a") is catalogs["a"]
+
+
+def test_store_shares_uploads_and_forgets_evicted_ones():
+    data = to_csv(synthetic_catalog(50))
+    store = CatalogStore(max_bytes=1)
+    handle = store.load_upload(data, filename="catalogo.csv")
+    assert store.load_upload(data, filename="catalogo.csv") == handle
+    assert store.stats()["misses"] == 1
+    store.load_default()
+    assert store.resolve(handle) is None
+    assert len(store.resolve(store.load_default())) > 0
+
+
+def test_content_key_tells_no_scenario_from_one_named_none():
+    assert content_key(b"dati", None) != content_key(b"dati", "None")
+    assert content_key(b"dati", "Churn") == content_key(b"dati", "Churn")
+
+
+def test_memory_usage_counts_metric_names_in_bytes():
+    ascii_catalog = KpiCatalog(build_catalog(catalog_frame("Qualita")))
+    accented_catalog = KpiCatalog(build_catalog(catalog_frame("Qualità")))
+    frame_growth = (accented_catalog.frame.memory_usage(deep=True).sum()
+                    - ascii_catalog.frame.memory_usage(deep=True).sum())
+    # "à" takes two bytes in UTF-8, one more than "a"
+    assert accented_catalog.memory_usage() - ascii_catalog.memory_usage() == frame_growth + 1
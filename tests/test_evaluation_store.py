@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from evaluation_store import SQLiteEvaluationStore, open_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = open_store(f"sqlite:///{tmp_path}/valutazioni.sqlite3")
+    yield store
+    store.close()
+
+
+def test_open_store_rejects_unknown_schemes():
+    with pytest.raises(ValueError, match="postgresql"):
+        open_store("postgresql://localhost/valutazioni")
+
+
+def test_models_and_evaluations_round_trip(store):
+    model_id = store.save_model("Modello", "Descrizione", scenario="Churn", catalog_key="abc", catalog_uploaded=True)
+    evaluations = {"Anna": {"q1": 6.0, "q2": 3.0}, "Luca": {"q1": 2.0}}
+    store.save_evaluations(model_id, evaluations, question_objectives={"q1": "A", "q2": "B"})
+    model = store.load_model(model_id)
+    assert (model["name"], model["scenario"], model["catalog_key"], model["catalog_uploaded"]) == (
+        "Modello", "Churn", "abc", 1)
+    assert store.load_evaluations(model_id) == evaluations
+    assert store.load_model(model_id + 1) is None
+
+
+def test_saving_a_rater_again_replaces_their_answers(store):
+    model_id = store.save_model("Modello", "")
+    store.save_evaluation(model_id, "Anna", {"q1": 6.0, "q2": 3.0})
+    store.save_evaluation(model_id, "Anna", {"q1": 1.0})
+    assert store.load_evaluations(model_id) == {"Anna": {"q1": 1.0}}
+
+
+def test_saving_a_model_with_its_id_updates_it(store):
+    model_id = store.save_model("Modello", "Prima")
+    assert store.save_model("Rinominato", "Dopo", model_id=model_id) == model_id
+    assert store.load_model(model_id)["description"] == "Dopo"
+    assert [model["id"] for model in store.list_models()] == [model_id]
+
+
+def test_list_models_filters(store):
+    churn = store.save_model("Churn 50%", "", scenario="Churn")
+    default = store.save_model("Churn_base", "")
+    store.save_evaluation(churn, "Anna", {"q1": 5.0}, question_objectives={"q1": "Retention"})
+    assert [model["id"] for model in store.list_models(scenario="Churn")] == [churn]
+    assert [model["id"] for model in store.list_models(objective="Retention")] == [churn]
+    # LIKE wildcards in the searched name are taken literally
+    assert [model["id"] for model in store.list_models(name="50%")] == [churn]
+    assert [model["id"] for model in store.list_models(name="n_b")] == [default]
+    assert {model["id"]: model["evaluations"] for model in store.list_models()} == {churn: 1, default: 0}
+
+
+def test_consensus_averages_the_raters(store):
+    model_id = store.save_model("Modello", "")
+    store.save_evaluations(model_id, {"Anna": {"q1": 6.0}, "Luca": {"q1": 2.0, "q2": 4.0}})
+    assert sorted(map(tuple, store.load_consensus())) == [(model_id, "q1", 4.0), (model_id, "q2", 4.0)]
+
+
+def test_writes_from_several_threads_share_the_pool(tmp_path):
+    store = SQLiteEvaluationStore(str(tmp_path / "valutazioni.sqlite3"), pool_size=2)
+    model_id = store.save_model("Modello", "")
+
+    def rate(rater):
+        store.save_evaluation(model_id, rater, {"q1": 5.0})
+
+    threads = [threading.Thread(target=rate, args=(f"Valutatore {i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store.load_evaluations(model_id)) == 8
+    store.close()
@@ -0,0 +1,120 @@
+import gc
+import math
+import urllib.error
+import urllib.request
+
+import pytest
+
+import instrumentation
+from instrumentation import (ACTIVE_SESSIONS, CATALOG_CACHE_HITS, CATALOG_ROWS, PAGE_SECONDS, RUNS_TOTAL,
+                             SESSIONS_TOTAL, Counter, Histogram, MetricsRegistry)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(instrumentation, "_registry", registry)
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    return registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latenza", "Aiuto.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, page="Risultati")
+    assert histogram.samples() == [
+        'latenza_bucket{page="Risultati",le="0.1"} 2',
+        'latenza_bucket{page="Risultati",le="1"} 3',
+        'latenza_bucket{page="Risultati",le="+Inf"} 4',
+        'latenza_sum{page="Risultati"} 3.65',
+        'latenza_count{page="Risultati"} 4',
+    ]
+
+
+def test_histogram_quantile_is_a_bucket_bound():
+    histogram = Histogram("latenza", "Aiuto.", buckets=(0.1, 1.0))
+    assert math.isnan(histogram.quantile(0.5))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.25) == 0.1
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.99) == math.inf
+
+
+def test_counter_advance_never_goes_back():
+    counter = Counter("totale", "Aiuto.")
+    counter.advance(5)
+    counter.advance(3)
+    counter.inc(2)
+    counter.advance(10, scope="app")
+    assert counter.values() == [({}, 7), ({"scope": "app"}, 10)]
+
+
+def test_label_values_are_escaped(registry):
+    registry.metric(RUNS_TOTAL).inc(scope='a "b"\\c\nd')
+    assert 'valore_ai_runs_total{scope="a \\"b\\"\\\\c\\nd"} 1' in registry.render()
+
+
+def test_render_declares_every_metric_used(registry):
+    instrumentation.observe(CATALOG_ROWS, 500)
+    instrumentation.increment(RUNS_TOTAL, scope="app")
+    instrumentation.advance_counter(CATALOG_CACHE_HITS, 4)
+    instrumentation.set_gauge(ACTIVE_SESSIONS, 3)
+    with instrumentation.timer(PAGE_SECONDS, page="Risultati"):
+        pass
+    text = registry.render()
+    assert text.endswith("\n")
+    for name, kind in ((CATALOG_ROWS, "histogram"), (RUNS_TOTAL, "counter"),
+                       (CATALOG_CACHE_HITS, "counter"), (ACTIVE_SESSIONS, "gauge"), (PAGE_SECONDS, "histogram")):
+        assert f"# TYPE {name} {kind}\n" in text
+    assert 'valore_ai_catalog_rows_bucket{le="1000"} 1' in text
+    assert 'valore_ai_runs_total{scope="app"} 1' in text
+    assert "valore_ai_catalog_cache_hits_total 4" in text
+    assert "valore_ai_active_sessions 3" in text
+    assert 'valore_ai_page_seconds_count{page="Risultati"} 1' in text
+
+
+def test_unknown_metrics_are_rejected(registry):
+    with pytest.raises(KeyError):
+        registry.metric("valore_ai_sconosciuta")
+
+
+def test_sessions_stay_active_while_their_token_lives(registry):
+    token = instrumentation.start_session()
+    assert registry.metric(ACTIVE_SESSIONS).values() == [({}, 1)]
+    del token
+    gc.collect()
+    assert registry.metric(ACTIVE_SESSIONS).values() == [({}, 0)]
+    assert registry.metric(SESSIONS_TOTAL).values() == [({}, 1)]
+
+
+def test_helpers_do_nothing_when_disabled(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(instrumentation, "_registry", registry)
+    monkeypatch.setattr(instrumentation, "ENABLED", False)
+    instrumentation.increment(RUNS_TOTAL)
+    assert instrumentation.start_session() is None
+    assert registry.render() == "\n"
+
+
+def test_metrics_file_is_written_in_the_text_format(registry, tmp_path):
+    instrumentation.increment(RUNS_TOTAL, scope="app")
+    path = tmp_path / "valore_ai.prom"
+    instrumentation.write_metrics_file(str(path))
+    assert path.read_text(encoding="utf-8") == registry.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["valore_ai.prom"]
+
+
+def test_metrics_endpoint_serves_the_registry(registry):
+    instrumentation.increment(RUNS_TOTAL, scope="app")
+    server = instrumentation._start_server("127.0.0.1", 0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(url + "/metrics", timeout=10) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode("utf-8") == registry.render()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/altro", timeout=10)
+    finally:
+        server.shutdown()
+        server.server_close()
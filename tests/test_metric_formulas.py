@@ -0,0 +1,109 @@
+import pytest
+
+from metric_formulas import DEFAULT_FORMULA, MIN_SUGGESTION_CONFIDENCE, FormulaRegistry, load_registry
+
+# The if/elif chain of show_results before the registry, in its order:
+# (match, pattern, formula).
+BASELINE_CHAIN = [
+    ("contains", "tasso churn", r"Tasso\ Churn(\%) = \frac{\text{Clienti Persi nel Periodo}}{\text{Clienti Iniziali}} \times 100"),
+    ("exact", "ordini", r"\text{Ordini} = \text{Numero di Ordini (unità)}"),
+    ("exact", "ricavi", r"\text{Ricavi (€)} = \text{Prezzo Medio per Ordine (€)} \times \text{Numero di Ordini (unità)}"),
+    ("contains", "traffico clienti", r"\text{Traffico Clienti} = \text{Visite Totali (sessioni/mese)}"),
+    ("contains", "transazioni", r"\text{Transazioni} = \text{Numero di Transazioni Completate (unità)}"),
+    ("contains", "ordini sociali", r"\text{Ordini Sociali} = \text{Ordini Provenienti da Canali Social (unità)}"),
+    ("contains", "partner & reti", r"\text{Partner & Reti} = \text{Conteggio Partner Attivi e Reti (unità)}"),
+    ("contains", "referral & profitti", r"\text{Referral & Profitti (€)} = \text{Profitti da Referral (€)}"),
+    ("contains", "prodotti digitali", r"\text{Prodotti Digitali} = \text{Numero di Prodotti Digitali Offerti (unità)}"),
+    ("contains", "prezzi", r"\text{Prezzi Medi (€)} = \frac{\text{Somma dei Prezzi di Tutti i Prodotti Venduti (€)}}{\text{Numero di Prodotti Venduti (unità)}}"),
+    ("contains", "promozioni", r"\text{Promozioni} = \text{Numero di Promozioni Attuate (unità)}"),
+    ("contains", "nuovi modelli di business", r"\text{Nuovi Modelli di Business} = \text{Numero di Modelli Introdotti (unità)}"),
+    ("contains", "riduzione del tempo di consegna", r"\Delta \text{Tempo Consegna (giorni)} = \text{Tempo Iniziale} - \text{Tempo Attuale}"),
+    ("contains", "% conformità", r"\% Conformità = \frac{\text{Processi Conformi}}{\text{Processi Totali}} \times 100"),
+    ("contains", "tempo di attesa", r"\text{Tempo di Attesa (minuti)} = \text{Tempo Medio di Attesa per Cliente}"),
+    ("contains", "lavoro completato", r"\text{Lavoro Completato (unità)} = \text{Numero di Task Completati}"),
+]
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return load_registry()
+
+
+def baseline_formula(metrica):
+    metric = metrica.lower().strip()
+    for match, pattern, formula in BASELINE_CHAIN:
+        if (metric == pattern) if match == "exact" else (pattern in metric):
+            return formula
+    return DEFAULT_FORMULA
+
+
+@pytest.mark.parametrize("metric", [
+    "Tasso Churn", "Tasso churn mensile", " Ordini ", "Ordini online", "Ricavi", "Ricavi netti",
+    "Traffico Clienti", "Transazioni", "Transazioni e ordini sociali", "Ordini Sociali", "Partner & Reti",
+    "Referral & Profitti", "Prodotti Digitali", "Prezzi dei prodotti digitali", "Prezzi", "Promozioni",
+    "Nuovi Modelli di Business", "Riduzione del Tempo di Consegna", "% Conformità", "Tempo di Attesa",
+    "Lavoro Completato", "Tasso churn delle transazioni", "Promozioni sui prezzi", "Soddisfazione Clienti",
+    "", "Tasso di Churn",
+])
+def test_registry_resolves_like_the_baseline_chain(registry, metric):
+    assert registry.resolve(metric).formula == baseline_formula(metric)
+
+
+def test_registry_resolves_combined_patterns_like_the_baseline_chain(registry):
+    # Names holding two patterns, in both orders, where the priority decides
+    for _, first, _ in BASELINE_CHAIN:
+        for _, second, _ in BASELINE_CHAIN:
+            metric = f"{first} {second}".upper()
+            assert registry.resolve(metric).formula == baseline_formula(metric), metric
+
+
+def test_first_listed_rule_wins():
+    rules = [
+        {"match": "contains", "pattern": "tempo", "formula": "A", "example": ""},
+        {"match": "exact", "pattern": "tempo di attesa", "formula": "B", "example": ""},
+        {"match": "contains", "pattern": "tempo di", "formula": "C", "example": ""},
+    ]
+    registry = FormulaRegistry(rules)
+    assert registry.resolve("Tempo di attesa").formula == "A"
+    assert FormulaRegistry(rules[1:]).resolve("Tempo di attesa").formula == "B"
+    assert FormulaRegistry(rules[2:]).resolve("Il tempo di ciclo").formula == "C"
+    registry.add_rule({"match": "exact", "pattern": "ciclo", "formula": "D", "example": ""})
+    assert registry.resolve("Ciclo").formula == "D"
+
+
+def test_malformed_rules_are_rejected():
+    with pytest.raises(ValueError, match="formula"):
+        FormulaRegistry([{"match": "exact", "pattern": "ordini", "example": ""}])
+    with pytest.raises(ValueError, match="corrispondenza"):
+        FormulaRegistry([{"match": "regex", "pattern": "ordini", "formula": "", "example": ""}])
+
+
+@pytest.mark.parametrize("metric", [
+    "Tempo di Sviluppo",
+    "Numero di Nuovi Prodotti",
+    "Tempo di inattività",
+    "Tempo di ciclo",
+    "Riduzione dei costi",
+    "Numero di partner",
+    "Prodotti venduti",
+    "Canali digitali",
+])
+def test_names_sharing_a_word_get_no_suggestion(registry, metric):
+    assert registry.resolve(metric).pattern is None
+    assert registry.suggest(metric) is None
+
+
+@pytest.mark.parametrize("metric, pattern", [
+    ("Tasso di Churn", "tasso churn"),
+    ("Prodotto digitale", "prodotti digitali"),
+    ("Tempi di attesa", "tempo di attesa"),
+    ("Nuovo modello di business", "nuovi modelli di business"),
+    ("Ordine sociale", "ordini sociali"),
+    ("Prezzo", "prezzi"),
+])
+def test_variants_of_a_known_metric_get_its_formula(registry, metric, pattern):
+    assert registry.resolve(metric).pattern is None
+    suggestion = registry.suggest(metric)
+    assert suggestion is not None
+    assert suggestion.formula.pattern == pattern
+    assert suggestion.confidence >= MIN_SUGGESTION_CONFIDENCE
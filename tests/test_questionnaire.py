@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from questionnaire import Scenario, ScenarioRegistry, get_scenario
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_listing_scenarios_does_not_import_numpy():
+    code = ("import sys, questionnaire; questionnaire.get_scenario('Churn').question_list; "
+            "print('numpy' in sys.modules)")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True)
+    assert output.stdout.strip() == "False"
+
+
+def test_membership_matches_question_objectives():
+    scenario = get_scenario("Churn")
+    assert scenario.membership.shape == (len(scenario.question_list), len(scenario.objectives))
+    assert not scenario.membership.flags.writeable
+    for question, objective in scenario.question_objectives.items():
+        row = scenario.membership[scenario.question_ids[question]]
+        assert row.sum() == 1.0
+        assert row[scenario.objectives.index(objective)] == 1.0
+
+
+def test_ease_weights_mark_the_ease_questions():
+    scenario = get_scenario()
+    assert [scenario.question_list[i] for i in np.flatnonzero(scenario.ease_weights)] == list(scenario.ease_questions)
+
+
+def test_extending_scenario_appends_questions():
+    registry = ScenarioRegistry([
+        {"name": "Base", "questions": {"A": ["q1"]}, "ease_questions": ["q1"]},
+        {"name": "Esteso", "extends": "Base", "questions": {"A": ["q2"], "B": ["q3"]}},
+    ])
+    scenario = registry.get("Esteso")
+    assert scenario.question_list == ("q1", "q2", "q3")
+    assert scenario.ease_questions == ("q1",)
+
+
+def test_question_under_two_objectives_is_rejected():
+    with pytest.raises(ValueError, match="sotto due obiettivi"):
+        ScenarioRegistry([{"name": "Doppio", "questions": {"A": ["q1", "q2"], "B": ["q2"]}, "ease_questions": ["q1"]}])
+
+
+def test_extension_moving_a_question_to_another_objective_is_rejected():
+    with pytest.raises(ValueError, match="'q1'"):
+        ScenarioRegistry([
+            {"name": "Base", "questions": {"A": ["q1"]}, "ease_questions": ["q1"]},
+            {"name": "Esteso", "extends": "Base", "questions": {"B": ["q1"]}},
+        ])
+
+
+def test_scenario_without_ease_questions_is_rejected():
+    with pytest.raises(ValueError, match="facilità"):
+        ScenarioRegistry([{"name": "Senza", "questions": {"A": ["q1"]}}])
+
+
+def test_compile_rejects_a_question_under_two_objectives():
+    with pytest.raises(ValueError):
+        Scenario.compile("", {"A": ["q1"], "B": ["q1"]}, [])
@@ -0,0 +1,83 @@
+import pytest
+
+from catalog_store import get_catalog_store
+from evaluation_store import open_store
+from metric_formulas import load_registry
+from questionnaire import get_scenario
+from reports import build_report, export_reports, list_model_ids, report_filename
+from scoring import consensus_responses, score_evaluation
+
+
+def answers(value, scenario=None):
+    return dict.fromkeys(get_scenario(scenario).question_list, value)
+
+
+def model(scenario=None, name="Modello <AI>"):
+    return {"id": 7, "name": name, "description": "Descrizione", "scenario": scenario, "catalog_uploaded": 0}
+
+
+@pytest.fixture(scope="module")
+def formulas():
+    return load_registry()
+
+
+def test_report_lists_the_indicators_of_the_relevant_objectives(formulas):
+    catalog = get_catalog_store().resolve(get_catalog_store().load_default("Churn"))
+    responses = answers(6.0, "Churn")
+    report = build_report(model("Churn"), {"Anna": responses}, catalog, formulas)
+    scores = score_evaluation(responses, get_scenario("Churn"))
+    assert (report.ease, report.value) == (pytest.approx(scores.ease[0]), pytest.approx(scores.value[0]))
+    assert list(report.indicators) == scores.relevant_objectives()
+    for objective, indicators in report.indicators.items():
+        assert len(indicators) == sum(len(catalog.rows(objective, tipo)) for tipo in catalog.tipi(objective))
+        for indicator in indicators:
+            for metric in indicator.metrics:
+                resolved = formulas.resolve(metric.name)
+                if metric.suggestion is None:
+                    assert metric.formula == resolved
+                else:
+                    assert resolved.pattern is None and metric.formula == metric.suggestion.formula
+
+
+def test_report_of_several_raters_scores_their_consensus(formulas):
+    catalog = get_catalog_store().resolve(get_catalog_store().load_default())
+    evaluations = {"Anna": answers(7.0), "Luca": answers(2.0)}
+    report = build_report(model(), evaluations, catalog, formulas)
+    scores = score_evaluation(consensus_responses(evaluations), get_scenario())
+    assert report.raters == ["Anna", "Luca"]
+    assert report.value == pytest.approx(scores.value[0])
+
+
+def test_report_of_a_removed_scenario_falls_back_to_the_default(formulas):
+    catalog = get_catalog_store().resolve(get_catalog_store().load_default())
+    report = build_report(model("Rimosso"), {"Anna": answers(4.0)}, catalog, formulas)
+    assert report.scenario is get_scenario()
+    assert "Rimosso" in report.notes[0]
+
+
+def test_report_filename_is_safe():
+    assert report_filename(model(name="Modello <AI> / v2"), "pdf") == "000007-modello-ai-v2.pdf"
+    assert report_filename(model(name="???"), "html") == "000007-modello.html"
+
+
+def test_export_writes_a_report_per_evaluated_model(tmp_path):
+    store_url = f"sqlite:///{tmp_path}/valutazioni.sqlite3"
+    store = open_store(store_url)
+    evaluated = store.save_model("Modello <AI>", "Descrizione", scenario="Churn")
+    store.save_evaluation(evaluated, "Anna", answers(6.0, "Churn"))
+    store.save_model("Senza valutazioni", "")
+    model_ids = list_model_ids(store)
+    store.close()
+    assert model_ids == [evaluated]
+
+    results = list(export_reports(model_ids, str(tmp_path / "report"), formats=("html", "pdf"),
+                                  workers=1, store_url=store_url))
+    assert len(results) == 1
+    model_id, files, error = results[0]
+    assert (model_id, error) == (evaluated, None)
+    assert [path.rsplit(".", 1)[1] for path, _ in files] == ["html", "pdf"]
+    with open(files[0][0], encoding="utf-8") as f:
+        page = f.read()
+    assert "Modello/App AI: Modello &lt;AI&gt;" in page
+    with open(files[1][0], "rb") as f:
+        assert f.read(5) == b"%PDF-"
@@ -0,0 +1,82 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from questionnaire import DEFAULT_ANSWER, get_scenario
+from scoring import SCORE_SCALE, as_scenario, calculate_overall_scores, score_evaluation, score_table
+
+
+def responses_table(scenario=None, rows=6, seed=0):
+    questions = get_scenario(scenario).question_list
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.integers(1, 8, (rows, len(questions))).astype(float), columns=list(questions))
+
+
+def test_score_table_ignores_and_reports_unknown_columns():
+    table = responses_table()
+    with_id = table.assign(id=range(100, 100 + len(table)))
+    with pytest.warns(UserWarning, match="id"):
+        scores = score_table(with_id)
+    pd.testing.assert_frame_equal(scores, score_table(table))
+
+
+def test_score_table_rejects_non_numeric_questions():
+    table = responses_table()
+    table[table.columns[0]] = "sì"
+    with pytest.raises(ValueError, match="non numeriche"):
+        score_table(table)
+
+
+def test_score_table_keeps_rows_with_duplicate_labels_in_order():
+    table = responses_table("Churn")
+    table["scenario"] = ["Churn", None, "Churn", None, "Churn", "Churn"]
+    table.index = pd.Index(["a", "a", "b", "b", "a", "c"])
+    scores = score_table(table, scenario_column="scenario")
+    assert list(scores.index) == list(table.index)
+    for position in range(len(table)):
+        name = table["scenario"].iloc[position]
+        scenario = get_scenario(None if pd.isna(name) else name)
+        row = {question: table[question].iloc[position] for question in scenario.question_list}
+        expected = score_evaluation(row, scenario)
+        assert scores["value"].iloc[position] == pytest.approx(expected.value[0])
+        assert scores["ease"].iloc[position] == pytest.approx(expected.ease[0])
+
+
+def test_scenario_without_ease_questions_scores_the_default_ease():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        scores = score_evaluation({"q1": 6, "q2": 2}, as_scenario({"A": ["q1"], "B": ["q2"]}, ease_questions=[]))
+    assert scores.ease[0] == pytest.approx(DEFAULT_ANSWER * SCORE_SCALE)
+    assert scores.value[0] == pytest.approx(4 * SCORE_SCALE)
+
+
+# calculate_overall_scores as it was written in streamlit_app.py before the
+# scoring module: value is the mean of every answer, ease the mean of the two
+# ease questions (4 when unanswered), both times 14.3.
+BASELINE_EASE_QUESTIONS = [
+    "Il modello AI è facilmente integrabile con i sistemi esistenti.",
+    "Il modello AI è facilmente comprensibile e misurabile.",
+]
+
+
+def baseline_overall_scores(responses):
+    value_score = sum(responses.values()) / len(responses) * 14.3
+    ease_score = sum([responses.get(q, 4) for q in BASELINE_EASE_QUESTIONS]) / len(BASELINE_EASE_QUESTIONS) * 14.3
+    return ease_score, value_score
+
+
+@pytest.mark.parametrize("answered", [None, 7, 2, 1])
+@pytest.mark.parametrize("seed", range(5))
+def test_score_evaluation_matches_the_baseline_scores(answered, seed):
+    questions = list(get_scenario().question_list)
+    rng = np.random.default_rng(seed)
+    if answered is not None:
+        questions = list(rng.choice(questions, answered, replace=False))
+    responses = {question: int(rng.integers(1, 8)) for question in questions}
+    scores = score_evaluation(responses, get_scenario())
+    ease, value = baseline_overall_scores(responses)
+    assert scores.ease[0] == pytest.approx(ease)
+    assert scores.value[0] == pytest.approx(value)
+    assert calculate_overall_scores(responses) == pytest.approx((ease, value))